@@ -1,22 +1,20 @@
 """Simulates a battery to evaluate how much energy it could save."""
 import logging
 import asyncio
-from datetime import timedelta
+import sqlite3
+import time
+from functools import partial
 
 import voluptuous as vol
 import homeassistant.util.dt as dt_util
 
 from homeassistant.core import SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers import discovery
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.start import async_at_start
-from homeassistant.helpers.event import (
-    async_call_later,
-    async_track_state_change_event,
-    async_track_time_interval,
-)
 from homeassistant.helpers.dispatcher import dispatcher_send, async_dispatcher_connect
 
 from homeassistant.const import (
@@ -24,25 +22,17 @@ from homeassistant.const import (
     CONF_NAME,
     STATE_UNAVAILABLE,
     STATE_UNKNOWN,
-    UnitOfEnergy,
 )
 
 from .const import (
+    ADAPTIVE_POWER_CHANGE_FRACTION,
     ATTR_ENERGY_BATTERY_IN,
-    ATTR_ENERGY_BATTERY_OUT,
-    ATTR_ENERGY_SAVED,
-    ATTR_STATUS,
     ATTR_AVERAGE_ENERGY_VALUE,
-    ATTR_MONEY_SAVED_EXPORT,
-    ATTR_MONEY_SAVED_IMPORT,
-    ATTR_MONEY_SAVED,
-    ATTR_LAST_CHARGE_EFFICIENCY,
-    ATTR_LAST_DISCHARGE_EFFICIENCY,
     BATTERY_DEGRADATION,
     BATTERY_CYCLES,
-    BATTERY_MODE,
     BATTERY_PLATFORMS,
-    CHARGE_ONLY,
+    BATTERY_MODES,
+    CHARGE_LIMIT,
     CHARGING_RATE,
     CONF_BATTERY_CHARGE_EFFICIENCY,
     CONF_BATTERY_DISCHARGE_EFFICIENCY,
@@ -51,6 +41,7 @@ from .const import (
     CONF_BATTERY_MAX_DISCHARGE_RATE,
     CONF_BATTERY_SIZE,
     CONF_BATTERY,
+    CONF_DEGRADATION_CURVE,
     CONF_END_OF_LIFE_DEGRADATION,
     CONF_ENERGY_EXPORT_TARIFF,
     CONF_ENERGY_IMPORT_TARIFF,
@@ -64,43 +55,70 @@ from .const import (
     DEFAULT_MINIMUM_USER_SELECTABLE_SOC,
     CONF_INPUT_LIST,
     CONF_RATED_BATTERY_CYCLES,
+    CONF_SHADOW_SCENARIOS,
+    CONF_TICK_JOURNAL,
     DEFAULT_MODE,
-    DISCHARGE_ONLY,
+    DISCHARGE_LIMIT,
     DISCHARGING_RATE,
     DOMAIN,
-    FORCE_DISCHARGE,
     MESSAGE_TYPE_BATTERY_UPDATE,
     MESSAGE_TYPE_GENERAL,
-    MODE_CHARGING,
-    MODE_DISCHARGING,
-    MODE_EMPTY,
-    MODE_FORCE_CHARGING,
-    MODE_FORCE_DISCHARGING,
-    MODE_FULL,
-    MODE_IDLE,
     MINIMUM_UPDATE_INTERVAL_SECONDS,
+    MAXIMUM_SOC,
+    MINIMUM_SOC,
     NO_TARIFF_INFO,
     OVERRIDE_CHARGING,
     PAUSE_BATTERY,
     FIXED_TARIFF,
+    FORCE_DISCHARGE,
     TARIFF_TYPE,
     SENSOR_ID,
     SENSOR_TYPE,
-    TARIFF_SENSOR,
     IMPORT,
     EXPORT,
-    SOLAR_POWER_CAP,
     SIMULATED_SENSOR,
 )
 from .helpers import (
     device_display_name,
     find_empty_battery_devices,
     find_leftover_entity_registry_entries,
+    ENERGY_UNIT_CONVERSION_FACTORS,
     generate_input_list,
     interpolate_efficiency,
-    parse_efficiency_curve,
+    validate_degradation_config,
     validate_efficiency_config,
 )
+from . import simulation
+from .backfill import async_backfill_statistics
+from . import checkpoint
+from .checkpoint import BatteryCheckpoint, checkpoint_key, legacy_checkpoint
+from .devices import DEVICE_INDEX_KEY, async_get_device_index
+from .journal import TickJournal, journal_directory, remove_journal
+from .publisher import BatteryStatePublisher
+from .recorder_history import (
+    STATES,
+    STATISTICS,
+    RecorderHistory,
+    recorder_database_path,
+)
+from .scenarios import SHADOW_SCENARIOS_SCHEMA, ScenarioBank
+from .scheduler import SCHEDULER_KEY, async_get_scheduler
+from .stats import BatteryStats
+from .trace import TICK_TRACE_SIZE, TickTrace
+from .sources import (
+    METER_HUB_KEY,
+    MeterReading,
+    async_get_meter_hub,
+    read_meter_event,
+)
+from .tariffs import TARIFF_CACHE_KEY, async_get_tariff_cache, tariff_sensor_id
+from .values import DEFAULT_BATTERY_DEGRADATION, BatteryValues
+from .simulation import (
+    INITIAL_SOC_RATIO,
+    BatteryConfig,
+    BatteryControls,
+    BatteryState,
+)
 
 BATTERY_CONFIG_SCHEMA = vol.Schema(
     vol.All(
@@ -131,6 +149,9 @@ BATTERY_CONFIG_SCHEMA = vol.Schema(
             vol.Optional(CONF_END_OF_LIFE_DEGRADATION, default=0.8): vol.All(
                 vol.Coerce(float), vol.Range(min=0, max=1)
             ),
+            vol.Optional(CONF_DEGRADATION_CURVE): vol.All(
+                cv.string, validate_degradation_config
+            ),
             vol.Optional(CONF_UPDATE_FREQUENCY, default=60): vol.All(
                 vol.Coerce(int), vol.Range(min=1)
             ),
@@ -138,6 +159,8 @@ BATTERY_CONFIG_SCHEMA = vol.Schema(
                 CONF_MINIMUM_USER_SELECTABLE_SOC,
                 default=DEFAULT_MINIMUM_USER_SELECTABLE_SOC,
             ): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+            vol.Optional(CONF_SHADOW_SCENARIOS): SHADOW_SCENARIOS_SCHEMA,
+            vol.Optional(CONF_TICK_JOURNAL, default=False): cv.boolean,
         },
     )
 )
@@ -149,10 +172,6 @@ CONFIG_SCHEMA = vol.Schema(
 _LOGGER = logging.getLogger(__name__)
 SERVICE_REGISTRATION_KEY = f"{DOMAIN}_services_registered"
 
-INITIAL_SOC_RATIO = 0.5
-DEFAULT_BATTERY_STATUS = "Normal"
-DEFAULT_BATTERY_DEGRADATION = 1.0
-
 
 async def async_setup(hass, config):
     """Set up battery platforms from a YAML."""
@@ -168,6 +187,8 @@ async def async_setup(hass, config):
             _LOGGER.warning("Battery name not unique - not able to create.")
             continue
         hass.data[DOMAIN][battery] = handle
+        await handle.async_restore()
+        handle._listeners.append(async_get_device_index(hass).async_add(handle))
 
         for platform in BATTERY_PLATFORMS:
             hass.async_create_task(
@@ -190,62 +211,36 @@ async def async_setup_entry(hass, entry) -> bool:
 
     handle = SimulatedBatteryHandle(entry.data, hass, entry.entry_id)
     hass.data[DOMAIN][entry.entry_id] = handle
+    await handle.async_update_journal()
+    await handle.async_restore()
+    handle._listeners.append(async_get_device_index(hass).async_add(handle))
 
     # Register service
+    def _get_handle_for_device_id(device_id):
+        """Return the simulated battery handle matching a Home Assistant device ID."""
+        return async_get_device_index(hass).async_get_handle(device_id)
+
     async def handle_set_charge(call):
         device_id = call.data.get("device_id")
         state = call.data.get("charge_state")
         _LOGGER.debug("Calling set_battery_charge_state with: %s", state)
 
-        # Lookup the device to get the correct handle
-        dev_reg = dr.async_get(hass)
-        device = dev_reg.async_get(device_id)
-        if not device:
-            _LOGGER.error("Device not found: %s", device_id)
+        handle_entry = _get_handle_for_device_id(device_id)
+        if handle_entry is None:
             return
-
-        # Match to correct handle by comparing identifiers
-        for handle_entry in hass.data[DOMAIN].values():
-            if handle_entry.matches_device_identifiers(device.identifiers):
-                handle_entry.async_set_battery_charge_state(state)
-                _LOGGER.debug("Battery charge updated for device %s", handle_entry.name)
-                break
-        else:
-            _LOGGER.error("No handle matched for device_id: %s", device_id)
-
-    def _get_handle_for_device_id(device_id):
-        """Return the simulated battery handle matching a Home Assistant device ID."""
-        dev_reg = dr.async_get(hass)
-        device = dev_reg.async_get(device_id)
-        if not device:
-            _LOGGER.error("Device not found: %s", device_id)
-            return None
-
-        for handle_entry in hass.data[DOMAIN].values():
-            if handle_entry.matches_device_identifiers(device.identifiers):
-                return handle_entry
-
-        _LOGGER.error("No handle matched for device_id: %s", device_id)
-        return None
+        handle_entry.async_set_battery_charge_state(state)
+        _LOGGER.debug("Battery charge updated for device %s", handle_entry.name)
 
     async def handle_set_cycles(call):
         device_id = call.data.get("device_id")
         cycles = call.data.get("battery_cycles")
         _LOGGER.debug("Calling set_battery_cycles with: %s", cycles)
 
-        dev_reg = dr.async_get(hass)
-        device = dev_reg.async_get(device_id)
-        if not device:
-            _LOGGER.error("Device not found: %s", device_id)
+        handle_entry = _get_handle_for_device_id(device_id)
+        if handle_entry is None:
             return
-
-        for handle_entry in hass.data[DOMAIN].values():
-            if handle_entry.matches_device_identifiers(device.identifiers):
-                handle_entry.async_set_battery_cycles(cycles)
-                _LOGGER.debug("Battery cycles updated for device %s", handle_entry.name)
-                break
-        else:
-            _LOGGER.error("No handle matched for device_id: %s", device_id)
+        handle_entry.async_set_battery_cycles(cycles)
+        _LOGGER.debug("Battery cycles updated for device %s", handle_entry.name)
 
     async def handle_get_efficiency(call):
         device_id = call.data.get("device_id")
@@ -274,26 +269,84 @@ async def async_setup_entry(hass, entry) -> bool:
             "efficiency": efficiency,
         }
 
+    async def handle_get_scenario_results(call):
+        device_id = call.data.get("device_id")
+
+        handle_entry = _get_handle_for_device_id(device_id)
+        if handle_entry is None:
+            return {
+                "success": False,
+                "error": f"No simulated battery found for device_id {device_id}",
+            }
+        scenarios = handle_entry._scenarios
+        return {
+            "success": True,
+            "device_id": device_id,
+            "battery": handle_entry.name,
+            "ticks": scenarios.ticks if scenarios is not None else 0,
+            "scenarios": scenarios.results() if scenarios is not None else [],
+        }
+
+    async def handle_get_recent_ticks(call):
+        device_id = call.data.get("device_id")
+        count = call.data.get("count")
+
+        handle_entry = _get_handle_for_device_id(device_id)
+        if handle_entry is None:
+            return {
+                "success": False,
+                "error": f"No simulated battery found for device_id {device_id}",
+            }
+        columns = handle_entry._trace.columns(count)
+        return {
+            "success": True,
+            "device_id": device_id,
+            "battery": handle_entry.name,
+            "ticks": len(columns["time"]),
+            "columns": columns,
+        }
+
+    async def handle_backfill_statistics(call):
+        device_id = call.data.get("device_id")
+        start = call.data["start"]
+        end = call.data.get("end") or dt_util.utcnow()
+        source = call.data.get("source", STATES)
+        _LOGGER.debug(
+            "Calling backfill_statistics from %s to %s using %s", start, end, source
+        )
+
+        handle_entry = _get_handle_for_device_id(device_id)
+        if handle_entry is None:
+            return {
+                "success": False,
+                "error": f"No simulated battery found for device_id {device_id}",
+            }
+        backfill = await async_backfill_statistics(
+            hass,
+            handle_entry._config,
+            dt_util.as_utc(start).timestamp(),
+            dt_util.as_utc(end).timestamp(),
+            source,
+        )
+        return {
+            "success": True,
+            "device_id": device_id,
+            "battery": handle_entry.name,
+            "hours": backfill.hours,
+            "ticks": backfill.replay.ticks,
+            "statistic_ids": backfill.statistic_ids,
+        }
+
     async def handle_set_stored_energy_value(call):
         device_id = call.data.get("device_id")
         stored_energy_value = call.data.get("stored_energy_value")
         _LOGGER.debug("Calling set_stored_energy_value with: %s", stored_energy_value)
 
-        dev_reg = dr.async_get(hass)
-        device = dev_reg.async_get(device_id)
-        if not device:
-            _LOGGER.error("Device not found: %s", device_id)
+        handle_entry = _get_handle_for_device_id(device_id)
+        if handle_entry is None:
             return
-
-        for handle_entry in hass.data[DOMAIN].values():
-            if handle_entry.matches_device_identifiers(device.identifiers):
-                handle_entry.async_set_stored_energy_value(stored_energy_value)
-                _LOGGER.debug(
-                    "Stored energy value updated for device %s", handle_entry.name
-                )
-                break
-        else:
-            _LOGGER.error("No handle matched for device_id: %s", device_id)
+        handle_entry.async_set_stored_energy_value(stored_energy_value)
+        _LOGGER.debug("Stored energy value updated for device %s", handle_entry.name)
 
     if not hass.data.get(SERVICE_REGISTRATION_KEY):
         hass.services.async_register(
@@ -328,6 +381,40 @@ async def async_setup_entry(hass, entry) -> bool:
             supports_response=SupportsResponse.ONLY,
         )
 
+        hass.services.async_register(
+            DOMAIN,
+            "get_scenario_results",
+            handle_get_scenario_results,
+            schema=vol.Schema({vol.Required("device_id"): str}),
+            supports_response=SupportsResponse.ONLY,
+        )
+
+        hass.services.async_register(
+            DOMAIN,
+            "get_recent_ticks",
+            handle_get_recent_ticks,
+            schema=vol.Schema({
+                vol.Required("device_id"): str,
+                vol.Optional("count"): vol.All(
+                    vol.Coerce(int), vol.Range(min=1, max=TICK_TRACE_SIZE)
+                ),
+            }),
+            supports_response=SupportsResponse.ONLY,
+        )
+
+        hass.services.async_register(
+            DOMAIN,
+            "backfill_statistics",
+            handle_backfill_statistics,
+            schema=vol.Schema({
+                vol.Required("device_id"): str,
+                vol.Required("start"): cv.datetime,
+                vol.Optional("end"): cv.datetime,
+                vol.Optional("source", default=STATES): vol.In([STATES, STATISTICS]),
+            }),
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+
         hass.services.async_register(
             DOMAIN,
             "set_stored_energy_value",
@@ -377,11 +464,46 @@ def _log_leftover_registry_entries(hass, entry):
         )
 
 
+def _config_inputs(config):
+    """Return the meter inputs of a battery config."""
+    if CONF_INPUT_LIST in config:
+        return config[CONF_INPUT_LIST]
+    # Needed for backwards compatability
+    return generate_input_list(config=config)
+
+
+def _entities_changed(old_config, new_config) -> bool:
+    """Return True when a config change adds, removes or renames entities."""
+
+    def meters(config):
+        return [
+            (
+                input_details[SENSOR_ID],
+                input_details[SENSOR_TYPE],
+                input_details[SIMULATED_SENSOR],
+            )
+            for input_details in _config_inputs(config)
+        ]
+
+    return (
+        old_config[CONF_NAME] != new_config[CONF_NAME]
+        or old_config.get(CONF_SOLAR_ENERGY_SENSOR)
+        != new_config.get(CONF_SOLAR_ENERGY_SENSOR)
+        or meters(old_config) != meters(new_config)
+    )
+
+
 async def async_update_settings(hass, entry):
-    _LOGGER.warning(f"Config change detected {entry.data[CONF_NAME]}")
+    """Apply a config change, reloading only when the battery's entities change."""
     _log_leftover_registry_entries(hass, entry)
-    await hass.config_entries.async_reload(entry.entry_id)
-    return
+    handle = hass.data[DOMAIN][entry.entry_id]
+    if _entities_changed(handle._config, entry.data):
+        _LOGGER.warning(f"Config change detected {entry.data[CONF_NAME]}")
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    _LOGGER.debug("Applying config change to %s", entry.data[CONF_NAME])
+    handle.async_apply_settings(entry.data)
+    await handle.async_update_journal()
 
 
 async def async_unload_entry(hass, config_entry):
@@ -398,6 +520,8 @@ async def async_unload_entry(hass, config_entry):
 
     """Remove listeners"""
     handle = hass.data[DOMAIN][config_entry.entry_id]
+    await handle._checkpoint.async_save()
+    await handle.async_stop_journal()
     for listener in handle._listeners:
         if listener is not None:
             outcome = listener()
@@ -414,13 +538,28 @@ async def async_unload_entry(hass, config_entry):
             hass.services.async_remove(DOMAIN, "set_battery_charge_state")
             hass.services.async_remove(DOMAIN, "set_battery_cycles")
             hass.services.async_remove(DOMAIN, "get_efficiency")
+            hass.services.async_remove(DOMAIN, "get_scenario_results")
+            hass.services.async_remove(DOMAIN, "get_recent_ticks")
+            hass.services.async_remove(DOMAIN, "backfill_statistics")
             hass.services.async_remove(DOMAIN, "set_stored_energy_value")
             hass.data.pop(SERVICE_REGISTRATION_KEY, None)
+            hass.data.pop(DEVICE_INDEX_KEY, None)
+            hass.data.pop(METER_HUB_KEY, None)
+            hass.data.pop(SCHEDULER_KEY, None)
+            hass.data.pop(TARIFF_CACHE_KEY, None)
             hass.data.pop(DOMAIN, None)
 
     return unload_ok
 
 
+async def async_remove_entry(hass, entry):
+    """Delete the checkpoint and tick journal of a removed battery."""
+    await BatteryCheckpoint(hass, entry.entry_id).async_remove()
+    await hass.async_add_executor_job(
+        remove_journal, journal_directory(hass, entry.entry_id)
+    )
+
+
 class SimulatedBatteryHandle:
     """Representation of the battery itself."""
 
@@ -439,9 +578,9 @@ class SimulatedBatteryHandle:
     def get_efficiency(self, efficiency_type, power_level):
         """Return configured charge or discharge efficiency at the given power level."""
         if efficiency_type == "charge":
-            curve = self._battery_charge_efficiency_curve
+            curve = self._battery_config.charge_efficiency_curve
         elif efficiency_type == "discharge":
-            curve = self._battery_discharge_efficiency_curve
+            curve = self._battery_config.discharge_efficiency_curve
         else:
             _LOGGER.error(
                 "Invalid efficiency_type '%s' passed to get_efficiency; expected 'charge' or 'discharge'",
@@ -461,32 +600,22 @@ class SimulatedBatteryHandle:
         self._date_recording_started = dt_util.now().isoformat()
         self._name = config[CONF_NAME]
         self._sensor_collection: list = []
+        self._publisher = BatteryStatePublisher(hass, self)
         self._charging: bool = False
         self._accumulated_import_reading: float = 0.0
         self._last_battery_update_time = dt_util.utcnow().timestamp()
-        # Periodic update cadence (seconds). Falls back to 60 for backwards compatibility.
-        self._update_frequency = config.get(CONF_UPDATE_FREQUENCY, 60)
         self._max_discharge: float = 0.0
         # Monetary book value of the energy currently held in the simulated battery.
         # This is tracked separately from published savings counters.
         self._stored_energy_value: float = 0.0
-        self._pending_restored_average_energy_value: float | None = None
-        self._battery_charge_state_restore_complete: bool = False
+        self._listeners = []
+        self._tariff_listeners = []
+        self._listeners.append(self._async_untrack_tariffs)
+        self._unsub_periodic_update = None
+        self._load_settings(config)
 
         self._charge_limit = config[CONF_BATTERY_MAX_CHARGE_RATE]
         self._discharge_limit = config[CONF_BATTERY_MAX_DISCHARGE_RATE]
-        self._minimum_user_selectable_soc: float = min(
-            max(
-                float(
-                    config.get(
-                        CONF_MINIMUM_USER_SELECTABLE_SOC,
-                        DEFAULT_MINIMUM_USER_SELECTABLE_SOC,
-                    )
-                ),
-                0.0,
-            ),
-            1.0,
-        )
         self._minimum_soc: float = self.minimum_user_selectable_soc_percentage
         self._maximum_soc: float = 100
         self._charge_state: float = config[CONF_BATTERY_SIZE] * INITIAL_SOC_RATIO
@@ -495,35 +624,36 @@ class SimulatedBatteryHandle:
         self._last_import_reading_sensor_data = None
         self._last_export_reading_sensor_data = None
         self._solar_entity_id = config.get(CONF_SOLAR_ENERGY_SENSOR)
-        self._nominal_inverter_power = config.get(CONF_NOMINAL_INVERTER_POWER)
-        self._listeners = []
         self._pending_update_cancel = None
-
-        self._battery_size = config[CONF_BATTERY_SIZE]
-        self._rated_battery_cycles = config.get(CONF_RATED_BATTERY_CYCLES, 6000.0)
-        self._end_of_life_degradation = config.get(CONF_END_OF_LIFE_DEGRADATION, 0.8)
-        if self._charge_state > self._battery_size:
-            self._charge_state = self._battery_size
-        self._max_discharge_rate = config[CONF_BATTERY_MAX_DISCHARGE_RATE]
-        self._max_charge_rate = config[CONF_BATTERY_MAX_CHARGE_RATE]
-        default_discharge_efficiency = config.get(CONF_BATTERY_EFFICIENCY, 1.0)
-        self._battery_discharge_efficiency = config.get(
-            CONF_BATTERY_DISCHARGE_EFFICIENCY, default_discharge_efficiency
-        )
-        self._battery_charge_efficiency = config.get(
-            CONF_BATTERY_CHARGE_EFFICIENCY, default_discharge_efficiency
-        )
-        self._battery_discharge_efficiency_curve = parse_efficiency_curve(
-            self._battery_discharge_efficiency
+        self._checkpoint = BatteryCheckpoint(
+            hass, checkpoint_key(self), self.checkpoint_data
         )
-        self._battery_charge_efficiency_curve = parse_efficiency_curve(
-            self._battery_charge_efficiency
-        )
-        if CONF_INPUT_LIST in config:
-            self._inputs = config[CONF_INPUT_LIST]
-        else:
-            """Needed for backwards compatability"""
-            self._inputs = generate_input_list(config=config)
+        self._listeners.append(self._checkpoint.async_cancel)
+        # Display sensors with a restored or synced value, and their last resets.
+        self._restored_sensors: set[str] = set()
+        self._last_resets: dict = {}
+        self._stats = BatteryStats()
+        self._trace = TickTrace()
+
+        if self._charge_state > self._battery_config.battery_size:
+            self._charge_state = self._battery_config.battery_size
+        # Net grid power over the last update in kW, import positive.
+        self._last_grid_power: float = 0.0
+        # Alternative configurations simulated alongside from the same meters.
+        self._scenarios = ScenarioBank.from_config(config)
+        # The handle owns its inputs, so tariff changes can be applied to the
+        # same dicts the meter subscriptions were made with.
+        self._inputs = [dict(input_details) for input_details in _config_inputs(config)]
+        # Inputs keyed by meter entity id, so readings need no scan of inputs.
+        self._inputs_by_sensor_id: dict[str, dict] = {}
+        for input_details in self._inputs:
+            self._inputs_by_sensor_id.setdefault(
+                input_details[SENSOR_ID], input_details
+            )
+        self._meter_hub = async_get_meter_hub(hass)
+        self._scheduler = async_get_scheduler(hass)
+        self._tariff_cache = async_get_tariff_cache(hass)
+        self._async_track_tariffs()
 
         self._switches: dict = {
             PAUSE_BATTERY: False,
@@ -531,32 +661,23 @@ class SimulatedBatteryHandle:
         self._battery_mode = DEFAULT_MODE
 
         default_charge_efficiency = self._safe_curve_efficiency(
-            self._battery_charge_efficiency_curve
+            self._battery_config.charge_efficiency_curve
         )
         default_discharge_efficiency = self._safe_curve_efficiency(
-            self._battery_discharge_efficiency_curve
+            self._battery_config.discharge_efficiency_curve
         )
-        self._sensors: dict = {
-            ATTR_ENERGY_SAVED: 0.0,
-            ATTR_ENERGY_BATTERY_OUT: 0.0,
-            ATTR_ENERGY_BATTERY_IN: 0.0,
-            CHARGING_RATE: 0.0,
-            DISCHARGING_RATE: 0.0,
-            SOLAR_POWER_CAP: 0.0,
-            ATTR_MONEY_SAVED: 0.0,
-            ATTR_AVERAGE_ENERGY_VALUE: 0.0,
-            BATTERY_MODE: MODE_IDLE,
-            ATTR_STATUS: DEFAULT_BATTERY_STATUS,
-            ATTR_MONEY_SAVED_IMPORT: 0.0,
-            ATTR_MONEY_SAVED_EXPORT: 0.0,
-            BATTERY_CYCLES: 0.0,
-            BATTERY_DEGRADATION: DEFAULT_BATTERY_DEGRADATION,
-            ATTR_LAST_CHARGE_EFFICIENCY: default_charge_efficiency,
-            ATTR_LAST_DISCHARGE_EFFICIENCY: default_discharge_efficiency,
-        }
-        for input_details in self._inputs:
-            self._sensors[input_details[SIMULATED_SENSOR]] = 0.0
+        self._sensors = BatteryValues(
+            [input_details[SIMULATED_SENSOR] for input_details in self._inputs],
+            default_charge_efficiency,
+            default_discharge_efficiency,
+        )
+        # Last real meter reading behind each simulated sensor, in kWh.
+        self._meter_readings: dict[str, float] = {}
 
+        self._async_setup_listeners()
+
+    def _async_setup_listeners(self):
+        """Start tracking sources once Home Assistant runs and listen for resets."""
         async_at_start(self._hass, self.async_source_tracking)
 
         self._listeners.append(
@@ -567,18 +688,137 @@ class SimulatedBatteryHandle:
             )
         )
 
+    def _load_settings(self, config):
+        """Read the settings that can change without changing the entities."""
+        self._config = config
+        # Periodic update cadence (seconds). Falls back to 60 for backwards compatibility.
+        self._update_frequency = config.get(CONF_UPDATE_FREQUENCY, 60)
+        # Size, rates, curves and ageing are only kept here, as the kernel
+        # reads them.
+        self._battery_config = BatteryConfig.from_config(config)
+        # The change of the grid power that brings the next update forward.
+        self._power_change_threshold = ADAPTIVE_POWER_CHANGE_FRACTION * max(
+            self._battery_config.max_charge_rate,
+            self._battery_config.max_discharge_rate,
+        )
+        # The efficiencies as configured, curves are kept as text.
+        default_discharge_efficiency = config.get(CONF_BATTERY_EFFICIENCY, 1.0)
+        self._battery_discharge_efficiency = config.get(
+            CONF_BATTERY_DISCHARGE_EFFICIENCY, default_discharge_efficiency
+        )
+        self._battery_charge_efficiency = config.get(
+            CONF_BATTERY_CHARGE_EFFICIENCY, default_discharge_efficiency
+        )
+        # Degradation and capacity are derived again once the cycles differ
+        # from these.
+        self._capacity_cycles: float | None = None
+        self._degradation = DEFAULT_BATTERY_DEGRADATION
+        self._max_capacity = self._battery_config.battery_size
+
+    def _async_track_tariffs(self):
+        """Track the tariff sensors of the inputs."""
+        for input_details in self._inputs:
+            entity_id = tariff_sensor_id(input_details)
+            if entity_id is not None:
+                self._tariff_listeners.append(self._tariff_cache.async_track(entity_id))
+
+    @callback
+    def _async_untrack_tariffs(self):
+        """Stop tracking the tariff sensors of the inputs."""
+        for unsub in self._tariff_listeners:
+            unsub()
+        self._tariff_listeners.clear()
+
+    @callback
+    def async_apply_settings(self, config):
+        """Apply changed settings to the running battery.
+
+        Covers everything that leaves the entities as they are: battery size,
+        rates, efficiency curves, ageing, tariffs, the update frequency and the
+        minimum selectable SoC. Charge, totals and the readings accumulated
+        since the last update carry on; the charge is only clipped to a
+        smaller capacity.
+        """
+        previous_charge_state = max(float(self._charge_state), 0.0)
+        previous_max_capacity = self.current_max_capacity
+        previous_battery_config = self._battery_config
+        previous_update_frequency = self._update_frequency
+        self._load_settings(config)
+        battery_config = self._battery_config
+
+        # Limits left at the maximum rate follow it; lower ones are kept
+        # within the new rate.
+        if self._charge_limit >= previous_battery_config.max_charge_rate:
+            self._charge_limit = battery_config.max_charge_rate
+        else:
+            self._charge_limit = min(
+                self._charge_limit, battery_config.max_charge_rate
+            )
+        if self._discharge_limit >= previous_battery_config.max_discharge_rate:
+            self._discharge_limit = battery_config.max_discharge_rate
+        else:
+            self._discharge_limit = min(
+                self._discharge_limit, battery_config.max_discharge_rate
+            )
+        self._minimum_soc = max(
+            float(self._minimum_soc), self.minimum_user_selectable_soc_percentage
+        )
+        self._sensors[BATTERY_DEGRADATION] = self.degradation_factor
+        self._charge_state = min(float(self._charge_state), self.current_max_capacity)
+        self._rescale_stored_energy_value_for_charge_state_change(
+            previous_charge_state,
+            max(float(self._charge_state), 0.0),
+            previous_max_capacity,
+            self.current_max_capacity,
+        )
+
+        for input_details, new_input_details in zip(
+            self._inputs, _config_inputs(config)
+        ):
+            input_details.update(new_input_details)
+        self._async_untrack_tariffs()
+        self._async_track_tariffs()
+
+        # Scenarios start over only when the configurations they simulate changed.
+        scenarios = ScenarioBank.from_config(config)
+        if (
+            scenarios is None
+            or self._scenarios is None
+            or (scenarios.configs, scenarios.names)
+            != (self._scenarios.configs, self._scenarios.names)
+        ):
+            self._scenarios = scenarios
+
+        if (
+            self._unsub_periodic_update is not None
+            and self._update_frequency != previous_update_frequency
+        ):
+            self._unsub_periodic_update()
+            self._unsub_periodic_update = self._scheduler.async_track_interval(
+                int(self._update_frequency), self.async_periodic_update
+            )
+
+        self._publisher.async_invalidate()
+        self._async_publish_update()
+
     @property
     def device_identifier(self):
         """Return a stable identifier tuple used for device registry linking."""
         return (DOMAIN, self._entry_id or self._name)
 
+    @property
+    def known_device_identifiers(self):
+        """Return every device identifier that belongs to this handle."""
+        return frozenset(
+            {
+                self.device_identifier,
+                (DOMAIN, self._name),  # Backward compatibility for existing devices.
+            }
+        )
+
     def matches_device_identifiers(self, identifiers):
         """Return true when any known identifier matches this handle."""
-        known_identifiers = {
-            self.device_identifier,
-            (DOMAIN, self._name),  # Backward compatibility for existing devices.
-        }
-        return bool(known_identifiers.intersection(identifiers))
+        return not self.known_device_identifiers.isdisjoint(identifiers)
 
     def _minimum_user_selectable_energy(
         self, max_capacity: float | None = None
@@ -588,7 +828,7 @@ class SimulatedBatteryHandle:
             max_capacity = self.current_max_capacity
         return max(
             max(float(max_capacity), 0.0)
-            * float(self._minimum_user_selectable_soc),
+            * self._battery_config.minimum_user_selectable_soc,
             0.0,
         )
 
@@ -609,10 +849,10 @@ class SimulatedBatteryHandle:
         """
         if charge_state is None:
             charge_state = self._charge_state
-        return max(
-            max(float(charge_state), 0.0)
-            - self._minimum_user_selectable_energy(max_capacity),
-            0.0,
+        if max_capacity is None:
+            max_capacity = self.current_max_capacity
+        return simulation.value_accounting_energy(
+            self._battery_config, float(charge_state), float(max_capacity)
         )
 
     @property
@@ -637,22 +877,6 @@ class SimulatedBatteryHandle:
             self._stored_energy_value / value_accounting_energy
         )
 
-    def _finalize_average_energy_value_restore(self) -> None:
-        """Finalize stored-value restoration after battery SoC is available."""
-        if not self._battery_charge_state_restore_complete:
-            return
-
-        if self._pending_restored_average_energy_value is not None:
-            value_accounting_energy = self._value_accounting_energy()
-            self._stored_energy_value = (
-                self._pending_restored_average_energy_value * value_accounting_energy
-                if value_accounting_energy > 0.000001
-                else 0.0
-            )
-            self._pending_restored_average_energy_value = None
-
-        self._update_average_energy_value_sensor()
-
     def _rescale_stored_energy_value_for_charge_state_change(
         self,
         previous_charge_state: float,
@@ -671,27 +895,255 @@ class SimulatedBatteryHandle:
         physical floor. When maximum capacity changes, the physical floor moves
         with it, so callers may pass the old and new capacities explicitly.
         """
-        previous_value_accounting_energy = self._value_accounting_energy(
-            previous_charge_state, previous_max_capacity
-        )
-        new_value_accounting_energy = self._value_accounting_energy(
-            new_charge_state, new_max_capacity
+        if previous_max_capacity is None:
+            previous_max_capacity = self.current_max_capacity
+        if new_max_capacity is None:
+            new_max_capacity = self.current_max_capacity
+        self._stored_energy_value = simulation.rescale_stored_energy_value(
+            self._battery_config,
+            self._stored_energy_value,
+            float(previous_charge_state),
+            float(new_charge_state),
+            float(previous_max_capacity),
+            float(new_max_capacity),
         )
 
-        if new_value_accounting_energy <= 0.000001:
-            self._stored_energy_value = 0.0
-        elif previous_value_accounting_energy > 0.000001:
-            self._stored_energy_value *= (
-                new_value_accounting_energy / previous_value_accounting_energy
+        self._update_average_energy_value_sensor()
+
+    def checkpoint_data(self) -> dict:
+        """Return the checkpoint of everything that must survive a restart."""
+        return {
+            checkpoint.CHARGE_STATE: float(self._charge_state),
+            checkpoint.LAST_UPDATE: self._last_battery_update_time,
+            checkpoint.STORED_ENERGY_VALUE: float(self._stored_energy_value),
+            checkpoint.DATE_RECORDING_STARTED: self._date_recording_started,
+            checkpoint.SENSORS: {
+                key: value
+                for key, value in self._sensors.items()
+                if isinstance(value, (int, float))
+            },
+            checkpoint.LAST_RESETS: {
+                key: value.isoformat() for key, value in self._last_resets.items()
+            },
+            checkpoint.MODE: self._battery_mode,
+            checkpoint.SWITCHES: dict(self._switches),
+            checkpoint.SLIDERS: {
+                key: self.get_slider_limit(key) for key in checkpoint.SLIDER_KEYS
+            },
+        }
+
+    def apply_checkpoint(self, data: dict) -> None:
+        """Restore the battery from a checkpoint, skipping invalid values."""
+        for key, value in data.get(checkpoint.SENSORS, {}).items():
+            if key not in self._sensors or isinstance(self._sensors[key], str):
+                continue
+            try:
+                self._sensors[key] = float(value)
+            except (TypeError, ValueError):
+                _LOGGER.debug(
+                    "Sensor state '%s' not restored properly for '%s'.", value, key
+                )
+                continue
+            self._restored_sensors.add(key)
+
+        # Cycles are restored first, so the charge is clipped to the degraded capacity.
+        if checkpoint.CHARGE_STATE in data:
+            try:
+                self._charge_state = min(
+                    float(data[checkpoint.CHARGE_STATE]), self.current_max_capacity
+                )
+            except (TypeError, ValueError):
+                _LOGGER.debug(
+                    "Battery state '%s' not restored properly for '%s'.",
+                    data[checkpoint.CHARGE_STATE],
+                    self._name,
+                )
+        if data.get(checkpoint.LAST_UPDATE) is not None:
+            # Kept rather than reset to now, so the time the battery was down
+            # is caught up on instead of lost.
+            self._last_battery_update_time = min(
+                float(data[checkpoint.LAST_UPDATE]), self._last_battery_update_time
+            )
+        if checkpoint.DATE_RECORDING_STARTED in data:
+            self._date_recording_started = data[checkpoint.DATE_RECORDING_STARTED]
+
+        if data.get(checkpoint.STORED_ENERGY_VALUE) is not None:
+            self._stored_energy_value = float(data[checkpoint.STORED_ENERGY_VALUE])
+        elif ATTR_AVERAGE_ENERGY_VALUE in self._restored_sensors:
+            # States saved before the stored value was kept only carry the
+            # average, so the total is rebuilt from the restored charge.
+            self._stored_energy_value = (
+                self._sensors[ATTR_AVERAGE_ENERGY_VALUE]
+                * self._value_accounting_energy()
             )
+        self._update_average_energy_value_sensor()
+
+        for key, value in data.get(checkpoint.LAST_RESETS, {}).items():
+            parsed_last_reset = dt_util.parse_datetime(str(value))
+            if parsed_last_reset is not None:
+                self._last_resets[key] = dt_util.as_utc(parsed_last_reset)
+
+        mode = data.get(checkpoint.MODE)
+        if mode in BATTERY_MODES:
+            self._battery_mode = mode
+        elif mode is not None:
+            _LOGGER.warning(
+                "Ignoring invalid restored battery mode '%s' for '%s'.",
+                mode,
+                self._name,
+            )
+        for key, value in data.get(checkpoint.SWITCHES, {}).items():
+            if key in self._switches:
+                self._switches[key] = bool(value)
+        for key, value in data.get(checkpoint.SLIDERS, {}).items():
+            if key in checkpoint.SLIDER_KEYS and value is not None:
+                self.set_slider_limit(float(value), key)
+
+    async def async_update_journal(self) -> None:
+        """Open or close the tick journal as the settings ask."""
+        if not self._config.get(CONF_TICK_JOURNAL):
+            await self.async_stop_journal()
+            return
+        if self._trace.journal is not None:
+            return
+        journal = TickJournal(
+            self._hass, journal_directory(self._hass, checkpoint_key(self))
+        )
+        try:
+            await journal.async_open()
+        except OSError as err:
+            _LOGGER.error("(%s) Could not open the tick journal: %s", self._name, err)
+            return
+        self._trace.journal = journal
+
+    async def async_stop_journal(self) -> None:
+        """Close the tick journal, if it is open."""
+        journal = self._trace.journal
+        if journal is None:
+            return
+        self._trace.journal = None
+        await journal.async_close()
+
+    async def async_restore(self) -> None:
+        """Restore the battery from its checkpoint before its entities are added."""
+        data = await self._checkpoint.async_load()
+        if data is None:
+            data = legacy_checkpoint(self._hass, self)
+            if data is not None:
+                _LOGGER.debug(
+                    "(%s) Moving restored entity states into a checkpoint", self._name
+                )
+                self._checkpoint.async_schedule_save()
+        if data is not None:
+            self.apply_checkpoint(data)
         else:
-            # There is no existing priced usable energy to preserve when the
-            # battery changes from below the physical floor to above it through
-            # an external SoC adjustment. Treat the newly introduced usable
-            # energy as unvalued.
-            self._stored_energy_value = 0.0
+            _LOGGER.debug("No checkpoint - presume new battery.")
 
-        self._update_average_energy_value_sensor()
+        for input_details in self._inputs:
+            sensor_key = input_details[SIMULATED_SENSOR]
+            if sensor_key not in self._restored_sensors:
+                # New simulated grid meters start in sync with their source
+                # entities, exactly like a battery reset does.
+                self.reset_sim_sensor(sensor_key)
+                self._restored_sensors.add(sensor_key)
+
+        await self._async_catch_up()
+
+    async def _async_catch_up(self) -> None:
+        """Replay the meter history recorded since the last update.
+
+        After a restart the recorder may hold readings from after the last
+        update, for example when only the integration was down. They are read
+        and applied at the update frequency in the recorder executor before
+        the battery goes live. Energy the meters report later for the rest of
+        the gap is spread over the whole gap by the first live update.
+        """
+        end_time = dt_util.utcnow().timestamp()
+        start_time = self._last_battery_update_time
+        if (
+            end_time - start_time <= self._update_frequency
+            or "recorder" not in self._hass.config.components
+        ):
+            return
+        from homeassistant.components.recorder import get_instance
+
+        # Until live readings name one, the gap's energy goes to the simulated
+        # sensors of the first import and export input.
+        if self._last_import_reading_sensor_data is None:
+            self._last_import_reading_sensor_data = next(
+                (
+                    input_details
+                    for input_details in self._inputs
+                    if input_details[SENSOR_TYPE] == IMPORT
+                ),
+                None,
+            )
+        if self._last_export_reading_sensor_data is None:
+            self._last_export_reading_sensor_data = next(
+                (
+                    input_details
+                    for input_details in self._inputs
+                    if input_details[SENSOR_TYPE] == EXPORT
+                ),
+                None,
+            )
+        recorder = get_instance(self._hass)
+        try:
+            history = RecorderHistory(
+                recorder_database_path(recorder.db_url),
+                self._config,
+                start_time,
+                end_time,
+                interval_s=self._update_frequency,
+                baseline=True,
+            )
+            ticks = await recorder.async_add_executor_job(
+                self._fast_forward,
+                history.samples(),
+                end_time,
+                self.get_tariff_information(self._last_import_reading_sensor_data),
+                self.get_tariff_information(self._last_export_reading_sensor_data),
+            )
+        except (HomeAssistantError, sqlite3.Error) as err:
+            _LOGGER.warning(
+                "(%s) Could not catch up on the recorded meter history: %s",
+                self._name,
+                err,
+            )
+            return
+        self._stats.caught_up_ticks += ticks
+        _LOGGER.debug(
+            "(%s) Caught up %s ticks over %.0f seconds",
+            self._name,
+            ticks,
+            end_time - start_time,
+        )
+
+    def _fast_forward(
+        self, samples, end_time: float, import_tariff, export_tariff
+    ) -> int:
+        """Apply recorded samples as ticks and return how many there were.
+
+        Runs in an executor before the battery goes live, so nothing else
+        touches the handle meanwhile. Samples without a recorded tariff use
+        the given ones.
+        """
+        ticks = 0
+        for sample in samples:
+            self._apply_tick(
+                sample.import_amount,
+                sample.export_amount,
+                sample.solar_amount,
+                min(sample.timestamp, end_time),
+                sample.import_tariff
+                if sample.import_tariff is not None
+                else import_tariff,
+                sample.export_tariff
+                if sample.export_tariff is not None
+                else export_tariff,
+            )
+            ticks += 1
+        return ticks
 
     def async_set_battery_charge_state(self, state: float):
         """Set the battery state of charge while preserving its average energy value."""
@@ -710,7 +1162,7 @@ class SimulatedBatteryHandle:
             previous_charge_state,
             new_charge_state,
         )
-        dispatcher_send(self._hass, f"{self._name}-{MESSAGE_TYPE_BATTERY_UPDATE}")
+        self._async_publish_update()
         return
 
     def async_set_stored_energy_value(self, stored_energy_value: float):
@@ -718,7 +1170,7 @@ class SimulatedBatteryHandle:
         _LOGGER.debug("Set stored energy value")
         self._stored_energy_value = float(stored_energy_value)
         self._update_average_energy_value_sensor()
-        dispatcher_send(self._hass, f"{self._name}-{MESSAGE_TYPE_BATTERY_UPDATE}")
+        self._async_publish_update()
         return
 
     def async_set_battery_cycles(self, cycles: float):
@@ -726,8 +1178,8 @@ class SimulatedBatteryHandle:
         previous_charge_state = max(float(self._charge_state), 0.0)
         previous_max_capacity = self.current_max_capacity
         self._sensors[BATTERY_CYCLES] = max(float(cycles), 0.0)
-        self._sensors[ATTR_ENERGY_BATTERY_IN] = self._sensors[BATTERY_CYCLES] * float(
-            self._battery_size
+        self._sensors[ATTR_ENERGY_BATTERY_IN] = (
+            self._sensors[BATTERY_CYCLES] * self._battery_config.battery_size
         )
         self._sensors[BATTERY_DEGRADATION] = self.degradation_factor
         self._charge_state = min(float(self._charge_state), self.current_max_capacity)
@@ -739,7 +1191,7 @@ class SimulatedBatteryHandle:
             self.current_max_capacity,
         )
 
-        dispatcher_send(self._hass, f"{self._name}-{MESSAGE_TYPE_BATTERY_UPDATE}")
+        self._async_publish_update()
         return
 
     def async_reset_battery(self):
@@ -751,33 +1203,20 @@ class SimulatedBatteryHandle:
         self._charge_state = self.current_max_capacity * INITIAL_SOC_RATIO
 
         default_charge_efficiency = self._safe_curve_efficiency(
-            self._battery_charge_efficiency_curve
+            self._battery_config.charge_efficiency_curve
         )
         default_discharge_efficiency = self._safe_curve_efficiency(
-            self._battery_discharge_efficiency_curve
+            self._battery_config.discharge_efficiency_curve
         )
 
-        self._sensors[ATTR_ENERGY_SAVED] = 0.0
-        self._sensors[ATTR_MONEY_SAVED] = 0.0
+        self._sensors.reset(default_charge_efficiency, default_discharge_efficiency)
         self._stored_energy_value = 0.0
-        self._sensors[ATTR_AVERAGE_ENERGY_VALUE] = 0.0
-        self._sensors[ATTR_ENERGY_BATTERY_OUT] = 0.0
-        self._sensors[ATTR_ENERGY_BATTERY_IN] = 0.0
-        self._sensors[CHARGING_RATE] = 0.0
-        self._sensors[DISCHARGING_RATE] = 0.0
-        self._sensors[BATTERY_MODE] = MODE_IDLE
-        self._sensors[ATTR_STATUS] = DEFAULT_BATTERY_STATUS
-        self._sensors[ATTR_MONEY_SAVED_IMPORT] = 0.0
-        self._sensors[ATTR_MONEY_SAVED_EXPORT] = 0.0
-        self._sensors[BATTERY_CYCLES] = 0.0
-        self._sensors[BATTERY_DEGRADATION] = DEFAULT_BATTERY_DEGRADATION
-        self._sensors[ATTR_LAST_CHARGE_EFFICIENCY] = default_charge_efficiency
-        self._sensors[ATTR_LAST_DISCHARGE_EFFICIENCY] = default_discharge_efficiency
-        self._sensors[SOLAR_POWER_CAP] = 0.0
         self._accumulated_solar_reading = 0.0
+        if self._scenarios is not None:
+            self._scenarios.reset()
 
         self._date_recording_started = dt_util.now().isoformat()
-        dispatcher_send(self._hass, f"{self._name}-{MESSAGE_TYPE_BATTERY_UPDATE}")
+        self._async_publish_update()
         return
 
     def reset_sim_sensor(self, target_sensor_key):
@@ -796,7 +1235,8 @@ class SimulatedBatteryHandle:
             ]:
                 continue
             units = source_state.attributes.get(ATTR_UNIT_OF_MEASUREMENT)
-            if units not in [UnitOfEnergy.KILO_WATT_HOUR, UnitOfEnergy.WATT_HOUR]:
+            conversion_factor = ENERGY_UNIT_CONVERSION_FACTORS.get(units)
+            if conversion_factor is None:
                 _LOGGER.warning(
                     "(%s) Cannot sync %s to source %s: unsupported energy unit "
                     "'%s'; expected kWh or Wh",
@@ -806,7 +1246,6 @@ class SimulatedBatteryHandle:
                     units,
                 )
                 continue
-            conversion_factor = 1.0 if units == UnitOfEnergy.KILO_WATT_HOUR else 0.001
             try:
                 self._sensors[target_sensor_key] = (
                     float(source_state.state) * conversion_factor
@@ -820,171 +1259,195 @@ class SimulatedBatteryHandle:
                     source_state.state,
                 )
 
-        dispatcher_send(self._hass, f"{self._name}-{MESSAGE_TYPE_BATTERY_UPDATE}")
+        self._async_publish_update()
 
     @callback
     def async_source_tracking(self, event):
         """Wait for source to be ready, then start."""
 
-        for input_details in self._inputs:
+        for sensor_id, input_details in self._inputs_by_sensor_id.items():
             """Start tracking state changes for a sensor."""
             self._listeners.append(
-                async_track_state_change_event(
-                    self._hass, [input_details[SENSOR_ID]], self.async_reading_handler
+                self._meter_hub.async_subscribe(
+                    sensor_id, partial(self._async_apply_reading, input_details)
                 )
             )
-        _LOGGER.debug(f"{self._name} monitoring {input_details[SENSOR_ID]}")
+            _LOGGER.debug(f"{self._name} monitoring {sensor_id}")
 
         # Track solar sensor if configured
         if self._solar_entity_id is not None:
             self._listeners.append(
-                async_track_state_change_event(
-                    self._hass, [self._solar_entity_id], self.async_solar_reading_handler
+                self._meter_hub.async_subscribe(
+                    self._solar_entity_id, self._async_apply_solar_reading
                 )
             )
             _LOGGER.debug(f"{self._name} monitoring solar sensor {self._solar_entity_id}")
 
         # Also update on a fixed cadence so the battery reacts even when meters
         # publish infrequently or when only switches/controls change.
-        self._listeners.append(
-            async_track_time_interval(
-                self._hass,
-                self.async_periodic_update,
-                timedelta(seconds=int(self._update_frequency)),
-            )
+        self._unsub_periodic_update = self._scheduler.async_track_interval(
+            int(self._update_frequency), self.async_periodic_update
         )
+        self._listeners.append(self._async_stop_periodic_update)
         return
 
     @callback
-    def async_periodic_update(self, now):
-        """Update battery on a fixed cadence using accumulated readings."""
-        self._async_maybe_update_battery()
+    def _async_stop_periodic_update(self):
+        """Stop the periodic updates."""
+        if self._unsub_periodic_update is not None:
+            self._unsub_periodic_update()
+            self._unsub_periodic_update = None
 
     @callback
-    def async_reading_handler(
-        self,
-        event,
-    ):
-        sensor_id = event.data.get("entity_id")
-        for input_details in self._inputs:
-            if sensor_id == input_details[SENSOR_ID]:
-                break
-        else:
-            _LOGGER.warning(
-                f"Error reading input sensor {sensor_id} not found in input sensors"
-            )
+    def async_periodic_update(self, now):
+        """Update battery on a fixed cadence using accumulated readings.
+
+        Ticks that cannot change anything only move the update time on.
+        """
+        if self._async_tick_is_idle():
+            self._last_battery_update_time = dt_util.utcnow().timestamp()
+            self._stats.skipped_ticks += 1
             return
+        self._async_maybe_update_battery()
 
-        """Handle the sensor state changes for import or export."""
-        sensor_charge_rate = (
-            DISCHARGING_RATE if input_details[SENSOR_TYPE] == IMPORT else CHARGING_RATE
+    def _async_tick_is_idle(self) -> bool:
+        """Return True when an update now would leave every value as it is.
+
+        That is the case when no energy accumulated since an update that
+        neither charged nor discharged, unless a forced mode may move energy
+        on its own, as overnight or while the battery is paused.
+        """
+        return (
+            not self._accumulated_import_reading
+            and not self._accumulated_export_reading
+            and not self._accumulated_solar_reading
+            and not self._sensors.charging_rate
+            and not self._sensors.discharging_rate
+            and self._pending_update_cancel is None
+            and (
+                self._switches[PAUSE_BATTERY]
+                or self._battery_mode not in (OVERRIDE_CHARGING, FORCE_DISCHARGE)
+            )
         )
 
-        old_state = event.data.get("old_state")
-        new_state = event.data.get("new_state")
+    @callback
+    def _async_update_if_power_changed(self) -> None:
+        """Update early when the grid power moved far from the last update's.
 
-        if (
-            old_state is None
-            or sensor_id is None
-            or new_state is None
-            or old_state.state in [STATE_UNKNOWN, STATE_UNAVAILABLE]
-            or new_state.state in [STATE_UNKNOWN, STATE_UNAVAILABLE]
-        ):
-            # Incorrect Setup or Sensors are not ready
+        Swings such as a passing cloud are then applied at a finer
+        resolution than the update frequency, but no more often than the
+        minimum update interval.
+        """
+        elapsed_seconds = dt_util.utcnow().timestamp() - self._last_battery_update_time
+        if elapsed_seconds < MINIMUM_UPDATE_INTERVAL_SECONDS:
             return
-
-        units = self._hass.states.get(sensor_id).attributes.get(
-            ATTR_UNIT_OF_MEASUREMENT
+        grid_power = (
+            3600.0
+            * (self._accumulated_import_reading - self._accumulated_export_reading)
+            / elapsed_seconds
         )
+        if abs(grid_power - self._last_grid_power) >= self._power_change_threshold:
+            self._stats.early_updates += 1
+            self._async_maybe_update_battery()
 
-        if units not in [UnitOfEnergy.KILO_WATT_HOUR, UnitOfEnergy.WATT_HOUR]:
+    @callback
+    def async_reading_handler(
+        self,
+        event,
+    ):
+        """Handle the sensor state changes for import or export."""
+        sensor_id = event.data.get("entity_id")
+        input_details = self._inputs_by_sensor_id.get(sensor_id)
+        if input_details is None:
             _LOGGER.warning(
-                "(%s) Unsupported energy unit '%s' for sensor %s; expected kWh or Wh. Ignoring update.",
-                self._name,
-                units,
-                sensor_id,
+                f"Error reading input sensor {sensor_id} not found in input sensors"
             )
             return
+        reading = read_meter_event(self._meter_hub.source(sensor_id), event)
+        if reading is not None:
+            self._async_apply_reading(input_details, reading)
 
-        conversion_factor = 1.0 if units == UnitOfEnergy.KILO_WATT_HOUR else 0.001
-        unit_of_energy = "kWh" if units == UnitOfEnergy.KILO_WATT_HOUR else "Wh"
-
-        new_state_value = float(new_state.state) * conversion_factor
-        old_state_value = float(old_state.state) * conversion_factor
-
-        if self._sensors[input_details[SIMULATED_SENSOR]] is None:
-            self._sensors[input_details[SIMULATED_SENSOR]] = old_state_value
+    @callback
+    def _async_apply_reading(self, input_details, reading: MeterReading):
+        """Accumulate an import or export meter reading shared by the meter hub."""
+        old_state_value, new_state_value = reading
+        simulated_sensor = input_details[SIMULATED_SENSOR]
+        self._meter_readings[simulated_sensor] = new_state_value
+        if self._sensors[simulated_sensor] is None:
+            self._sensors[simulated_sensor] = old_state_value
 
         if new_state_value == old_state_value:
             # _LOGGER.debug("(%s) No change in readings .. ", self._name)
             return
 
+        self._stats.readings += 1
         reading_variance = new_state_value - old_state_value
+        sensor_type = input_details[SENSOR_TYPE]
 
         _LOGGER.debug(
-            f"({self._name}) {sensor_id} {input_details[SENSOR_TYPE]}: {old_state_value} {unit_of_energy} => {new_state_value} {unit_of_energy} = Δ {reading_variance} {unit_of_energy}"
+            "(%s) %s %s: %s kWh => %s kWh = Δ %s kWh",
+            self._name,
+            input_details[SENSOR_ID],
+            sensor_type,
+            old_state_value,
+            new_state_value,
+            reading_variance,
         )
 
         if reading_variance < 0:
             _LOGGER.debug(
                 "(%s) %s sensor value decreased - rebasing simulated sensor %s",
                 self._name,
-                input_details[SENSOR_TYPE],
-                input_details[SIMULATED_SENSOR],
+                sensor_type,
+                simulated_sensor,
+            )
+            self._stats.rebased_readings += 1
+            sensor_charge_rate = (
+                DISCHARGING_RATE if sensor_type == IMPORT else CHARGING_RATE
             )
             self._sensors[sensor_charge_rate] = 0
-            self._sensors[input_details[SIMULATED_SENSOR]] = new_state_value
-            dispatcher_send(self._hass, f"{self._name}-{MESSAGE_TYPE_BATTERY_UPDATE}")
+            self._sensors[simulated_sensor] = new_state_value
+            self._async_publish_update()
             return
 
-        if input_details[SENSOR_TYPE] == IMPORT:
+        if sensor_type == IMPORT:
             self._last_import_reading_sensor_data = input_details
             self._accumulated_import_reading += reading_variance
-
-        if input_details[SENSOR_TYPE] == EXPORT:
+        elif sensor_type == EXPORT:
             self._last_export_reading_sensor_data = input_details
             self._accumulated_export_reading += reading_variance
 
-        # NOTE: battery updates are handled by async_periodic_update().
-        return
+        # NOTE: battery updates are handled by async_periodic_update(), or
+        # brought forward when the grid power changes fast.
+        self._async_update_if_power_changed()
 
     @callback
     def async_solar_reading_handler(self, event):
         """Handle state changes for solar energy sensor."""
         sensor_id = event.data.get("entity_id")
-        old_state = event.data.get("old_state")
-        new_state = event.data.get("new_state")
-
-        if (
-            old_state is None
-            or sensor_id is None
-            or new_state is None
-            or old_state.state in [STATE_UNKNOWN, STATE_UNAVAILABLE]
-            or new_state.state in [STATE_UNKNOWN, STATE_UNAVAILABLE]
-        ):
-            # Sensor not ready
+        if sensor_id is None or sensor_id != self._solar_entity_id:
             return
+        reading = read_meter_event(self._meter_hub.source(sensor_id), event)
+        if reading is not None:
+            self._async_apply_solar_reading(reading)
 
-        units = self._hass.states.get(sensor_id).attributes.get(
-            ATTR_UNIT_OF_MEASUREMENT
-        )
-
-        if units in [UnitOfEnergy.KILO_WATT_HOUR, UnitOfEnergy.WATT_HOUR]:
-            conversion_factor = 1.0 if units == UnitOfEnergy.KILO_WATT_HOUR else 0.001
-            unit_of_energy = "kWh" if units == UnitOfEnergy.KILO_WATT_HOUR else "Wh"
-        else:
-            return
-
-        new_state_value = float(new_state.state) * conversion_factor
-        old_state_value = float(old_state.state) * conversion_factor
-
+    @callback
+    def _async_apply_solar_reading(self, reading: MeterReading):
+        """Accumulate a solar meter reading shared by the meter hub."""
+        old_state_value, new_state_value = reading
         if new_state_value == old_state_value:
             return
 
+        self._stats.solar_readings += 1
         reading_variance = new_state_value - old_state_value
 
         _LOGGER.debug(
-            f"({self._name}) Solar sensor {sensor_id}: {old_state_value} {unit_of_energy} => {new_state_value} {unit_of_energy} = Δ {reading_variance} {unit_of_energy}"
+            "(%s) Solar sensor %s: %s kWh => %s kWh = Δ %s kWh",
+            self._name,
+            self._solar_entity_id,
+            old_state_value,
+            new_state_value,
+            reading_variance,
         )
 
         if reading_variance < 0:
@@ -992,6 +1455,7 @@ class SimulatedBatteryHandle:
                 "(%s) Solar sensor value decreased - meter may have been reset",
                 self._name,
             )
+            self._stats.rebased_readings += 1
             self._accumulated_solar_reading = 0
             return
 
@@ -1010,17 +1474,22 @@ class SimulatedBatteryHandle:
             return input_details[FIXED_TARIFF]
 
         # Default behavior - assume sensor entities
-        if (
-            TARIFF_SENSOR not in input_details
-            or input_details[TARIFF_SENSOR] is None
-            or len(input_details[TARIFF_SENSOR]) < 6
-            or self._hass.states.get(input_details[TARIFF_SENSOR]) is None
-            or self._hass.states.get(input_details[TARIFF_SENSOR]).state
-            in [STATE_UNAVAILABLE, STATE_UNKNOWN]
-        ):
+        entity_id = tariff_sensor_id(input_details)
+        if entity_id is None:
             return None
-
-        return float(self._hass.states.get(input_details[TARIFF_SENSOR]).state)
+        return self._tariff_cache.get(entity_id)
+
+    def get_slider_limit(self, key: str) -> float:
+        """Return the current value of a slider."""
+        if key == CHARGE_LIMIT:
+            return self._charge_limit
+        if key == DISCHARGE_LIMIT:
+            return self._discharge_limit
+        if key == MINIMUM_SOC:
+            return self._minimum_soc
+        if key == MAXIMUM_SOC:
+            return self._maximum_soc
+        raise KeyError(key)
 
     def set_slider_limit(self, value: float, key: str):
         """Called by slider to update internal charge limit."""
@@ -1048,13 +1517,14 @@ class SimulatedBatteryHandle:
         if elapsed_seconds < MINIMUM_UPDATE_INTERVAL_SECONDS:
             delay = MINIMUM_UPDATE_INTERVAL_SECONDS - elapsed_seconds
             if self._pending_update_cancel is None:
+                self._stats.delayed_updates += 1
                 _LOGGER.debug(
                     "(%s) Delaying battery update by %.3f seconds to satisfy minimum interval.",
                     self._name,
                     delay,
                 )
-                self._pending_update_cancel = async_call_later(
-                    self._hass, delay, self._async_delayed_update
+                self._pending_update_cancel = self._scheduler.async_call_later(
+                    delay, self._async_delayed_update
                 )
             return
 
@@ -1077,17 +1547,35 @@ class SimulatedBatteryHandle:
         self._pending_update_cancel = None
         self._async_maybe_update_battery()
 
+    def _derive_capacity(self) -> None:
+        """Derive the degradation and capacity of the current cycles."""
+        cycles = self._sensors.battery_cycles
+        self._set_capacity(
+            cycles, simulation.degradation_factor(self._battery_config, cycles)
+        )
+
+    def _set_capacity(self, cycles: float, degradation: float) -> None:
+        """Keep the degradation and capacity derived for the given cycles."""
+        self._capacity_cycles = cycles
+        self._degradation = degradation
+        self._max_capacity = max(
+            self._battery_config.battery_size * degradation,
+            simulation.MINIMUM_CAPACITY,
+        )
+
     @property
     def degradation_factor(self) -> float:
         """Return current degradation factor based on charge/discharge cycles."""
-        cycles = float(self._sensors.get(BATTERY_CYCLES, 0.0))
-        capped_progress = min(max(cycles / float(self._rated_battery_cycles), 0.0), 1.0)
-        return 1.0 - ((1.0 - float(self._end_of_life_degradation)) * capped_progress)
+        if self._sensors.battery_cycles != self._capacity_cycles:
+            self._derive_capacity()
+        return self._degradation
 
     @property
     def current_max_capacity(self) -> float:
         """Return current degraded maximum battery capacity in kWh."""
-        return max(float(self._battery_size) * self.degradation_factor, 0.000001)
+        if self._sensors.battery_cycles != self._capacity_cycles:
+            self._derive_capacity()
+        return self._max_capacity
 
     @property
     def charge_percentage(self) -> int:
@@ -1102,31 +1590,45 @@ class SimulatedBatteryHandle:
     @property
     def minimum_user_selectable_soc_percentage(self) -> float:
         """Return the configured minimum selectable SOC as a percentage."""
-        return 100.0 * float(self._minimum_user_selectable_soc)
+        return 100.0 * self._battery_config.minimum_user_selectable_soc
+
+    def _battery_controls(self) -> BatteryControls:
+        """Return the current mode, pause switch and slider settings."""
+        return BatteryControls(
+            mode=self._battery_mode,
+            paused=self._switches[PAUSE_BATTERY],
+            charge_limit=float(self._charge_limit),
+            discharge_limit=float(self._discharge_limit),
+            minimum_soc=float(self._minimum_soc),
+            maximum_soc=float(self._maximum_soc),
+        )
+
+    def _async_publish_update(self):
+        """Tell the battery entities that the simulated values changed."""
+        dispatcher_send(self._hass, f"{self._name}-{MESSAGE_TYPE_BATTERY_UPDATE}")
+        self._checkpoint.async_schedule_save()
 
-    def update_battery(self, import_amount, export_amount, solar_amount=0.0):
-        """Update battery statistics based on the reading for Im- or Export."""
-        amount_to_charge: float = 0.0
-        amount_to_discharge: float = 0.0
-        net_export: float = 0.0
-        net_import: float = 0.0
+    def update_battery(
+        self, import_amount, export_amount, solar_amount=0.0, time_now=None
+    ):
+        """Update battery statistics based on the reading for Im- or Export.
 
+        `time_now` is the POSIX timestamp the update applies to. It defaults to
+        the current time; historical replays pass the recorded timestamp.
+        """
+        started = time.perf_counter()
         if self._charge_state == "unknown":
             self._charge_state = 0.0
-        charge_state_before_update = max(float(self._charge_state), 0.0)
 
-        """
-            Calculate maximum possible charge and discharge based on battery
-            specifications and time since last discharge
-        """
-        time_now = dt_util.utcnow().timestamp()
+        if time_now is None:
+            time_now = dt_util.utcnow().timestamp()
         time_last_update = self._last_battery_update_time
         time_since_last_battery_update = time_now - time_last_update
 
         _LOGGER.debug(
             "(%s), Size: (%s)kWh, Import: (%s), Export: (%s), Initial charge level: (%s) .... Timings: %s = Now / %s = Last Update / %s Time (sec).",
             self._name,
-            self._battery_size,
+            self._battery_config.battery_size,
             import_amount,
             export_amount,
             self._charge_state,
@@ -1135,296 +1637,122 @@ class SimulatedBatteryHandle:
             time_since_last_battery_update,
         )
 
-        max_discharge = time_since_last_battery_update * (
-            self._max_discharge_rate / 3600
-        )
-        max_charge = time_since_last_battery_update * (self._max_charge_rate / 3600)
-        interval_hours = max(time_since_last_battery_update / 3600, 1 / 3600)
-        charge_limit = time_since_last_battery_update * (self._charge_limit / 3600)
-        discharge_limit = time_since_last_battery_update * (self._discharge_limit / 3600)
-
-        if self._solar_entity_id is not None:
-            solar_cap = max(float(solar_amount), 0.0)
-            max_charge = min(max_charge, solar_cap)
-            self._sensors[SOLAR_POWER_CAP] = solar_cap / interval_hours
-            if self._nominal_inverter_power is not None:
-                available_inverter_discharge_power = max(
-                    float(self._nominal_inverter_power) - self._sensors[SOLAR_POWER_CAP],
-                    0.0,
-                )
-                max_discharge = min(
-                    max_discharge, available_inverter_discharge_power * interval_hours
-                )
-            _LOGGER.debug(
-                f"({self._name}) Solar cap: {solar_cap} kWh over {interval_hours:.4f} hours = {self._sensors[SOLAR_POWER_CAP]:.3f} kW"
-            )
-        else:
-            self._sensors[SOLAR_POWER_CAP] = 0.0
-
-        effective_max_capacity = self.current_max_capacity
-        max_charge_soc_capacity = effective_max_capacity * float(self._maximum_soc) / 100
-        min_discharge_soc_capacity = (
-            effective_max_capacity * float(self._minimum_soc) / 100
-        )
-
-        available_capacity_to_charge = max(
-            max_charge_soc_capacity - float(self._charge_state), 0
-        )
-        available_capacity_to_discharge = max(
-            float(self._charge_state) - min_discharge_soc_capacity, 0
+        self._apply_tick(
+            import_amount,
+            export_amount,
+            solar_amount,
+            time_now,
+            self.get_tariff_information(self._last_import_reading_sensor_data),
+            self.get_tariff_information(self._last_export_reading_sensor_data),
         )
-        
-        if self._switches[PAUSE_BATTERY] or self._battery_mode == PAUSE_BATTERY:
-            _LOGGER.debug("(%s) Battery paused.", self._name)
-            amount_to_charge = 0.0
-            amount_to_discharge = 0.0
-
-        elif self._battery_mode == OVERRIDE_CHARGING:
-            _LOGGER.debug("(%s) Battery override charging.", self._name)
-            amount_to_charge = min(max_charge, charge_limit)
-            amount_to_discharge = 0.0
-            self._charging = True
-
-        elif self._battery_mode == FORCE_DISCHARGE:
-            _LOGGER.debug("(%s) Battery forced discharging.", self._name)
-            amount_to_charge = 0.0
-            amount_to_discharge = min(max_discharge, discharge_limit)
+        stats = self._stats
+        stats.ticks += 1
+        stats.update_latency.record(time.perf_counter() - started)
 
-        elif self._battery_mode == CHARGE_ONLY:
-            _LOGGER.debug("(%s) Battery charge only mode.", self._name)
-            amount_to_charge = min(export_amount, max_charge, charge_limit)
-            amount_to_discharge = 0.0
+        self._async_publish_update()
 
-        elif self._battery_mode == DISCHARGE_ONLY:
-            _LOGGER.debug("(%s) Battery discharge only mode.", self._name)
-            amount_to_charge = 0.0
-            amount_to_discharge = min(import_amount, max_discharge, discharge_limit)
+        _LOGGER.debug("(%s) Battery update complete. New Charge level: (%s)", self._name, self._charge_state)
 
-        else:
-            _LOGGER.debug("(%s) Battery normal mode.", self._name)
-
-            amount_to_charge = min(export_amount, max_charge, charge_limit)
-            amount_to_discharge = min(import_amount, max_discharge, discharge_limit)
-
-        # Keep amount_to_charge as input-side energy and amount_to_discharge as
-        # output-side delivered energy. The SoC capacities are battery-internal,
-        # so convert those limits through the efficiency curve. Because the
-        # efficiency curve is power-dependent, recompute it after each clipping
-        # step until the clipped amount and efficiency agree.
-        for _ in range(10):
-            if amount_to_charge <= 0.0:
-                break
-            charge_efficiency = interpolate_efficiency(
-                self._battery_charge_efficiency_curve,
-                amount_to_charge / interval_hours,
-            )
-            clipped_amount_to_charge = min(
-                amount_to_charge,
-                available_capacity_to_charge / max(charge_efficiency, 0.000001),
-            )
-            if abs(clipped_amount_to_charge - amount_to_charge) < 0.000001:
-                break
-            amount_to_charge = clipped_amount_to_charge
-
-        for _ in range(10):
-            if amount_to_discharge <= 0.0:
-                break
-            discharge_efficiency = interpolate_efficiency(
-                self._battery_discharge_efficiency_curve,
-                amount_to_discharge / interval_hours,
-            )
-            clipped_amount_to_discharge = min(
-                amount_to_discharge,
-                available_capacity_to_discharge * discharge_efficiency,
+    def _apply_tick(
+        self,
+        import_amount,
+        export_amount,
+        solar_amount,
+        time_now,
+        import_tariff,
+        export_tariff,
+    ):
+        """Step the battery to `time_now` without telling the entities."""
+        time_since_last_battery_update = time_now - self._last_battery_update_time
+        if time_since_last_battery_update > 0:
+            self._last_grid_power = (
+                3600.0
+                * (import_amount - export_amount)
+                / time_since_last_battery_update
             )
-            if abs(clipped_amount_to_discharge - amount_to_discharge) < 0.000001:
-                break
-            amount_to_discharge = clipped_amount_to_discharge
-
-        requested_charge_power = (
-            amount_to_charge / interval_hours if amount_to_charge > 0 else 0.0
-        )
-        requested_discharge_power = (
-            amount_to_discharge / interval_hours if amount_to_discharge > 0 else 0.0
-        )
-        charge_efficiency = interpolate_efficiency(
-            self._battery_charge_efficiency_curve, requested_charge_power
-        )
-        discharge_efficiency = interpolate_efficiency(
-            self._battery_discharge_efficiency_curve, requested_discharge_power
-        )
-        self._sensors[ATTR_LAST_CHARGE_EFFICIENCY] = (
-            charge_efficiency if amount_to_charge > 0 else None
-        )
-        self._sensors[ATTR_LAST_DISCHARGE_EFFICIENCY] = (
-            discharge_efficiency if amount_to_discharge > 0 else None
+        sensors = self._sensors
+        state, outputs = simulation.step(
+            self._battery_config,
+            self._battery_controls(),
+            BatteryState(
+                charge_state=float(self._charge_state),
+                stored_energy_value=self._stored_energy_value,
+                battery_cycles=sensors.battery_cycles,
+                energy_battery_in=sensors.energy_battery_in,
+                energy_battery_out=sensors.energy_battery_out,
+                energy_saved=sensors.energy_saved,
+                money_saved_import=sensors.money_saved_import,
+                money_saved_export=sensors.money_saved_export,
+            ),
+            import_amount,
+            export_amount,
+            solar_amount,
+            time_since_last_battery_update,
+            import_tariff,
+            export_tariff,
         )
-
-        if self._switches[PAUSE_BATTERY] or self._battery_mode == PAUSE_BATTERY:
-            self._sensors[BATTERY_MODE] = MODE_IDLE
-        elif self._battery_mode == OVERRIDE_CHARGING:
-            self._sensors[BATTERY_MODE] = (
-                MODE_FORCE_CHARGING if amount_to_charge > 0.0 else MODE_IDLE
-            )
-        elif self._battery_mode == FORCE_DISCHARGE:
-            self._sensors[BATTERY_MODE] = (
-                MODE_FORCE_DISCHARGING if amount_to_discharge > 0.0 else MODE_IDLE
+        if self._scenarios is not None:
+            self._scenarios.step(
+                import_amount,
+                export_amount,
+                solar_amount,
+                time_since_last_battery_update,
+                import_tariff,
+                export_tariff,
             )
-        elif amount_to_charge > 0.0 and amount_to_charge >= amount_to_discharge:
-            self._sensors[BATTERY_MODE] = MODE_CHARGING
-        elif amount_to_discharge > 0.0:
-            self._sensors[BATTERY_MODE] = MODE_DISCHARGING
-        else:
-            self._sensors[BATTERY_MODE] = MODE_IDLE
-
-        # Calculate net grid import/export once, using efficiency-adjusted
-        # charge/discharge amounts.
-        if self._battery_mode == OVERRIDE_CHARGING:
-            net_export = max(export_amount - amount_to_charge, 0)
-            net_import = max(amount_to_charge - export_amount, 0) + import_amount
-        elif self._battery_mode == FORCE_DISCHARGE:
-            net_export = max(amount_to_discharge - import_amount, 0) + export_amount
-            net_import = max(import_amount - amount_to_discharge, 0)
-        elif self._battery_mode == CHARGE_ONLY:
-            net_import = import_amount
-            net_export = export_amount - amount_to_charge
-        elif self._battery_mode == DISCHARGE_ONLY:
-            net_import = import_amount - amount_to_discharge
-            net_export = export_amount
-        elif self._switches[PAUSE_BATTERY] or self._battery_mode == PAUSE_BATTERY:
-            net_export = export_amount
-            net_import = import_amount
-        else:
-            net_import = import_amount - amount_to_discharge
-            net_export = export_amount - amount_to_charge
-
-        current_import_tariff = self.get_tariff_information(
-            self._last_import_reading_sensor_data
-        )
-        current_export_tariff = self.get_tariff_information(
-            self._last_export_reading_sensor_data
-        )
-
-        if current_import_tariff is not None:
-            self._sensors[ATTR_MONEY_SAVED_IMPORT] += (
-                import_amount - net_import
-            ) * current_import_tariff
-        if current_export_tariff is not None:
-            self._sensors[ATTR_MONEY_SAVED_EXPORT] += (
-                net_export - export_amount
-            ) * current_export_tariff
-        self._sensors[ATTR_MONEY_SAVED] = (
-            self._sensors[ATTR_MONEY_SAVED_IMPORT]
-            + self._sensors[ATTR_MONEY_SAVED_EXPORT]
-        )
-
-        # Track the monetary book value of the energy currently stored. Charge
-        # additions use the already-available tariff information: charging from
-        # exported energy has the opportunity cost of foregone export revenue,
-        # while grid-backed forced charging uses the import tariff.
-        charge_value_increment = 0.0
-        if amount_to_charge > 0.0:
-            charge_from_export = min(amount_to_charge, max(export_amount, 0.0))
-            charge_from_import = max(amount_to_charge - charge_from_export, 0.0)
-            if current_export_tariff is not None:
-                charge_value_increment += charge_from_export * current_export_tariff
-            if current_import_tariff is not None:
-                charge_value_increment += charge_from_import * current_import_tariff
-
-        # Since normal battery operation never allows the charge state to fall
-        # below the physical floor, any charged energy is added to the
-        # dischargeable/value-accounting portion of the battery. The floor is
-        # therefore excluded from the value basis used for discharge, but the
-        # charge value itself does not need an additional floor-crossing
-        # correction.
-        charge_state_after_charge = (
-            charge_state_before_update + (amount_to_charge * charge_efficiency)
-        )
-        value_accounting_energy_after_charge = self._value_accounting_energy(
-            charge_state_after_charge
-        )
 
-        retained_value_fraction = 1.0
-        if amount_to_discharge > 0.0 and value_accounting_energy_after_charge > 0.000001:
-            # Keep the average value per usable kWh constant across discharge by
-            # reducing the stored value in the same proportion that the
-            # dischargeable energy (the energy above the minimum-SOC floor)
-            # actually falls. That energy drops by the internal amount drawn from
-            # storage, i.e. the delivered amount divided by the discharge
-            # efficiency, which is exactly the reduction applied to the charge
-            # state below. Reducing value by the delivered amount only would let
-            # the numerator shrink more slowly than the denominator and make the
-            # published average drift upward during discharge. Because value and
-            # usable energy now scale together, the average is unchanged by
-            # discharge and independent of the discharge efficiency.
-            internal_discharge_energy = amount_to_discharge / max(
-                discharge_efficiency, 0.000001
-            )
-            retained_value_fraction = max(
-                1.0
-                - (internal_discharge_energy / value_accounting_energy_after_charge),
-                0.0,
+        if self._battery_mode == OVERRIDE_CHARGING and not self._switches[PAUSE_BATTERY]:
+            self._charging = True
+        if self._solar_entity_id is not None:
+            _LOGGER.debug(
+                "(%s) Solar cap: %s kW", self._name, outputs.solar_power_cap
             )
 
-        self._stored_energy_value = (
-            self._stored_energy_value + charge_value_increment
-        ) * retained_value_fraction
-
-        self._charge_state = (
-            float(self._charge_state)
-            + (amount_to_charge * charge_efficiency)
-            - (amount_to_discharge / max(discharge_efficiency, 0.000001))
+        self._charge_state = state.charge_state
+        self._stored_energy_value = state.stored_energy_value
+        sensors.energy_saved = state.energy_saved
+        sensors.energy_battery_in = state.energy_battery_in
+        sensors.energy_battery_out = state.energy_battery_out
+        sensors.money_saved_import = state.money_saved_import
+        sensors.money_saved_export = state.money_saved_export
+        sensors.money_saved = state.money_saved_import + state.money_saved_export
+        sensors.battery_cycles = state.battery_cycles
+        sensors.battery_degradation = outputs.degradation
+        self._set_capacity(state.battery_cycles, outputs.degradation)
+        self._trace.record(
+            time_now,
+            time_since_last_battery_update,
+            import_amount,
+            export_amount,
+            solar_amount,
+            outputs.amount_to_charge,
+            outputs.amount_to_discharge,
+            outputs.net_import,
+            outputs.net_export,
+            outputs.charge_efficiency,
+            outputs.discharge_efficiency,
+            import_tariff,
+            export_tariff,
+            state.charge_state,
+            self._max_capacity,
         )
-
-        self._sensors[ATTR_ENERGY_SAVED] += import_amount - net_import
-
+        sensors.average_energy_value = outputs.average_energy_value
+        sensors.last_charge_efficiency = outputs.charge_efficiency
+        sensors.last_discharge_efficiency = outputs.discharge_efficiency
+        sensors.charging_rate = outputs.charging_rate
+        sensors.discharging_rate = outputs.discharging_rate
+        sensors.solar_power_cap = outputs.solar_power_cap
+        sensors.battery_mode = outputs.battery_mode
+        sensors.status = outputs.status
+
+        simulated = sensors.simulated
         if self._last_import_reading_sensor_data is not None:
-            self._sensors[
+            simulated[
                 self._last_import_reading_sensor_data[SIMULATED_SENSOR]
-            ] += net_import
+            ] += outputs.net_import
         if self._last_export_reading_sensor_data is not None:
-            self._sensors[
+            simulated[
                 self._last_export_reading_sensor_data[SIMULATED_SENSOR]
-            ] += net_export
-
-        self._sensors[ATTR_ENERGY_BATTERY_IN] += amount_to_charge
-        self._sensors[ATTR_ENERGY_BATTERY_OUT] += amount_to_discharge
-
-        self._sensors[CHARGING_RATE] = amount_to_charge / interval_hours
-        self._sensors[DISCHARGING_RATE] = amount_to_discharge / interval_hours
-        self._sensors[BATTERY_CYCLES] = (
-            self._sensors[ATTR_ENERGY_BATTERY_IN] / self._battery_size
-        )
-        self._sensors[BATTERY_DEGRADATION] = self.degradation_factor
-
-        charge_state_before_capacity_clip = float(self._charge_state)
-        self._charge_state = min(charge_state_before_capacity_clip, effective_max_capacity)
-        if self._charge_state < charge_state_before_capacity_clip:
-            # If degradation/capacity clipping removes stored energy, keep the
-            # average value stable by reducing the cumulative stored value in
-            # the same proportion. Both charge states relate to the same
-            # effective capacity, so the non-dischargeable reserve is unchanged.
-            self._rescale_stored_energy_value_for_charge_state_change(
-                charge_state_before_capacity_clip,
-                self._charge_state,
-                effective_max_capacity,
-                effective_max_capacity,
-            )
-        else:
-            self._update_average_energy_value_sensor()
-
-        charge_percentage = round(100 * self._charge_state / effective_max_capacity)
-
-        # Keep "mode" (how the battery operates) separate from capacity "status".
-        if charge_percentage < 2:
-            self._sensors[ATTR_STATUS] = MODE_EMPTY
-        elif charge_percentage > 98:
-            self._sensors[ATTR_STATUS] = MODE_FULL
-        else:
-            self._sensors[ATTR_STATUS] = "Normal"
+            ] += outputs.net_export
 
         self._last_battery_update_time = time_now
-
-        dispatcher_send(self._hass, f"{self._name}-{MESSAGE_TYPE_BATTERY_UPDATE}")
-
-        _LOGGER.debug("(%s) Battery update complete. New Charge level: (%s)", self._name, self._charge_state)
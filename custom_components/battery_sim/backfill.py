@@ -0,0 +1,170 @@
+"""Backfill the simulated battery totals into long-term statistics.
+
+Past meter history is replayed through the battery logic and the hourly
+totals of the simulated grid meters and the savings are imported into the
+recorder in bulk, as external statistics next to the battery's own sensors.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import logging
+import math
+from typing import NamedTuple
+
+from homeassistant.const import CONF_NAME, UnitOfEnergy
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import slugify
+
+from .const import (
+    ATTR_ENERGY_SAVED,
+    ATTR_MONEY_SAVED,
+    DOMAIN,
+    GRID_EXPORT_SIM,
+    GRID_IMPORT_SIM,
+)
+from .recorder_history import STATES, async_replay_recorder_history
+from .replay import ReplayResult, ReplaySample
+from .simulation import BatteryState
+
+_LOGGER = logging.getLogger(__name__)
+
+STATISTICS_PERIOD_S = 3600
+
+# Backfilled totals, each read from a tick as
+# (battery state, grid import, grid export) -> value.
+BACKFILLED_TOTALS = {
+    GRID_IMPORT_SIM: lambda state, grid_import, grid_export: grid_import,
+    GRID_EXPORT_SIM: lambda state, grid_import, grid_export: grid_export,
+    ATTR_ENERGY_SAVED: lambda state, grid_import, grid_export: state.energy_saved,
+    ATTR_MONEY_SAVED: lambda state, grid_import, grid_export: (
+        state.money_saved_import + state.money_saved_export
+    ),
+}
+
+
+def statistic_id(battery_name: str, total: str) -> str:
+    """Return the external statistic id of a backfilled battery total."""
+    return f"{DOMAIN}:{slugify(battery_name)}_{slugify(total)}"
+
+
+class HourlyTotals:
+    """Collect the totals at the end of every replayed hour.
+
+    Pass `add` as the `on_tick` of a replay. A tick belongs to the hour its
+    interval ends in, so a tick ending on the hour closes the previous hour.
+    """
+
+    def __init__(self):
+        """Initialize without any hours."""
+        self.rows: dict[str, list[dict]] = {total: [] for total in BACKFILLED_TOTALS}
+        self._hour: int | None = None
+        self._values: tuple = ()
+
+    def add(
+        self,
+        sample: ReplaySample,
+        state: BatteryState,
+        grid_import: float,
+        grid_export: float,
+    ) -> None:
+        """Record the totals after one replayed tick."""
+        hour = math.ceil(sample.timestamp / STATISTICS_PERIOD_S) - 1
+        if self._hour is not None and hour != self._hour:
+            self._close_hour()
+        self._hour = hour
+        self._values = (state, grid_import, grid_export)
+
+    def finish(self) -> dict[str, list[dict]]:
+        """Close the last hour and return the statistics rows of each total."""
+        if self._hour is not None:
+            self._close_hour()
+            self._hour = None
+        return self.rows
+
+    def _close_hour(self) -> None:
+        start = datetime.fromtimestamp(
+            self._hour * STATISTICS_PERIOD_S, tz=timezone.utc
+        )
+        for total, read in BACKFILLED_TOTALS.items():
+            value = read(*self._values)
+            self.rows[total].append({"start": start, "state": value, "sum": value})
+
+
+def _statistic_metadata(name: str, statistic: str, unit: str | None) -> dict:
+    """Return sum-only statistic metadata for the running recorder schema."""
+    from homeassistant.components.recorder.models import StatisticMetaData
+
+    metadata = {
+        "has_mean": False,
+        "has_sum": True,
+        "name": name,
+        "source": DOMAIN,
+        "statistic_id": statistic,
+        "unit_of_measurement": unit,
+    }
+    fields = StatisticMetaData.__annotations__
+    if "mean_type" in fields:
+        from homeassistant.components.recorder.models import StatisticMeanType
+
+        metadata["mean_type"] = StatisticMeanType.NONE
+    if "unit_class" in fields:
+        metadata["unit_class"] = "energy" if unit == UnitOfEnergy.KILO_WATT_HOUR else None
+    return metadata
+
+
+class BackfillResult(NamedTuple):
+    """What a backfill replayed and imported."""
+
+    replay: ReplayResult
+    hours: int
+    statistic_ids: list[str]
+
+
+async def async_backfill_statistics(
+    hass,
+    config,
+    start_time: float,
+    end_time: float,
+    source: str = STATES,
+) -> BackfillResult:
+    """Replay recorded history and import the hourly totals as statistics.
+
+    The replay starts from a fresh battery at `start_time` and runs in the
+    recorder executor; the rows are then handed to the recorder in one
+    import per total, which replaces any rows backfilled earlier for the
+    same hours.
+    """
+    if "recorder" not in hass.config.components:
+        raise HomeAssistantError("Backfilling statistics needs the recorder")
+    from homeassistant.components.recorder.statistics import (
+        async_add_external_statistics,
+    )
+
+    totals = HourlyTotals()
+    replay = await async_replay_recorder_history(
+        hass, config, start_time, end_time, source, on_tick=totals.add
+    )
+    rows = totals.finish()
+
+    name = config[CONF_NAME]
+    units = {
+        GRID_IMPORT_SIM: UnitOfEnergy.KILO_WATT_HOUR,
+        GRID_EXPORT_SIM: UnitOfEnergy.KILO_WATT_HOUR,
+        ATTR_ENERGY_SAVED: UnitOfEnergy.KILO_WATT_HOUR,
+        ATTR_MONEY_SAVED: hass.config.currency,
+    }
+    statistic_ids = []
+    for total, statistics in rows.items():
+        statistic = statistic_id(name, total)
+        statistic_ids.append(statistic)
+        if statistics:
+            async_add_external_statistics(
+                hass,
+                _statistic_metadata(f"{name} {total}", statistic, units[total]),
+                statistics,
+            )
+    hours = len(rows[GRID_IMPORT_SIM])
+    _LOGGER.debug(
+        "(%s) Backfilled %s hours from %s replayed ticks", name, hours, replay.ticks
+    )
+    return BackfillResult(replay, hours, statistic_ids)
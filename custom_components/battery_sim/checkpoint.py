@@ -0,0 +1,234 @@
+"""One persistent, versioned checkpoint of each simulated battery.
+
+The checkpoint holds everything a battery needs to carry on after a restart:
+its charge, the time of its last update, the sensor totals, the mode, the
+pause switch and the sliders. It
+is read once before the battery's entities are added and written through
+Home Assistant's storage at most every CHECKPOINT_SAVE_DELAY seconds, on
+unload and when Home Assistant stops.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+import logging
+
+from homeassistant.const import (
+    EVENT_HOMEASSISTANT_FINAL_WRITE,
+    STATE_ON,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+)
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers import restore_state
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from .const import (
+    ATTR_BATTERY_MODE,
+    ATTR_DATE_RECORDING_STARTED,
+    ATTR_STORED_ENERGY_VALUE,
+    BATTERY_MODES,
+    CHARGE_LIMIT,
+    DISCHARGE_LIMIT,
+    DOMAIN,
+    MAXIMUM_SOC,
+    MINIMUM_SOC,
+    PAUSE_BATTERY,
+)
+from .helpers import battery_entity_name
+
+_LOGGER = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+CHECKPOINT_SAVE_DELAY = 300
+
+CHARGE_STATE = "charge_state"
+LAST_UPDATE = "last_update"
+STORED_ENERGY_VALUE = "stored_energy_value"
+DATE_RECORDING_STARTED = "date_recording_started"
+SENSORS = "sensors"
+LAST_RESETS = "last_resets"
+MODE = "battery_mode"
+SWITCHES = "switches"
+SLIDERS = "sliders"
+
+SLIDER_KEYS = (CHARGE_LIMIT, DISCHARGE_LIMIT, MINIMUM_SOC, MAXIMUM_SOC)
+
+_INVALID_STATES = {None, "", STATE_UNKNOWN, STATE_UNAVAILABLE}
+
+
+def checkpoint_key(handle) -> str:
+    """Return the storage key of a battery's checkpoint."""
+    return handle._entry_id or slugify(handle._name)
+
+
+class BatteryCheckpoint:
+    """Load, debounce and write the checkpoint of one battery.
+
+    `data_func` returns the checkpoint to write; it is called at write time,
+    so the saved checkpoint is always the battery's latest state.
+    """
+
+    def __init__(self, hass, key: str, data_func: Callable[[], dict] | None = None):
+        """Initialize the checkpoint without reading it."""
+        self._hass = hass
+        self._store = Store(hass, CHECKPOINT_VERSION, f"{DOMAIN}.{key}")
+        self._data_func = data_func
+        self._cancel_save: CALLBACK_TYPE | None = None
+        self._unsub_final_write: CALLBACK_TYPE | None = None
+        self.saves = 0
+
+    async def async_load(self) -> dict | None:
+        """Return the saved checkpoint, or None when there is none."""
+        return await self._store.async_load()
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Write the checkpoint within CHECKPOINT_SAVE_DELAY seconds.
+
+        Calls while a write is pending are folded into it, so a battery that
+        updates every minute still writes at most once per delay.
+        """
+        if self._cancel_save is not None:
+            return
+        self._cancel_save = async_call_later(
+            self._hass, CHECKPOINT_SAVE_DELAY, self._async_delayed_save
+        )
+        if self._unsub_final_write is None:
+            self._unsub_final_write = self._hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_FINAL_WRITE, self._async_final_write
+            )
+
+    async def _async_delayed_save(self, _now) -> None:
+        self._cancel_save = None
+        await self.async_save()
+
+    async def _async_final_write(self, _event) -> None:
+        self._unsub_final_write = None
+        if self._cancel_save is not None:
+            await self.async_save()
+
+    async def async_save(self) -> None:
+        """Write the checkpoint now, replacing any pending write."""
+        if self._cancel_save is not None:
+            self._cancel_save()
+            self._cancel_save = None
+        await self._store.async_save(self._data_func())
+        self.saves += 1
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop any pending write without writing."""
+        if self._cancel_save is not None:
+            self._cancel_save()
+            self._cancel_save = None
+        if self._unsub_final_write is not None:
+            self._unsub_final_write()
+            self._unsub_final_write = None
+
+    async def async_remove(self) -> None:
+        """Delete the saved checkpoint."""
+        self.async_cancel()
+        await self._store.async_remove()
+
+
+def _last_state(hass, last_states, platform, unique_id, name):
+    """Return the state a removed restore entity saved at the last shutdown."""
+    entity_id = er.async_get(hass).async_get_entity_id(platform, DOMAIN, unique_id)
+    stored = last_states.get(entity_id or f"{platform}.{slugify(name)}")
+    return stored if stored is not None and stored.state.state not in _INVALID_STATES else None
+
+
+def legacy_checkpoint(hass, handle) -> dict | None:
+    """Return a checkpoint built from the states the battery entities last saved.
+
+    Earlier versions restored every entity on its own from Home Assistant's
+    restore cache. This reads those states once, so batteries carry on after
+    upgrading. Returns None when nothing was saved.
+    """
+    try:
+        last_states = restore_state.async_get(hass).last_states
+    except KeyError:
+        return None
+    name = handle._name
+    data: dict = {}
+
+    battery = _last_state(hass, last_states, "sensor", name, name)
+    if battery is not None:
+        data[CHARGE_STATE] = battery.state.state
+        if ATTR_DATE_RECORDING_STARTED in battery.state.attributes:
+            data[DATE_RECORDING_STARTED] = battery.state.attributes[
+                ATTR_DATE_RECORDING_STARTED
+            ]
+
+    sensors = {}
+    last_resets = {}
+    for key, value in handle._sensors.items():
+        if not isinstance(value, (int, float)):
+            continue
+        stored = _last_state(
+            hass,
+            last_states,
+            "sensor",
+            f"{name} - {key}",
+            battery_entity_name(name, key.replace("_", " ").capitalize()),
+        )
+        if stored is None:
+            continue
+        sensors[key] = stored.state.state
+        attributes = stored.state.attributes
+        if attributes.get(ATTR_STORED_ENERGY_VALUE) is not None:
+            data[STORED_ENERGY_VALUE] = attributes[ATTR_STORED_ENERGY_VALUE]
+        if attributes.get("last_reset") is not None:
+            last_resets[key] = attributes["last_reset"]
+    if sensors:
+        data[SENSORS] = sensors
+    if last_resets:
+        data[LAST_RESETS] = last_resets
+
+    mode = _last_state(
+        hass,
+        last_states,
+        "select",
+        f"{name} - Battery Mode",
+        battery_entity_name(name, "Battery Mode"),
+    )
+    if mode is not None:
+        # States stored before the internal mode attribute existed only carry
+        # the displayed option.
+        data[MODE] = mode.state.attributes.get(ATTR_BATTERY_MODE) or next(
+            (
+                option
+                for option in BATTERY_MODES
+                if option.replace("_", " ").capitalize() == mode.state.state
+            ),
+            mode.state.state,
+        )
+
+    pause = _last_state(
+        hass,
+        last_states,
+        "switch",
+        f"{name} - {PAUSE_BATTERY}",
+        battery_entity_name(name, PAUSE_BATTERY.replace("_", " ").capitalize()),
+    )
+    if pause is not None:
+        data[SWITCHES] = {PAUSE_BATTERY: pause.state.state == STATE_ON}
+
+    sliders = {}
+    for key in SLIDER_KEYS:
+        stored = _last_state(
+            hass,
+            last_states,
+            "number",
+            f"{name} - {key}",
+            battery_entity_name(name, key.replace("_", " ").capitalize()),
+        )
+        if stored is not None and stored.extra_data is not None:
+            sliders[key] = stored.extra_data.as_dict().get("native_value")
+    if sliders:
+        data[SLIDERS] = sliders
+
+    return data or None
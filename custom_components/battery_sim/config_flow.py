@@ -9,6 +9,7 @@ from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.selector import (
     EntitySelector,
     EntitySelectorConfig,
+    ObjectSelector,
     TextSelector,
     TextSelectorConfig,
     TextSelectorType,
@@ -27,6 +28,7 @@ from .const import (
     CONF_BATTERY_DISCHARGE_EFFICIENCY,
     CONF_BATTERY_EFFICIENCY,
     CONF_END_OF_LIFE_DEGRADATION,
+    CONF_DEGRADATION_CURVE,
     CONF_UPDATE_FREQUENCY,
     CONF_INPUT_LIST,
     CONF_RATED_BATTERY_CYCLES,
@@ -34,6 +36,8 @@ from .const import (
     CONF_NOMINAL_INVERTER_POWER,
     CONF_UNIQUE_NAME,
     CONF_MINIMUM_USER_SELECTABLE_SOC,
+    CONF_SHADOW_SCENARIOS,
+    CONF_TICK_JOURNAL,
     DEFAULT_MINIMUM_USER_SELECTABLE_SOC,
     SETUP_TYPE,
     CONFIG_FLOW,
@@ -50,8 +54,10 @@ from .const import (
 from .helpers import (
     generate_input_list,
     purge_leftover_battery_registry_entries,
+    validate_degradation_config,
     validate_efficiency_config,
 )
+from .scenarios import SHADOW_SCENARIOS_SCHEMA
 
 
 EFFICIENCY_TEXT_SELECTOR = TextSelector(
@@ -328,6 +334,7 @@ class BatteryOptionsFlowHandler(config_entries.OptionsFlow):
             menu_options=[
                 "main_params",
                 "input_sensors",
+                "shadow_scenarios",
                 "delete_leftover_entities",
                 "all_done",
             ],
@@ -375,6 +382,10 @@ class BatteryOptionsFlowHandler(config_entries.OptionsFlow):
         errors = {}
         if user_input is not None:
             errors = self._validate_efficiency_fields(user_input)
+            try:
+                validate_degradation_config(user_input.get(CONF_DEGRADATION_CURVE))
+            except ValueError:
+                errors[CONF_DEGRADATION_CURVE] = "invalid_input"
             if not errors:
                 self.updated_entry[CONF_BATTERY_SIZE] = user_input[CONF_BATTERY_SIZE]
                 self.updated_entry[CONF_BATTERY_MAX_CHARGE_RATE] = user_input[
@@ -395,6 +406,12 @@ class BatteryOptionsFlowHandler(config_entries.OptionsFlow):
                 self.updated_entry[CONF_END_OF_LIFE_DEGRADATION] = user_input[
                     CONF_END_OF_LIFE_DEGRADATION
                 ]
+                if (user_input.get(CONF_DEGRADATION_CURVE) or "").strip():
+                    self.updated_entry[CONF_DEGRADATION_CURVE] = user_input[
+                        CONF_DEGRADATION_CURVE
+                    ]
+                else:
+                    self.updated_entry.pop(CONF_DEGRADATION_CURVE, None)
                 self.updated_entry.pop(CONF_BATTERY_EFFICIENCY, None)
                 self.updated_entry[CONF_UPDATE_FREQUENCY] = user_input[
                     CONF_UPDATE_FREQUENCY
@@ -414,6 +431,7 @@ class BatteryOptionsFlowHandler(config_entries.OptionsFlow):
                     ]
                 else:
                     self.updated_entry.pop(CONF_NOMINAL_INVERTER_POWER, None)
+                self.updated_entry[CONF_TICK_JOURNAL] = user_input[CONF_TICK_JOURNAL]
                 self.hass.config_entries.async_update_entry(
                     self.config_entry,
                     data=self.updated_entry,
@@ -460,6 +478,12 @@ class BatteryOptionsFlowHandler(config_entries.OptionsFlow):
                 CONF_END_OF_LIFE_DEGRADATION,
                 default=self.updated_entry.get(CONF_END_OF_LIFE_DEGRADATION, 0.8),
             ): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+            vol.Optional(
+                CONF_DEGRADATION_CURVE,
+                description={
+                    "suggested_value": self.updated_entry.get(CONF_DEGRADATION_CURVE)
+                },
+            ): EFFICIENCY_TEXT_SELECTOR,
             vol.Required(
                 CONF_UPDATE_FREQUENCY,
                 default=self.updated_entry.get(CONF_UPDATE_FREQUENCY, 60),
@@ -483,6 +507,10 @@ class BatteryOptionsFlowHandler(config_entries.OptionsFlow):
                 CONF_NOMINAL_INVERTER_POWER,
                 default=self.updated_entry.get(CONF_NOMINAL_INVERTER_POWER),
             ): vol.Any(None, vol.All(vol.Coerce(float), vol.Range(min=0))),
+            vol.Required(
+                CONF_TICK_JOURNAL,
+                default=self.updated_entry.get(CONF_TICK_JOURNAL, False),
+            ): bool,
         }
         return self.async_show_form(
             step_id="main_params",
@@ -490,6 +518,41 @@ class BatteryOptionsFlowHandler(config_entries.OptionsFlow):
             errors=errors,
         )
 
+    async def async_step_shadow_scenarios(self, user_input=None):
+        errors = {}
+        if user_input is not None:
+            try:
+                scenarios = SHADOW_SCENARIOS_SCHEMA(
+                    user_input.get(CONF_SHADOW_SCENARIOS) or []
+                )
+            except vol.Invalid:
+                errors[CONF_SHADOW_SCENARIOS] = "invalid_input"
+            else:
+                if scenarios:
+                    self.updated_entry[CONF_SHADOW_SCENARIOS] = scenarios
+                else:
+                    self.updated_entry.pop(CONF_SHADOW_SCENARIOS, None)
+                self.hass.config_entries.async_update_entry(
+                    self.config_entry,
+                    data=self.updated_entry,
+                    options=self.config_entry.options,
+                )
+                return await self.async_step_init()
+
+        data_schema = {
+            vol.Optional(
+                CONF_SHADOW_SCENARIOS,
+                description={
+                    "suggested_value": self.updated_entry.get(CONF_SHADOW_SCENARIOS)
+                },
+            ): ObjectSelector(),
+        }
+        return self.async_show_form(
+            step_id="shadow_scenarios",
+            data_schema=vol.Schema(data_schema),
+            errors=errors,
+        )
+
     async def async_step_input_sensors(self, user_input=None):
         """Handle options flow."""
         self.current_input_entry = None
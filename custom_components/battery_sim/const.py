@@ -30,15 +30,21 @@ CONF_BATTERY_CHARGE_EFFICIENCY = "charge_efficiency"
 ATTR_LAST_CHARGE_EFFICIENCY = "last charge efficiency"
 ATTR_LAST_DISCHARGE_EFFICIENCY = "last discharge efficiency"
 MINIMUM_UPDATE_INTERVAL_SECONDS = 5
+# A change of the grid power by this fraction of the larger battery rate
+# brings the next update forward, down to the minimum update interval.
+ADAPTIVE_POWER_CHANGE_FRACTION = 0.25
 CONF_ENERGY_TARIFF = "energy_tariff"
 CONF_ENERGY_IMPORT_TARIFF = "energy_import_tariff"
 CONF_ENERGY_EXPORT_TARIFF = "energy_export_tariff"
 CONF_UNIQUE_NAME = "unique_name"
 CONF_RATED_BATTERY_CYCLES = "rated_battery_cycles"
 CONF_END_OF_LIFE_DEGRADATION = "end_of_life_degradation"
+CONF_DEGRADATION_CURVE = "degradation_curve"
+CONF_TICK_JOURNAL = "tick_journal"
 CONF_UPDATE_FREQUENCY = "update_frequency"
 CONF_MINIMUM_USER_SELECTABLE_SOC = "minimum_user_selectable_soc"
 DEFAULT_MINIMUM_USER_SELECTABLE_SOC = 0.10
+CONF_SHADOW_SCENARIOS = "shadow_scenarios"
 TARIFF_TYPE = "tariff_type"
 NO_TARIFF_INFO = "No tariff information"
 TARIFF_SENSOR = "tariff_sensor"
@@ -80,6 +86,15 @@ DISCHARGE_ONLY = "discharge_only"
 PAUSE_BATTERY = "pause_battery"
 RESET_BATTERY = "reset_battery"
 DEFAULT_MODE = "default_mode"
+BATTERY_MODES = [
+    DEFAULT_MODE,
+    OVERRIDE_CHARGING,
+    PAUSE_BATTERY,
+    FORCE_DISCHARGE,
+    CHARGE_ONLY,
+    DISCHARGE_ONLY,
+]
+ATTR_BATTERY_MODE = "battery_mode"
 PERCENTAGE_ENERGY_IMPORT_SAVED = "percentage_import_energy_saved"
 BATTERY_CYCLES = "battery_cycles"
 BATTERY_DEGRADATION = "battery_degradation"
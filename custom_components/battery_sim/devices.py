@@ -0,0 +1,88 @@
+"""Resolve Home Assistant device ids to battery handles."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers import device_registry as dr
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DEVICE_INDEX_KEY = f"{DOMAIN}_device_index"
+
+
+class BatteryDeviceIndex:
+    """Map device identifiers and device ids to the battery handles they belong to.
+
+    Identifiers are indexed when a battery is added. Device ids are resolved
+    through the device registry the first time they are used and then cached
+    until the device registry reports a change to that device, so service
+    calls resolve their battery with dictionary lookups.
+    """
+
+    def __init__(self, hass):
+        """Initialize an empty index."""
+        self._hass = hass
+        self._by_identifier: dict[tuple[str, str], object] = {}
+        self._by_device_id: dict[str, object] = {}
+        self._unsub_registry: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_add(self, handle) -> CALLBACK_TYPE:
+        """Index a battery handle; return a callback removing it again."""
+        identifiers = handle.known_device_identifiers
+        for identifier in identifiers:
+            self._by_identifier.setdefault(identifier, handle)
+        self._by_device_id.clear()
+        if self._unsub_registry is None:
+            self._unsub_registry = self._hass.bus.async_listen(
+                dr.EVENT_DEVICE_REGISTRY_UPDATED, self._async_device_registry_updated
+            )
+
+        @callback
+        def async_remove():
+            for identifier in identifiers:
+                if self._by_identifier.get(identifier) is handle:
+                    del self._by_identifier[identifier]
+            self._by_device_id.clear()
+            if not self._by_identifier and self._unsub_registry is not None:
+                self._unsub_registry()
+                self._unsub_registry = None
+
+        return async_remove
+
+    @callback
+    def async_get_handle(self, device_id: str):
+        """Return the battery handle of a device id, or None after logging why."""
+        handle = self._by_device_id.get(device_id)
+        if handle is not None:
+            return handle
+
+        device = dr.async_get(self._hass).async_get(device_id)
+        if not device:
+            _LOGGER.error("Device not found: %s", device_id)
+            return None
+
+        for identifier in device.identifiers:
+            handle = self._by_identifier.get(identifier)
+            if handle is not None:
+                self._by_device_id[device_id] = handle
+                return handle
+
+        _LOGGER.error("No handle matched for device_id: %s", device_id)
+        return None
+
+    @callback
+    def _async_device_registry_updated(self, event) -> None:
+        """Forget the cached handle of a device that changed or was removed."""
+        self._by_device_id.pop(event.data["device_id"], None)
+
+
+@callback
+def async_get_device_index(hass) -> BatteryDeviceIndex:
+    """Return the device index of the integration, creating it when needed."""
+    if DEVICE_INDEX_KEY not in hass.data:
+        hass.data[DEVICE_INDEX_KEY] = BatteryDeviceIndex(hass)
+    return hass.data[DEVICE_INDEX_KEY]
@@ -0,0 +1,67 @@
+"""Diagnostics support for battery_sim."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the configuration, state and hot-path counters of a battery."""
+    handle = hass.data[DOMAIN][entry.entry_id]
+    meter_ids = list(handle._inputs_by_sensor_id)
+    if handle._solar_entity_id is not None:
+        meter_ids.append(handle._solar_entity_id)
+
+    meters = {}
+    for sensor_id in meter_ids:
+        source = handle._meter_hub.source(sensor_id)
+        meters[sensor_id] = {
+            "units": source.units,
+            "readings": source.readings,
+            "dropped_readings": source.dropped_readings,
+        }
+
+    journal = handle._trace.journal
+    update_frequency = int(handle._update_frequency)
+    return {
+        "config": dict(entry.data),
+        "options": dict(entry.options),
+        "battery": {
+            "charge_state": handle._charge_state,
+            "max_capacity": handle.current_max_capacity,
+            "last_update": handle._last_battery_update_time,
+            "update_pending": handle._pending_update_cancel is not None,
+            "accumulated_import": handle._accumulated_import_reading,
+            "accumulated_export": handle._accumulated_export_reading,
+            "accumulated_solar": handle._accumulated_solar_reading,
+        },
+        "stats": handle._stats.as_dict(),
+        "state_writes": {
+            "writes": handle._publisher.writes,
+            "skipped_writes": handle._publisher.skipped_writes,
+        },
+        "meters": meters,
+        "tick_journal": (
+            {
+                "directory": str(journal.directory),
+                "records": journal.records,
+                "dropped": journal.dropped,
+            }
+            if journal is not None
+            else None
+        ),
+        "scenarios": (
+            handle._scenarios.results() if handle._scenarios is not None else []
+        ),
+        "scheduler": [
+            group
+            for group in handle._scheduler.stats
+            if group["interval"] == update_frequency
+        ],
+    }
@@ -1,6 +1,9 @@
+import math
 import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
 
-from homeassistant.const import CONF_NAME
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT, CONF_NAME, UnitOfEnergy
 from homeassistant.helpers import entity_registry as er
 
 from .const import (
@@ -133,16 +136,290 @@ def generate_input_list(config):
     return inputs
 
 
+# Factor converting a meter reading in the given unit to kWh.
+ENERGY_UNIT_CONVERSION_FACTORS = {
+    UnitOfEnergy.KILO_WATT_HOUR: 1.0,
+    UnitOfEnergy.WATT_HOUR: 0.001,
+}
+
+
+class MeterSource:
+    """An energy meter feeding the battery, with its kWh conversion cached.
+
+    Home Assistant reuses a state's attributes object while the attributes do
+    not change, so the unit is only read again when a new attributes object
+    arrives. `conversion_factor` is None for units other than kWh and Wh.
+    `readings` counts the state changes read and `dropped_readings` those
+    ignored because the meter was not ready or used an unsupported unit.
+    """
+
+    __slots__ = (
+        "sensor_id",
+        "units",
+        "conversion_factor",
+        "readings",
+        "dropped_readings",
+        "_attributes",
+    )
+
+    def __init__(self, sensor_id):
+        """Initialize the source for a meter entity."""
+        self.sensor_id = sensor_id
+        self.units = None
+        self.conversion_factor = None
+        self.readings = 0
+        self.dropped_readings = 0
+        self._attributes = None
+
+    def conversion_factor_for(self, state):
+        """Return the factor converting this state's reading to kWh, or None."""
+        attributes = state.attributes
+        if attributes is not self._attributes:
+            self._attributes = attributes
+            self.units = attributes.get(ATTR_UNIT_OF_MEASUREMENT)
+            self.conversion_factor = ENERGY_UNIT_CONVERSION_FACTORS.get(self.units)
+        return self.conversion_factor
+
+
+# Efficiencies are floored here when dividing by them.
+MINIMUM_EFFICIENCY = 0.000001
+
+
+def _is_non_decreasing(values):
+    return all(low <= high for low, high in zip(values, values[1:]))
+
+
+class EfficiencyCurve:
+    """Piecewise-linear efficiency over power, compiled for fast lookups.
+
+    Breakpoints and segment slopes are precomputed and segments are found by
+    bisection. The curve is immutable so handles can share one instance, and
+    it still compares equal to, and indexes like, its list of
+    (power_kw, efficiency) points.
+    """
+
+    __slots__ = (
+        "points",
+        "constant",
+        "_powers",
+        "_efficiencies",
+        "_slopes",
+        "_stored_powers",
+        "_stored_powers_increase",
+        "_drawn_powers",
+        "_drawn_powers_increase",
+    )
+
+    def __init__(self, points):
+        """Compile the curve from (power_kw, efficiency) points sorted by power."""
+        points = tuple((float(power), float(efficiency)) for power, efficiency in points)
+        if not points:
+            raise ValueError("Efficiency curve must contain at least one point")
+        self.points = points
+        self.constant = points[0][1] if len(points) == 1 else None
+        self._powers = tuple(power for power, _ in points)
+        self._efficiencies = tuple(efficiency for _, efficiency in points)
+        self._slopes = tuple(
+            (end_efficiency - start_efficiency) / (end_power - start_power)
+            if end_power != start_power
+            else 0.0
+            for (start_power, start_efficiency), (end_power, end_efficiency) in zip(
+                points, points[1:]
+            )
+        )
+        # Battery-side power at each breakpoint: what is stored when charging
+        # and what is drawn when discharging. Clipping bisects these while
+        # they increase with power, which holds for any realistic curve.
+        self._stored_powers = tuple(
+            power * efficiency for power, efficiency in points
+        )
+        self._drawn_powers = tuple(
+            power / efficiency if efficiency > 0.0 else math.inf
+            for power, efficiency in points
+        )
+        self._stored_powers_increase = _is_non_decreasing(self._stored_powers)
+        self._drawn_powers_increase = _is_non_decreasing(self._drawn_powers)
+
+    def efficiency_at(self, power_kw):
+        """Return the efficiency at the given power using linear interpolation."""
+        if self.constant is not None:
+            return self.constant
+        powers = self._powers
+        if power_kw <= powers[0]:
+            return self._efficiencies[0]
+        index = bisect_left(powers, power_kw, 1)
+        if index == len(powers):
+            return self._efficiencies[-1]
+        return self._efficiencies[index - 1] + (
+            (power_kw - powers[index - 1]) * self._slopes[index - 1]
+        )
+
+    def evaluate_many(self, powers_kw):
+        """Return the efficiencies for a sequence of powers as a list."""
+        if self.constant is not None:
+            return [self.constant] * len(powers_kw)
+        efficiency_at = self.efficiency_at
+        return [efficiency_at(power_kw) for power_kw in powers_kw]
+
+    def clip_charge(self, amount, interval_hours, headroom):
+        """Return the largest charge input, up to `amount`, that fits the headroom.
+
+        `amount` is input-side energy in kWh over `interval_hours` and
+        `headroom` the battery-internal energy that can still be stored. The
+        stored energy a * e(a / h) is quadratic in a on every curve segment,
+        so the crossing is solved exactly instead of iterated.
+        """
+        if amount <= 0.0:
+            return amount
+        if self.constant is not None:
+            return min(amount, headroom / max(self.constant, MINIMUM_EFFICIENCY))
+        power = amount / interval_hours
+        if amount * self.efficiency_at(power) <= headroom:
+            return amount
+
+        segment = self._bracket(
+            power,
+            self._stored_powers,
+            self._stored_powers_increase,
+            headroom / interval_hours,
+        )
+        # On the segment, stored energy is quadratic * a^2 + linear * a.
+        efficiency, slope, start_power = self._segment(segment)
+        quadratic = slope / interval_hours
+        linear = efficiency - slope * start_power
+        root = math.sqrt(max(linear * linear + 4.0 * quadratic * headroom, 0.0))
+        # The bracket guarantees the crossing is the root below; the first
+        # form is the numerically stable one and also covers a flat segment.
+        if linear > 0.0:
+            clipped_amount = 2.0 * headroom / (linear + root)
+        else:
+            clipped_amount = (root - linear) / (2.0 * quadratic)
+        return self._clamp_to_segment(clipped_amount, segment, amount, interval_hours)
+
+    def clip_discharge(self, amount, interval_hours, available):
+        """Return the largest discharge output, up to `amount`, that is available.
+
+        `amount` is delivered energy in kWh over `interval_hours` and
+        `available` the battery-internal energy that may be drawn. Delivering d
+        needs d <= available * e(d / h), which is linear in d on every curve
+        segment, so the crossing is solved exactly instead of iterated.
+        """
+        if amount <= 0.0:
+            return amount
+        if self.constant is not None:
+            return min(amount, available * self.constant)
+        power = amount / interval_hours
+        if amount <= available * self.efficiency_at(power):
+            return amount
+
+        segment = self._bracket(
+            power,
+            self._drawn_powers,
+            self._drawn_powers_increase,
+            available / interval_hours,
+        )
+        efficiency, slope, start_power = self._segment(segment)
+        clipped_amount = (
+            available
+            * (efficiency - slope * start_power)
+            / (1.0 - available * slope / interval_hours)
+        )
+        return self._clamp_to_segment(clipped_amount, segment, amount, interval_hours)
+
+    def _segment(self, segment):
+        """Return (efficiency, slope, power) at the start of a curve segment.
+
+        Segment 0 lies below the first point and segment len(points) above
+        the last one; both have a constant efficiency. Segment i in between
+        ends at point i.
+        """
+        if segment == 0:
+            return self._efficiencies[0], 0.0, 0.0
+        if segment == len(self._powers):
+            return self._efficiencies[-1], 0.0, 0.0
+        return (
+            self._efficiencies[segment - 1],
+            self._slopes[segment - 1],
+            self._powers[segment - 1],
+        )
+
+    def _bracket(self, power, limits, limits_increase, limit):
+        """Return the segment holding the largest crossing below `power`.
+
+        `limits` holds the battery-side power at each breakpoint. The crossing
+        lies in the segment that starts at the last breakpoint, below `power`,
+        whose limit is still within `limit`.
+        """
+        powers = self._powers
+        top = 0 if power <= powers[0] else bisect_left(powers, power, 1)
+        if limits_increase:
+            return bisect_right(limits, limit, 0, top)
+        for index in range(top - 1, -1, -1):
+            if limits[index] <= limit:
+                return index + 1
+        return 0
+
+    def _clamp_to_segment(self, amount, segment, requested, interval_hours):
+        """Clamp a solved amount to its segment, absorbing rounding at the ends."""
+        powers = self._powers
+        if segment > 0:
+            amount = max(amount, powers[segment - 1] * interval_hours)
+        if segment < len(powers):
+            requested = min(requested, powers[segment] * interval_hours)
+        return min(amount, requested)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def __getitem__(self, index):
+        return self.points[index]
+
+    def __eq__(self, other):
+        if isinstance(other, EfficiencyCurve):
+            return self.points == other.points
+        if isinstance(other, (list, tuple)):
+            return self.points == tuple(tuple(point) for point in other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.points)
+
+    def __repr__(self):
+        return f"EfficiencyCurve({list(self.points)!r})"
+
+
 def parse_efficiency_curve(raw_value):
+    """Parse an efficiency config value into a compiled EfficiencyCurve.
+
+    Curves are cached by their points, so batteries configured with the same
+    efficiency share one instance however the value is written.
+    """
+    if raw_value is None:
+        raise ValueError("Efficiency value is required")
+    return _efficiency_curve(raw_value)
+
+
+@lru_cache(maxsize=256)
+def _efficiency_curve(raw_value):
+    # Evicting a config value here only costs a parse, the curve stays shared.
+    return _compile_efficiency_curve(tuple(_parse_efficiency_points(raw_value)))
+
+
+@lru_cache(maxsize=None)
+def _compile_efficiency_curve(points):
+    return EfficiencyCurve(points)
+
+
+def _parse_efficiency_points(raw_value):
     """Parse an efficiency config value into sorted (power_kw, efficiency) points."""
     if isinstance(raw_value, (int, float)):
         value = float(raw_value)
         _validate_efficiency(value)
         return [(0.0, value)]
 
-    if raw_value is None:
-        raise ValueError("Efficiency value is required")
-
     text = str(raw_value).strip()
     if not text:
         raise ValueError("Efficiency value is required")
@@ -193,22 +470,9 @@ def validate_efficiency_config(raw_value):
 
 def interpolate_efficiency(curve_points, power_kw):
     """Return the efficiency for the requested power using linear interpolation."""
-    if not curve_points:
-        raise ValueError("Efficiency curve must contain at least one point")
-
-    if len(curve_points) == 1 or power_kw <= curve_points[0][0]:
-        return curve_points[0][1]
-
-    for (start_power, start_efficiency), (end_power, end_efficiency) in zip(
-        curve_points, curve_points[1:]
-    ):
-        if power_kw <= end_power:
-            if end_power == start_power:
-                return end_efficiency
-            ratio = (power_kw - start_power) / (end_power - start_power)
-            return start_efficiency + ratio * (end_efficiency - start_efficiency)
-
-    return curve_points[-1][1]
+    if not isinstance(curve_points, EfficiencyCurve):
+        curve_points = EfficiencyCurve(curve_points)
+    return curve_points.efficiency_at(power_kw)
 
 
 def _validate_efficiency(value):
@@ -216,6 +480,137 @@ def _validate_efficiency(value):
         raise ValueError("Efficiency values must be between 0 and 1")
 
 
+# Equal cells the cycle range of a degradation curve is split into.
+DEGRADATION_LOOKUP_CELLS = 256
+
+
+class DegradationCurve:
+    """Piecewise-linear capacity factor over battery cycles, compiled for lookups.
+
+    The cycle range of the points is split into DEGRADATION_LOOKUP_CELLS equal
+    cells, and a table holds the first segment each cell can be in, so a
+    lookup is an index and at most a comparison per breakpoint in the cell,
+    however many points the curve has. Below the first point and beyond the
+    last the factor stays at their values.
+    """
+
+    __slots__ = (
+        "points",
+        "cycles",
+        "factors",
+        "_changes",
+        "_spans",
+        "_cells_per_cycle",
+        "_cell_segments",
+    )
+
+    def __init__(self, points):
+        """Compile the curve from (cycles, capacity factor) points sorted by cycles."""
+        points = tuple((float(cycles), float(factor)) for cycles, factor in points)
+        if not points:
+            raise ValueError("Degradation curve must contain at least one point")
+        self.points = points
+        self.cycles = tuple(cycles for cycles, _ in points)
+        self.factors = tuple(factor for _, factor in points)
+        self._changes = tuple(
+            end - start for start, end in zip(self.factors, self.factors[1:])
+        )
+        self._spans = tuple(
+            end - start for start, end in zip(self.cycles, self.cycles[1:])
+        )
+        if len(points) == 1:
+            self._cells_per_cycle = 0.0
+            self._cell_segments = ()
+            return
+        self._cells_per_cycle = DEGRADATION_LOOKUP_CELLS / (
+            self.cycles[-1] - self.cycles[0]
+        )
+        # Cells are found with the same arithmetic as in factor_at, so every
+        # cycles value in a cell is past the breakpoints of earlier cells.
+        breakpoint_cells = [self._cell(cycles) for cycles in self.cycles[1:-1]]
+        segment = 0
+        cell_segments = []
+        for cell in range(DEGRADATION_LOOKUP_CELLS + 1):
+            while (
+                segment < len(breakpoint_cells) and breakpoint_cells[segment] < cell
+            ):
+                segment += 1
+            cell_segments.append(segment)
+        self._cell_segments = tuple(cell_segments)
+
+    def _cell(self, cycles):
+        return int((cycles - self.cycles[0]) * self._cells_per_cycle)
+
+    def factor_at(self, cycles):
+        """Return the capacity factor after the given cycles."""
+        curve_cycles = self.cycles
+        if cycles <= curve_cycles[0]:
+            return self.factors[0]
+        if cycles >= curve_cycles[-1]:
+            return self.factors[-1]
+        segment = self._cell_segments[self._cell(cycles)]
+        while cycles >= curve_cycles[segment + 1]:
+            segment += 1
+        return self.factors[segment] + self._changes[segment] * (
+            (cycles - curve_cycles[segment]) / self._spans[segment]
+        )
+
+    def __eq__(self, other):
+        if isinstance(other, DegradationCurve):
+            return self.points == other.points
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.points)
+
+    def __repr__(self):
+        return f"DegradationCurve({list(self.points)!r})"
+
+
+def parse_degradation_curve(raw_value):
+    """Parse a degradation curve config value, or return None when it is unset.
+
+    The value lists cycles:capacity pairs, the capacity as a fraction of the
+    new battery's, such as `0:1, 1000:0.95, 6000:0.8`. Curves are cached by
+    their points, so batteries with the same curve share one instance.
+    """
+    if raw_value is None or not str(raw_value).strip():
+        return None
+    return _compile_degradation_curve(tuple(_parse_degradation_points(raw_value)))
+
+
+@lru_cache(maxsize=None)
+def _compile_degradation_curve(points):
+    return DegradationCurve(points)
+
+
+def _parse_degradation_points(raw_value):
+    """Parse a degradation curve config value into sorted (cycles, factor) points."""
+    pair_matches = re.findall(
+        r"\(?\s*(-?\d+(?:\.\d+)?)\s*[,:\s]\s*(-?\d+(?:\.\d+)?)\s*\)?",
+        str(raw_value).replace(";", ","),
+    )
+    if not pair_matches:
+        raise ValueError("Use cycles/capacity pairs like 0:1, 1000:0.95, 6000:0.8")
+
+    points = {}
+    for cycles_text, factor_text in pair_matches:
+        cycles = float(cycles_text)
+        factor = float(factor_text)
+        if cycles < 0:
+            raise ValueError("Degradation curve cycles must be >= 0")
+        if not 0 < factor <= 1:
+            raise ValueError("Degradation curve capacities must be above 0 and at most 1")
+        points[cycles] = factor
+    return sorted(points.items())
+
+
+def validate_degradation_config(raw_value):
+    """Validate the configured degradation curve and return the raw value."""
+    parse_degradation_curve(raw_value)
+    return raw_value
+
+
 BASE_SENSOR_UNIQUE_ID_SUFFIXES = (
     ATTR_ENERGY_SAVED,
     ATTR_ENERGY_BATTERY_OUT,
@@ -0,0 +1,276 @@
+"""Optional on-disk journal of every tick of a battery.
+
+The journal is a directory of segment files. Each holds a small header and
+a fixed number of fixed-size records, the fields of the tick trace with the
+time as a double and the rest as single precision floats, 64 bytes a tick.
+Records are appended through a memory map of the current segment, so a tick
+only copies its record into memory and the kernel writes it back to disk.
+Creating, flushing and pruning segments happens in the executor: the next
+segment is always prepared before the current one fills, and ticks that
+find no segment ready are counted as dropped instead of waiting for one.
+
+read_journal() maps the segments back as NumPy structured arrays without
+copying them, for analysis outside Home Assistant.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import mmap
+import os
+from pathlib import Path
+import shutil
+import struct
+import threading
+
+import numpy as np
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN
+from .trace import TICK_FIELDS, TICK_RECORD
+
+_LOGGER = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+# 45 days of one-minute ticks, 4 MiB, per segment.
+JOURNAL_SEGMENT_RECORDS = 65536
+# Segments kept per battery, the oldest are deleted beyond these.
+JOURNAL_MAX_SEGMENTS = 12
+JOURNAL_SUFFIX = ".ticks"
+
+JOURNAL_RECORD = struct.Struct(f"<d{len(TICK_FIELDS) - 1}f")
+JOURNAL_DTYPE = np.dtype(
+    [(TICK_FIELDS[0], "<f8"), *((field, "<f4") for field in TICK_FIELDS[1:])]
+)
+# Magic, version, record size, capacity and record count.
+_HEADER = struct.Struct("<4sHHII")
+_MAGIC = b"BSTJ"
+_COUNT = struct.Struct("<I")
+_COUNT_OFFSET = _HEADER.size - _COUNT.size
+
+
+def journal_directory(hass: HomeAssistant, key: str) -> Path:
+    """Return the journal directory of the battery with the given storage key."""
+    return Path(hass.config.path(DOMAIN, "journal", key))
+
+
+class _Segment:
+    """One memory-mapped segment file, written by appending records."""
+
+    __slots__ = ("path", "capacity", "count", "_file", "_map")
+
+    def __init__(self, path: Path, file, capacity: int, count: int):
+        self.path = path
+        self.capacity = capacity
+        self.count = count
+        self._file = file
+        self._map = mmap.mmap(
+            file.fileno(), _HEADER.size + capacity * JOURNAL_RECORD.size
+        )
+
+    @classmethod
+    def create(cls, path: Path, capacity: int) -> _Segment:
+        """Create an empty segment with room for `capacity` records."""
+        size = _HEADER.size + capacity * JOURNAL_RECORD.size
+        file = open(path, "w+b")
+        if hasattr(os, "posix_fallocate"):
+            # Allocate the blocks now, so appends never wait for them.
+            os.posix_fallocate(file.fileno(), 0, size)
+        else:
+            file.truncate(size)
+        file.write(
+            _HEADER.pack(_MAGIC, JOURNAL_VERSION, JOURNAL_RECORD.size, capacity, 0)
+        )
+        file.flush()
+        return cls(path, file, capacity, 0)
+
+    @classmethod
+    def resume(cls, path: Path) -> _Segment | None:
+        """Open a segment to append to, or return None when it is full or invalid."""
+        try:
+            capacity, count = _read_header(path)
+        except (OSError, ValueError) as err:
+            _LOGGER.warning("Not appending to tick journal %s: %s", path, err)
+            return None
+        if count >= capacity:
+            return None
+        return cls(path, open(path, "r+b"), capacity, count)
+
+    def append(self, buffer, offset: int) -> bool:
+        """Append a tick trace record, returning True once the segment is full."""
+        count = self.count
+        JOURNAL_RECORD.pack_into(
+            self._map,
+            _HEADER.size + count * JOURNAL_RECORD.size,
+            *TICK_RECORD.unpack_from(buffer, offset),
+        )
+        count += 1
+        _COUNT.pack_into(self._map, _COUNT_OFFSET, count)
+        self.count = count
+        return count >= self.capacity
+
+    def close(self) -> None:
+        """Write the segment back to disk and close it."""
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+
+class TickJournal:
+    """Append the ticks of one battery to its journal directory.
+
+    `append` may be called from the event loop or, while the battery catches
+    up on recorded history, from the executor; a lock guards only the swap
+    of segments.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        directory: Path,
+        segment_records: int = JOURNAL_SEGMENT_RECORDS,
+        max_segments: int = JOURNAL_MAX_SEGMENTS,
+    ):
+        """Initialize the journal without touching the disk."""
+        self._hass = hass
+        self.directory = directory
+        self._segment_records = segment_records
+        self._max_segments = max_segments
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._segment: _Segment | None = None
+        self._next_segment: _Segment | None = None
+        self._preparing: set = set()
+        self._closed = False
+        self.records = 0
+        self.dropped = 0
+
+    async def async_open(self) -> None:
+        """Open the latest segment, or a new one, and prepare the next."""
+        self._segment, self._next_segment = await self._hass.async_add_executor_job(
+            self._open
+        )
+
+    async def async_close(self) -> None:
+        """Flush and close the segments once pending preparations are done."""
+        self._closed = True
+        if self._preparing:
+            await asyncio.wait(self._preparing)
+        with self._lock:
+            segment, self._segment = self._segment, None
+            next_segment, self._next_segment = self._next_segment, None
+        await self._hass.async_add_executor_job(self._close, segment, next_segment)
+
+    def append(self, buffer, offset: int) -> None:
+        """Append the tick trace record at `offset` of `buffer`."""
+        segment = self._segment
+        if segment is None:
+            self.dropped += 1
+            return
+        self.records += 1
+        if segment.append(buffer, offset):
+            self._rotate(segment)
+
+    def _rotate(self, full: _Segment) -> None:
+        """Move on to the prepared segment and have the full one closed."""
+        with self._lock:
+            self._segment, self._next_segment = self._next_segment, None
+        self._hass.loop.call_soon_threadsafe(self._async_prepare_next, full)
+
+    @callback
+    def _async_prepare_next(self, full: _Segment) -> None:
+        if self._closed:
+            self._hass.async_add_executor_job(full.close)
+            return
+        task = self._hass.async_create_task(self._async_prepare(full))
+        self._preparing.add(task)
+        task.add_done_callback(self._preparing.discard)
+
+    async def _async_prepare(self, full: _Segment) -> None:
+        try:
+            segment = await self._hass.async_add_executor_job(self._prepare, full)
+        except OSError as err:
+            _LOGGER.error("Could not rotate tick journal %s: %s", self.directory, err)
+            return
+        with self._lock:
+            if self._segment is None:
+                self._segment = segment
+            else:
+                self._next_segment = segment
+
+    def _open(self) -> tuple[_Segment, _Segment]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        paths = segment_paths(self.directory)
+        segment = None
+        if paths:
+            self._sequence = int(paths[-1].stem)
+            segment = _Segment.resume(paths[-1])
+        if segment is None:
+            segment = self._create()
+        return segment, self._create()
+
+    def _prepare(self, full: _Segment) -> _Segment:
+        full.close()
+        return self._create()
+
+    def _create(self) -> _Segment:
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        segment = _Segment.create(
+            self.directory / f"{sequence:08d}{JOURNAL_SUFFIX}", self._segment_records
+        )
+        for path in segment_paths(self.directory)[: -self._max_segments]:
+            path.unlink(missing_ok=True)
+        return segment
+
+    @staticmethod
+    def _close(segment: _Segment | None, next_segment: _Segment | None) -> None:
+        if segment is not None:
+            segment.close()
+        if next_segment is not None:
+            # Never written, the next open starts a fresh one anyway.
+            next_segment.close()
+            next_segment.path.unlink(missing_ok=True)
+
+
+def remove_journal(directory: Path) -> None:
+    """Delete a journal directory and its segments."""
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def segment_paths(directory: Path) -> list[Path]:
+    """Return the segment files of a journal, oldest first."""
+    return sorted(directory.glob(f"*{JOURNAL_SUFFIX}"))
+
+
+def _read_header(path: Path) -> tuple[int, int]:
+    with open(path, "rb") as file:
+        header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError("truncated header")
+    magic, version, record_size, capacity, count = _HEADER.unpack(header)
+    if magic != _MAGIC or version != JOURNAL_VERSION:
+        raise ValueError("not a tick journal segment")
+    if record_size != JOURNAL_RECORD.size:
+        raise ValueError(f"records of {record_size} bytes")
+    return capacity, min(count, capacity)
+
+
+def read_segment(path: Path) -> np.ndarray:
+    """Map the records of one segment as a read-only structured array."""
+    _capacity, count = _read_header(path)
+    if not count:
+        return np.empty(0, dtype=JOURNAL_DTYPE)
+    return np.memmap(
+        path, dtype=JOURNAL_DTYPE, mode="r", offset=_HEADER.size, shape=(count,)
+    )
+
+
+def read_journal(directory) -> list[np.ndarray]:
+    """Map every segment of a journal directory, oldest first, without copying.
+
+    Fields are named as in the tick trace; use np.concatenate to join them.
+    """
+    return [read_segment(path) for path in segment_paths(Path(directory))]
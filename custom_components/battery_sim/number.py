@@ -1,5 +1,3 @@
-#from homeassistant.components.number import NumberEntity
-from homeassistant.components.number import RestoreNumber
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.core import HomeAssistant
 from homeassistant.config_entries import ConfigEntry
@@ -84,7 +82,7 @@ async def async_setup_platform( hass, configuration, async_add_entities, discove
     return True
  
    
-class BatterySlider(RestoreNumber):
+class BatterySlider(NumberEntity):
     """Slider to set a numeric parameter for the simulated battery."""
 
     def __init__(self, handle, slider_type, key, icon, unit, precision):
@@ -100,20 +98,7 @@ class BatterySlider(RestoreNumber):
             handle._name, slider_type.replace("_", " ").capitalize()
         )
         self._attr_unique_id = f"{handle._name} - {slider_type}"
-        if key == "charge_limit":
-            self._max_value = handle._max_charge_rate
-            self._value = self._max_value
-        elif key == "discharge_limit":               
-            self._max_value = handle._max_discharge_rate
-            self._value = self._max_value
-        elif key == "minimum_soc":               
-            self._max_value = 100
-            self._min_value = handle.minimum_user_selectable_soc_percentage
-            self._value = self._min_value
-        elif key == "maximum_soc":               
-            self._max_value = 100
-            self._value = self._max_value
-        else:
+        if key not in ("charge_limit", "discharge_limit", "minimum_soc", "maximum_soc"):
             _LOGGER.debug("Reached undefined state in number.py")
         self._attr_icon = icon
         self._attr_native_unit_of_measurement = unit
@@ -135,13 +120,27 @@ class BatterySlider(RestoreNumber):
             "identifiers": {self._device_identifier},
         }
         
+    async def async_added_to_hass(self):
+        """Write the slider again when the battery settings change its range."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.handle._publisher.async_subscribe((), self.async_write_ha_state)
+        )
+
     @property
     def native_min_value(self):
-        return getattr(self, "_min_value", 0.00)
+        # Read from the handle, so settings changed in place apply at once.
+        if self._key == "minimum_soc":
+            return self.handle.minimum_user_selectable_soc_percentage
+        return 0.00
 
     @property
     def native_max_value(self):
-        return self._max_value
+        if self._key == "charge_limit":
+            return self.handle._battery_config.max_charge_rate
+        if self._key == "discharge_limit":
+            return self.handle._battery_config.max_discharge_rate
+        return 100
 
     @property
     def native_step(self):
@@ -149,26 +148,12 @@ class BatterySlider(RestoreNumber):
 
     @property
     def native_value(self):
-        return self._value
+        return self.handle.get_slider_limit(self._key)
 
     async def async_set_native_value(self, value: float) -> None:
         if self._key == "minimum_soc":
             value = max(float(value), self.native_min_value)
-        self._value = value
-     
         self.handle.set_slider_limit(value, self._key)
         # Recompute immediately so UI/control changes take effect right away.
         self.handle.async_trigger_update()
         self.async_write_ha_state()
-
-    async def async_added_to_hass(self):
-        """Restore previously saved value."""
-        await super().async_added_to_hass()
-
-        if (last_number_data := await self.async_get_last_number_data()) is not None:
-            restored_value = last_number_data.native_value
-            if self._key == "minimum_soc":
-                restored_value = max(float(restored_value), self.native_min_value)
-            self._value = restored_value
-            _LOGGER.debug("Restored %s to %.2f", self._key, self._value)
-            self.handle.set_slider_limit(self._value, self._key)  # Restore to handle too
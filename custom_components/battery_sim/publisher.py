@@ -0,0 +1,124 @@
+"""Coalesced, dirty-tracked state publication for the battery entities."""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import (
+    ATTR_DATE_RECORDING_STARTED,
+    ATTR_STORED_ENERGY_VALUE,
+    MESSAGE_TYPE_BATTERY_UPDATE,
+    PRECISION,
+)
+
+# Publication keys for handle values that do not live in the sensor dict.
+CHARGE_STATE = "charge_state"
+STORED_ENERGY_VALUE = ATTR_STORED_ENERGY_VALUE
+DATE_RECORDING_STARTED = ATTR_DATE_RECORDING_STARTED
+
+_UNSET = object()
+
+
+def _published_value(value):
+    """Return the value as entities publish it, so noise below PRECISION is ignored."""
+    if isinstance(value, float):
+        return round(value, PRECISION)
+    return value
+
+
+def meter_reading_key(simulated_sensor: str) -> str:
+    """Return the publication key of the real meter behind a simulated sensor."""
+    return f"{simulated_sensor}_meter_reading"
+
+
+class BatteryStatePublisher:
+    """Write the battery entities whose values changed, once per update signal.
+
+    Entities subscribe with the publication keys they display: `_sensors` keys
+    of the handle, CHARGE_STATE, STORED_ENERGY_VALUE, DATE_RECORDING_STARTED
+    and the meter_reading_key() of each simulated meter. Each battery
+    update signal runs a single pass that compares the current values, rounded
+    to PRECISION, against the previous pass and writes only the entities that
+    display a changed key. An entity's first pass after subscribing always
+    writes.
+    """
+
+    def __init__(self, hass, handle):
+        """Initialize the publisher for one battery handle."""
+        self._hass = hass
+        self._handle = handle
+        self._subscribers: list[tuple[frozenset, Callable[[], None]]] = []
+        self._pending: set = set()
+        self._published: dict = {}
+        self._unsub_dispatcher: CALLBACK_TYPE | None = None
+        self.writes = 0
+        self.skipped_writes = 0
+
+    @callback
+    def async_subscribe(
+        self, keys: Iterable[str], write_state: Callable[[], None]
+    ) -> CALLBACK_TYPE:
+        """Call `write_state` whenever one of `keys` changes; return an unsubscribe."""
+        subscriber = (frozenset(keys), write_state)
+        self._subscribers.append(subscriber)
+        self._pending.add(subscriber)
+        if self._unsub_dispatcher is None:
+            self._unsub_dispatcher = async_dispatcher_connect(
+                self._hass,
+                f"{self._handle.name}-{MESSAGE_TYPE_BATTERY_UPDATE}",
+                self.async_publish,
+            )
+
+        @callback
+        def async_unsubscribe():
+            self._subscribers.remove(subscriber)
+            self._pending.discard(subscriber)
+            if not self._subscribers and self._unsub_dispatcher is not None:
+                self._unsub_dispatcher()
+                self._unsub_dispatcher = None
+
+        return async_unsubscribe
+
+    @callback
+    def async_invalidate(self) -> None:
+        """Write every subscribed entity on the next pass, changed or not.
+
+        For changes the publication keys do not cover, such as the settings
+        shown in entity attributes.
+        """
+        self._pending.update(self._subscribers)
+
+    def _snapshot(self) -> dict:
+        """Return the current publication values of the handle."""
+        handle = self._handle
+        values = {
+            key: _published_value(value) for key, value in handle._sensors.items()
+        }
+        values[CHARGE_STATE] = _published_value(handle._charge_state)
+        values[STORED_ENERGY_VALUE] = _published_value(handle._stored_energy_value)
+        values[DATE_RECORDING_STARTED] = handle._date_recording_started
+        for simulated_sensor, reading in handle._meter_readings.items():
+            values[meter_reading_key(simulated_sensor)] = _published_value(reading)
+        return values
+
+    @callback
+    def async_publish(self) -> None:
+        """Write every subscribed entity whose keys changed since the last pass."""
+        values = self._snapshot()
+        published = self._published
+        dirty = {
+            key for key, value in values.items() if published.get(key, _UNSET) != value
+        }
+        self._published = values
+        pending = self._pending
+        self._pending = set()
+
+        for subscriber in list(self._subscribers):
+            keys, write_state = subscriber
+            if subscriber in pending or not keys.isdisjoint(dirty):
+                self.writes += 1
+                write_state()
+            else:
+                self.skipped_writes += 1
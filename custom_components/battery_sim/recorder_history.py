@@ -0,0 +1,399 @@
+"""Stream recorded meter history out of the recorder database for replays.
+
+The loader reads the import, export, solar and tariff entities of a battery
+config from the Home Assistant recorder SQLite database, one page of rows per
+entity at a time, merges them in time order and turns the cumulative meter
+readings into the kWh-per-tick `ReplaySample`s that `replay_history` takes.
+Memory stays bounded by the page size however long the window is.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from functools import partial
+import heapq
+from itertools import chain
+import json
+import logging
+import math
+import sqlite3
+
+from homeassistant.const import (
+    ATTR_UNIT_OF_MEASUREMENT,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+)
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import (
+    CONF_INPUT_LIST,
+    CONF_SOLAR_ENERGY_SENSOR,
+    CONF_UPDATE_FREQUENCY,
+    EXPORT,
+    FIXED_TARIFF,
+    IMPORT,
+    NO_TARIFF_INFO,
+    SENSOR_ID,
+    SENSOR_TYPE,
+    TARIFF_TYPE,
+)
+from .helpers import ENERGY_UNIT_CONVERSION_FACTORS, generate_input_list
+from .replay import ReplayResult, ReplaySample, replay_history
+from .tariffs import tariff_sensor_id
+
+_LOGGER = logging.getLogger(__name__)
+
+# Row sources of the recorder: every state change, or the hourly long-term
+# statistics that outlive the purge of states.
+STATES = "states"
+STATISTICS = "statistics"
+
+DEFAULT_PAGE_SIZE = 5000
+STATISTICS_PERIOD_S = 3600.0
+
+# Kinds of stream, in the order rows with the same timestamp are applied.
+_TARIFF = 0
+_METER = 1
+_SOLAR = 2
+
+_STATES_PAGE = """
+    SELECT state_id, last_updated_ts, state, attributes_id FROM states
+    WHERE metadata_id = ? AND last_updated_ts < ?
+        AND (last_updated_ts, state_id) > (?, ?)
+    ORDER BY last_updated_ts, state_id LIMIT ?
+"""
+_STATES_BASELINE = """
+    SELECT state_id, last_updated_ts, state, attributes_id FROM states
+    WHERE metadata_id = ? AND last_updated_ts < ?
+    ORDER BY last_updated_ts DESC, state_id DESC LIMIT 1
+"""
+_STATISTICS_PAGE = """
+    SELECT id, start_ts + ?, {column}, NULL FROM statistics
+    WHERE metadata_id = ? AND start_ts + ? < ?
+        AND (start_ts + ?, id) > (?, ?)
+    ORDER BY start_ts, id LIMIT ?
+"""
+
+
+def _input_tariff(input_details, tariffs):
+    """Return the tariff of an input from the latest tariff readings, or None."""
+    if input_details is None or input_details[TARIFF_TYPE] == NO_TARIFF_INFO:
+        return None
+    if input_details[TARIFF_TYPE] == FIXED_TARIFF:
+        return input_details[FIXED_TARIFF]
+    return tariffs.get(tariff_sensor_id(input_details))
+
+
+class RecorderHistory:
+    """Replay samples of one battery config between two POSIX times.
+
+    Readings are converted to kWh from the unit recorded with each state, and
+    a meter whose reading decreases is rebased onto the new reading without
+    counting a delta, as the live battery does. A solar meter decreasing
+    also drops the solar energy gathered for the current tick. The first
+    reading of each meter in the window is its baseline, or with `baseline`
+    the last state recorded before the window, so a window starting at the
+    last live tick loses none of the energy after it.
+
+    `readings` counts the meter rows read, `dropped_readings` those that were
+    not numeric or not in kWh or Wh, and `rebased_readings` the decreases.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        config,
+        start_time: float,
+        end_time: float,
+        source: str = STATES,
+        interval_s: float | None = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        baseline: bool = False,
+    ):
+        """Initialize the loader; nothing is read before iterating `samples`."""
+        if source not in (STATES, STATISTICS):
+            raise ValueError(f"Unknown recorder source {source!r}")
+        if baseline and source != STATES:
+            raise ValueError("A baseline before the window needs the states source")
+        self.database = database
+        self.start_time = float(start_time)
+        self.end_time = float(end_time)
+        self.source = source
+        if interval_s is None:
+            interval_s = (
+                STATISTICS_PERIOD_S
+                if source == STATISTICS
+                else float(config.get(CONF_UPDATE_FREQUENCY, 60))
+            )
+        self.interval_s = float(interval_s)
+        self.page_size = int(page_size)
+        self.baseline = baseline
+        self._inputs = (
+            config[CONF_INPUT_LIST]
+            if CONF_INPUT_LIST in config
+            else generate_input_list(config=config)
+        )
+        self._solar_entity_id = config.get(CONF_SOLAR_ENERGY_SENSOR)
+        self.readings = 0
+        self.dropped_readings = 0
+        self.rebased_readings = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.database}?mode=ro", uri=True)
+
+    def _metadata_ids(self, connection, entity_ids) -> dict[str, int]:
+        """Return the recorder metadata id of each recorded entity."""
+        if self.source == STATES:
+            query = "SELECT entity_id, metadata_id FROM states_meta"
+        else:
+            query = "SELECT statistic_id, id FROM statistics_meta"
+        return {
+            entity_id: metadata_id
+            for entity_id, metadata_id in connection.execute(query)
+            if entity_id in entity_ids
+        }
+
+    def _pages(self, connection, metadata_id, column="state") -> Iterator[tuple]:
+        """Yield (id, timestamp, state, attributes id) rows one page at a time."""
+        last = (self.start_time, -1)
+        while True:
+            if self.source == STATES:
+                rows = connection.execute(
+                    _STATES_PAGE,
+                    (metadata_id, self.end_time, *last, self.page_size),
+                ).fetchall()
+            else:
+                rows = connection.execute(
+                    _STATISTICS_PAGE.format(column=column),
+                    (
+                        STATISTICS_PERIOD_S,
+                        metadata_id,
+                        STATISTICS_PERIOD_S,
+                        self.end_time,
+                        STATISTICS_PERIOD_S,
+                        *last,
+                        self.page_size,
+                    ),
+                ).fetchall()
+            yield from rows
+            if len(rows) < self.page_size:
+                return
+            last = (rows[-1][1], rows[-1][0])
+
+    def _conversion_factors(
+        self, connection, entity_id
+    ) -> Callable[[int | None], float | None]:
+        """Return a lookup of the kWh factor of a meter row by attributes id."""
+        if self.source == STATISTICS:
+            row = connection.execute(
+                "SELECT unit_of_measurement FROM statistics_meta WHERE statistic_id = ?",
+                (entity_id,),
+            ).fetchone()
+            factor = ENERGY_UNIT_CONVERSION_FACTORS.get(row[0] if row else None)
+            return lambda attributes_id: factor
+
+        # Attributes are deduplicated by the recorder and rarely change for a
+        # meter, so only the last one is kept.
+        cached = [None, None]
+
+        def factor_for(attributes_id):
+            if attributes_id != cached[0]:
+                row = connection.execute(
+                    "SELECT shared_attrs FROM state_attributes WHERE attributes_id = ?",
+                    (attributes_id,),
+                ).fetchone()
+                units = json.loads(row[0]).get(ATTR_UNIT_OF_MEASUREMENT) if row else None
+                cached[:] = [attributes_id, ENERGY_UNIT_CONVERSION_FACTORS.get(units)]
+            return cached[1]
+
+        return factor_for
+
+    def _meter_stream(self, connection, metadata_id, entity_id, kind, index):
+        """Yield (timestamp, kind, index, kWh reading) for each usable meter row."""
+        factor_for = self._conversion_factors(connection, entity_id)
+        rows = self._pages(connection, metadata_id)
+        if self.baseline:
+            rows = chain(
+                connection.execute(
+                    _STATES_BASELINE, (metadata_id, self.start_time)
+                ).fetchall(),
+                rows,
+            )
+        for _, timestamp, state, attributes_id in rows:
+            self.readings += 1
+            factor = factor_for(attributes_id)
+            try:
+                value = float(state)
+            except (TypeError, ValueError):
+                factor = None
+            if factor is None or state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+                self.dropped_readings += 1
+                continue
+            yield timestamp, kind, index, value * factor
+
+    def _tariff_stream(self, connection, metadata_id, entity_id):
+        """Yield (timestamp, kind, entity id, tariff) for each numeric tariff row."""
+        for _, timestamp, state, _ in self._pages(connection, metadata_id, "mean"):
+            try:
+                yield timestamp, _TARIFF, entity_id, float(state)
+            except (TypeError, ValueError):
+                continue
+
+    def samples(self) -> Iterator[ReplaySample]:
+        """Yield one sample per tick from the start time to the last reading.
+
+        Ticks are `interval_s` apart, counted from the start time, and carry
+        the energy of every reading up to their timestamp. Tariffs are the
+        latest recorded value of the tariff sensor, or the fixed tariff, of the
+        last import and export input that delivered energy.
+        """
+        inputs = self._inputs
+        tariff_ids = {
+            entity_id
+            for entity_id in map(tariff_sensor_id, inputs)
+            if entity_id is not None
+        }
+        meter_ids = {input_details[SENSOR_ID] for input_details in inputs}
+        if self._solar_entity_id is not None:
+            meter_ids.add(self._solar_entity_id)
+
+        connection = self._connect()
+        try:
+            metadata_ids = self._metadata_ids(connection, meter_ids | tariff_ids)
+            streams = [
+                self._meter_stream(
+                    connection, metadata_ids[input_details[SENSOR_ID]],
+                    input_details[SENSOR_ID], _METER, index,
+                )
+                for index, input_details in enumerate(inputs)
+                if input_details[SENSOR_ID] in metadata_ids
+            ]
+            if self._solar_entity_id in metadata_ids:
+                streams.append(
+                    self._meter_stream(
+                        connection, metadata_ids[self._solar_entity_id],
+                        self._solar_entity_id, _SOLAR, -1,
+                    )
+                )
+            streams.extend(
+                self._tariff_stream(connection, metadata_ids[entity_id], entity_id)
+                for entity_id in sorted(tariff_ids)
+                if entity_id in metadata_ids
+            )
+            yield from self._ticks(heapq.merge(*streams))
+            _LOGGER.debug(
+                "Read %s meter readings from %s: %s dropped, %s rebased",
+                self.readings,
+                self.database,
+                self.dropped_readings,
+                self.rebased_readings,
+            )
+        finally:
+            connection.close()
+
+    def _ticks(self, rows) -> Iterator[ReplaySample]:
+        """Accumulate merged rows into ticks."""
+        inputs = self._inputs
+        interval = self.interval_s
+        last_readings: dict[int, float] = {}
+        tariffs: dict[str, float] = {}
+        last_import = last_export = None
+        import_amount = export_amount = solar_amount = 0.0
+        tick = 1
+        tick_time = self.start_time + interval
+
+        for timestamp, kind, key, value in rows:
+            if timestamp > tick_time:
+                yield ReplaySample(
+                    tick_time,
+                    import_amount,
+                    export_amount,
+                    solar_amount,
+                    _input_tariff(last_import, tariffs),
+                    _input_tariff(last_export, tariffs),
+                )
+                import_amount = export_amount = solar_amount = 0.0
+                last_tick = tick
+                tick = max(
+                    last_tick + 1,
+                    math.ceil((timestamp - self.start_time) / interval),
+                )
+                # Quiet ticks in between carry nothing but time.
+                for quiet in range(last_tick + 1, tick):
+                    yield ReplaySample(
+                        self.start_time + quiet * interval,
+                        0.0,
+                        0.0,
+                        0.0,
+                        _input_tariff(last_import, tariffs),
+                        _input_tariff(last_export, tariffs),
+                    )
+                tick_time = self.start_time + tick * interval
+
+            if kind == _TARIFF:
+                tariffs[key] = value
+                continue
+            previous = last_readings.get(key)
+            last_readings[key] = value
+            if previous is None or value == previous:
+                continue
+            delta = value - previous
+            if delta < 0:
+                self.rebased_readings += 1
+                if kind == _SOLAR:
+                    solar_amount = 0.0
+                continue
+            if kind == _SOLAR:
+                solar_amount += delta
+                continue
+            input_details = inputs[key]
+            if input_details[SENSOR_TYPE] == IMPORT:
+                last_import = input_details
+                import_amount += delta
+            elif input_details[SENSOR_TYPE] == EXPORT:
+                last_export = input_details
+                export_amount += delta
+
+        if last_readings:
+            yield ReplaySample(
+                tick_time,
+                import_amount,
+                export_amount,
+                solar_amount,
+                _input_tariff(last_import, tariffs),
+                _input_tariff(last_export, tariffs),
+            )
+
+
+def recorder_database_path(db_url: str) -> str:
+    """Return the file of a SQLite recorder URL, or raise for other databases."""
+    if not db_url.startswith("sqlite:///"):
+        raise HomeAssistantError(
+            "Replaying recorded history needs the default SQLite recorder database"
+        )
+    return db_url.removeprefix("sqlite:///").split("?", 1)[0]
+
+
+async def async_replay_recorder_history(
+    hass,
+    config,
+    start_time: float,
+    end_time: float,
+    source: str = STATES,
+    **replay_options,
+) -> ReplayResult:
+    """Replay the recorded history of a battery config in the recorder executor.
+
+    The rows are read and replayed page by page in the recorder's database
+    executor, so the event loop only waits for the totals.
+    """
+    from homeassistant.components.recorder import get_instance
+
+    recorder = get_instance(hass)
+    history = RecorderHistory(
+        recorder_database_path(recorder.db_url), config, start_time, end_time, source
+    )
+    return await recorder.async_add_executor_job(
+        partial(
+            replay_history, config, history.samples(), start_time, **replay_options
+        )
+    )
@@ -0,0 +1,432 @@
+"""Shadow simulation of many battery configurations from one meter stream.
+
+A `ScenarioBank` holds K alternative battery configurations as parallel NumPy
+arrays and advances all of them with one vectorized step per tick. It follows
+the same charge/discharge, efficiency-curve, solar cap and degradation rules
+as `simulation.step` in the default mode, with the rate sliders at the rated
+limits and the SoC range at its configured bounds, which is what a sizing
+comparison needs. The stored-energy book value is not tracked.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+import numpy as np
+import voluptuous as vol
+
+from homeassistant.const import CONF_NAME
+import homeassistant.helpers.config_validation as cv
+
+from .const import (
+    CONF_BATTERY_CHARGE_EFFICIENCY,
+    CONF_BATTERY_DISCHARGE_EFFICIENCY,
+    CONF_BATTERY_MAX_CHARGE_RATE,
+    CONF_BATTERY_MAX_DISCHARGE_RATE,
+    CONF_BATTERY_SIZE,
+    CONF_END_OF_LIFE_DEGRADATION,
+    CONF_MINIMUM_USER_SELECTABLE_SOC,
+    CONF_NOMINAL_INVERTER_POWER,
+    CONF_RATED_BATTERY_CYCLES,
+    CONF_SHADOW_SCENARIOS,
+)
+from .helpers import MINIMUM_EFFICIENCY, validate_efficiency_config
+from .simulation import INITIAL_SOC_RATIO, MINIMUM_CAPACITY, BatteryConfig
+
+# Config keys a shadow scenario may override on top of the battery config.
+SCENARIO_KEYS = (
+    CONF_BATTERY_SIZE,
+    CONF_BATTERY_MAX_CHARGE_RATE,
+    CONF_BATTERY_MAX_DISCHARGE_RATE,
+    CONF_BATTERY_CHARGE_EFFICIENCY,
+    CONF_BATTERY_DISCHARGE_EFFICIENCY,
+    CONF_RATED_BATTERY_CYCLES,
+    CONF_END_OF_LIFE_DEGRADATION,
+    CONF_MINIMUM_USER_SELECTABLE_SOC,
+    CONF_NOMINAL_INVERTER_POWER,
+)
+
+_EFFICIENCY = vol.Any(
+    vol.Coerce(float), vol.All(cv.string, validate_efficiency_config)
+)
+_NON_NEGATIVE = vol.All(vol.Coerce(float), vol.Range(min=0))
+
+SHADOW_SCENARIOS_SCHEMA = vol.All(
+    cv.ensure_list,
+    [
+        vol.Schema(
+            {
+                vol.Optional(CONF_NAME): cv.string,
+                vol.Optional(CONF_BATTERY_SIZE): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, min_included=False)
+                ),
+                vol.Optional(CONF_BATTERY_MAX_CHARGE_RATE): _NON_NEGATIVE,
+                vol.Optional(CONF_BATTERY_MAX_DISCHARGE_RATE): _NON_NEGATIVE,
+                vol.Optional(CONF_BATTERY_CHARGE_EFFICIENCY): _EFFICIENCY,
+                vol.Optional(CONF_BATTERY_DISCHARGE_EFFICIENCY): _EFFICIENCY,
+                vol.Optional(CONF_RATED_BATTERY_CYCLES): vol.All(
+                    vol.Coerce(float), vol.Range(min=1)
+                ),
+                vol.Optional(CONF_END_OF_LIFE_DEGRADATION): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=1)
+                ),
+                vol.Optional(CONF_MINIMUM_USER_SELECTABLE_SOC): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=1)
+                ),
+                vol.Optional(CONF_NOMINAL_INVERTER_POWER): _NON_NEGATIVE,
+            }
+        )
+    ],
+)
+
+_ONE_SECOND_IN_HOURS = 1 / 3600
+
+
+class _CurveBank:
+    """The efficiency curves of all scenarios as padded 2D breakpoint arrays.
+
+    Row k holds the breakpoints of scenario k. Shorter curves are padded with
+    infinite power, so padding never brackets a power or a battery-side
+    limit, and every lookup reproduces `EfficiencyCurve` row by row. Curves
+    whose battery-side power does not rise with power are rare; they are
+    clipped through their own `EfficiencyCurve` instead.
+    """
+
+    def __init__(self, curves):
+        width = max(len(curve) for curve in curves)
+        count = len(curves)
+        self.curves = curves
+        self.lengths = np.array([len(curve) for curve in curves])
+        self.powers = np.full((count, width), np.inf)
+        self.efficiencies = np.zeros((count, width))
+        self.slopes = np.zeros((count, width))
+        self.stored_powers = np.full((count, width), np.inf)
+        self.drawn_powers = np.full((count, width), np.inf)
+        for row, curve in enumerate(curves):
+            length = len(curve)
+            self.powers[row, :length] = curve._powers
+            self.efficiencies[row, :length] = curve._efficiencies
+            self.efficiencies[row, length:] = curve._efficiencies[-1]
+            self.slopes[row, : length - 1] = curve._slopes
+            self.stored_powers[row, :length] = curve._stored_powers
+            self.drawn_powers[row, :length] = curve._drawn_powers
+        self.constant = self.lengths == 1
+        self.constants = np.maximum(self.efficiencies[:, 0], MINIMUM_EFFICIENCY)
+        self.rows = np.arange(count)
+        self.columns = np.arange(width)
+        self.first_power = self.powers[:, 0]
+        self.last_efficiency = self.efficiencies[np.arange(count), self.lengths - 1]
+        self.irregular_charge = [
+            row
+            for row, curve in enumerate(curves)
+            if not curve.constant and not curve._stored_powers_increase
+        ]
+        self.irregular_discharge = [
+            row
+            for row, curve in enumerate(curves)
+            if not curve.constant and not curve._drawn_powers_increase
+        ]
+
+    def _index(self, power):
+        """Return bisect_left(powers, power, 1) for every row."""
+        return 1 + np.count_nonzero(self.powers[:, 1:] < power[:, None], axis=1)
+
+    def efficiency_at(self, power):
+        """Return the efficiency of every row at its power."""
+        index = self._index(power)
+        start = np.minimum(index, self.lengths) - 1
+        rows = self.rows
+        efficiency = self.efficiencies[rows, start] + (
+            (power - self.powers[rows, start]) * self.slopes[rows, start]
+        )
+        efficiency = np.where(index >= self.lengths, self.last_efficiency, efficiency)
+        return np.where(power <= self.first_power, self.efficiencies[:, 0], efficiency)
+
+    def _segments(self, power, limits, limit):
+        """Return the bracketing segment of every row and its curve parameters."""
+        top = np.where(power <= self.first_power, 0, self._index(power))
+        below_top = self.columns[None, :] < top[:, None]
+        segment = np.count_nonzero(below_top & (limits <= limit[:, None]), axis=1)
+        start = np.clip(segment - 1, 0, None)
+        rows = self.rows
+        inside = (segment > 0) & (segment < self.lengths)
+        efficiency = np.where(
+            segment == 0, self.efficiencies[:, 0], self.efficiencies[rows, start]
+        )
+        slope = np.where(inside, self.slopes[rows, start], 0.0)
+        start_power = np.where(inside, self.powers[rows, start], 0.0)
+        return segment, start, efficiency, slope, start_power
+
+    def _clamp(self, amount, segment, start, requested, interval_hours):
+        """Clamp solved amounts to their segments, like EfficiencyCurve does."""
+        rows = self.rows
+        amount = np.where(
+            segment > 0,
+            np.maximum(amount, self.powers[rows, start] * interval_hours),
+            amount,
+        )
+        end = np.minimum(segment, self.lengths - 1)
+        requested = np.where(
+            segment < self.lengths,
+            np.minimum(requested, self.powers[rows, end] * interval_hours),
+            requested,
+        )
+        return np.minimum(amount, requested)
+
+    def clip_charge(self, amount, interval_hours, headroom):
+        """Return every row's largest charge input that fits its headroom.
+
+        Also returns the efficiency at the returned charge power, which a
+        tick needs next and comes for free when nothing had to be clipped.
+        """
+        power = amount / interval_hours
+        efficiency = self.efficiency_at(power)
+        fits = amount * efficiency <= headroom
+        if fits.all():
+            return amount, efficiency
+        segment, start, segment_efficiency, slope, start_power = self._segments(
+            power, self.stored_powers, headroom / interval_hours
+        )
+        quadratic = slope / interval_hours
+        linear = segment_efficiency - slope * start_power
+        root = np.sqrt(np.maximum(linear * linear + 4.0 * quadratic * headroom, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            solved = np.where(
+                linear > 0.0,
+                2.0 * headroom / (linear + root),
+                (root - linear) / (2.0 * quadratic),
+            )
+        clipped = self._clamp(solved, segment, start, amount, interval_hours)
+        clipped = np.where(
+            self.constant, np.minimum(amount, headroom / self.constants), clipped
+        )
+        clipped = np.where((amount <= 0.0) | fits, amount, clipped)
+        for row in self.irregular_charge:
+            clipped[row] = self.curves[row].clip_charge(
+                amount[row], interval_hours, headroom[row]
+            )
+        return clipped, self.efficiency_at(clipped / interval_hours)
+
+    def clip_discharge(self, amount, interval_hours, available):
+        """Return every row's largest discharge output that is available.
+
+        Also returns the efficiency at the returned discharge power.
+        """
+        power = amount / interval_hours
+        efficiency = self.efficiency_at(power)
+        fits = amount <= available * efficiency
+        if fits.all():
+            return amount, efficiency
+        segment, start, segment_efficiency, slope, start_power = self._segments(
+            power, self.drawn_powers, available / interval_hours
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            solved = (
+                available
+                * (segment_efficiency - slope * start_power)
+                / (1.0 - available * slope / interval_hours)
+            )
+        clipped = self._clamp(solved, segment, start, amount, interval_hours)
+        clipped = np.where(
+            self.constant,
+            np.minimum(amount, available * self.efficiencies[:, 0]),
+            clipped,
+        )
+        clipped = np.where((amount <= 0.0) | fits, amount, clipped)
+        for row in self.irregular_discharge:
+            clipped[row] = self.curves[row].clip_discharge(
+                amount[row], interval_hours, available[row]
+            )
+        return clipped, self.efficiency_at(clipped / interval_hours)
+
+
+class ScenarioBank:
+    """K battery configurations advanced together from the same meter stream.
+
+    Every attribute holding per-scenario values is a NumPy array of length K,
+    so a tick costs a fixed number of array operations whatever K is.
+    """
+
+    def __init__(self, configs: Iterable[BatteryConfig], names=None):
+        """Build the bank from one kernel config per scenario."""
+        configs = list(configs)
+        if not configs:
+            raise ValueError("A scenario bank needs at least one scenario")
+        if len({config.solar_capped for config in configs}) > 1:
+            raise ValueError("Scenarios must share the solar energy sensor")
+        if len({config.degradation_curve for config in configs}) > 1:
+            raise ValueError("Scenarios must share the degradation curve")
+        self.configs = configs
+        self.names = (
+            list(names)
+            if names is not None
+            else [f"scenario_{index}" for index in range(len(configs))]
+        )
+        self.solar_capped = configs[0].solar_capped
+        self.degradation_curve = configs[0].degradation_curve
+        self.battery_size = np.array([config.battery_size for config in configs])
+        self.max_charge_rate = np.array([config.max_charge_rate for config in configs])
+        self.max_discharge_rate = np.array(
+            [config.max_discharge_rate for config in configs]
+        )
+        self.rated_battery_cycles = np.array(
+            [config.rated_battery_cycles for config in configs]
+        )
+        self.end_of_life_degradation = np.array(
+            [config.end_of_life_degradation for config in configs]
+        )
+        self.minimum_user_selectable_soc = np.array(
+            [config.minimum_user_selectable_soc for config in configs]
+        )
+        self.nominal_inverter_power = np.array(
+            [
+                config.nominal_inverter_power
+                if config.nominal_inverter_power is not None
+                else np.inf
+                for config in configs
+            ]
+        )
+        self._charge_curves = _CurveBank(
+            [config.charge_efficiency_curve for config in configs]
+        )
+        self._discharge_curves = _CurveBank(
+            [config.discharge_efficiency_curve for config in configs]
+        )
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config) -> ScenarioBank | None:
+        """Build the shadow scenarios of a battery config, or None if it has none.
+
+        Each entry of CONF_SHADOW_SCENARIOS overrides some of SCENARIO_KEYS on
+        top of the battery's own config; an optional name labels its results.
+        """
+        scenarios = config.get(CONF_SHADOW_SCENARIOS)
+        if not scenarios:
+            return None
+        configs = []
+        names = []
+        for index, overrides in enumerate(scenarios):
+            merged = dict(config)
+            merged.update(
+                (key, value) for key, value in overrides.items() if key in SCENARIO_KEYS
+            )
+            configs.append(BatteryConfig.from_config(merged))
+            names.append(str(overrides.get(CONF_NAME, f"scenario_{index}")))
+        return cls(configs, names)
+
+    def __len__(self):
+        return len(self.configs)
+
+    def reset(self) -> None:
+        """Start every scenario over at the initial SoC with zeroed totals."""
+        count = len(self.configs)
+        self.charge_state = np.minimum(
+            self.battery_size * INITIAL_SOC_RATIO, self.max_capacity(np.zeros(count))
+        )
+        self.battery_cycles = np.zeros(count)
+        self.energy_battery_in = np.zeros(count)
+        self.energy_battery_out = np.zeros(count)
+        self.energy_saved = np.zeros(count)
+        self.money_saved_import = np.zeros(count)
+        self.money_saved_export = np.zeros(count)
+        self.grid_import = np.zeros(count)
+        self.grid_export = np.zeros(count)
+        self.ticks = 0
+
+    def max_capacity(self, cycles: np.ndarray) -> np.ndarray:
+        """Return the degraded maximum capacity of every scenario in kWh."""
+        if self.degradation_curve is not None:
+            degradation = np.interp(
+                cycles, self.degradation_curve.cycles, self.degradation_curve.factors
+            )
+        else:
+            progress = np.clip(cycles / self.rated_battery_cycles, 0.0, 1.0)
+            degradation = 1.0 - ((1.0 - self.end_of_life_degradation) * progress)
+        return np.maximum(self.battery_size * degradation, MINIMUM_CAPACITY)
+
+    def step(
+        self,
+        import_amount: float,
+        export_amount: float,
+        solar_amount: float,
+        interval_seconds: float,
+        import_tariff: float | None = None,
+        export_tariff: float | None = None,
+    ) -> None:
+        """Advance every scenario by one interval of the shared meter stream."""
+        interval_hours = max(interval_seconds / 3600, _ONE_SECOND_IN_HOURS)
+        max_charge = interval_seconds * (self.max_charge_rate / 3600)
+        max_discharge = interval_seconds * (self.max_discharge_rate / 3600)
+        if self.solar_capped:
+            solar_cap = max(float(solar_amount), 0.0)
+            max_charge = np.minimum(max_charge, solar_cap)
+            inverter_discharge = (
+                np.maximum(self.nominal_inverter_power - solar_cap / interval_hours, 0.0)
+                * interval_hours
+            )
+            max_discharge = np.minimum(max_discharge, inverter_discharge)
+
+        charge_state = self.charge_state
+        capacity = self.max_capacity(self.battery_cycles)
+        # Meters rarely import and export in the same interval, so the idle
+        # direction skips its curve lookups entirely.
+        if export_amount > 0.0:
+            amount_to_charge, charge_efficiency = self._charge_curves.clip_charge(
+                np.minimum(export_amount, max_charge),
+                interval_hours,
+                np.maximum(capacity - charge_state, 0.0),
+            )
+            charge_state = charge_state + amount_to_charge * charge_efficiency
+            self.energy_battery_in += amount_to_charge
+            self.battery_cycles = self.energy_battery_in / self.battery_size
+            self.grid_export += export_amount - amount_to_charge
+            if export_tariff is not None:
+                self.money_saved_export -= amount_to_charge * export_tariff
+        if import_amount > 0.0:
+            amount_to_discharge, discharge_efficiency = (
+                self._discharge_curves.clip_discharge(
+                    np.minimum(import_amount, max_discharge),
+                    interval_hours,
+                    np.maximum(
+                        self.charge_state
+                        - capacity * self.minimum_user_selectable_soc,
+                        0.0,
+                    ),
+                )
+            )
+            charge_state = charge_state - amount_to_discharge / np.maximum(
+                discharge_efficiency, MINIMUM_EFFICIENCY
+            )
+            self.energy_battery_out += amount_to_discharge
+            self.energy_saved += amount_to_discharge
+            self.grid_import += import_amount - amount_to_discharge
+            if import_tariff is not None:
+                self.money_saved_import += amount_to_discharge * import_tariff
+        self.charge_state = np.minimum(charge_state, capacity)
+        self.ticks += 1
+
+    def results(self) -> list[dict]:
+        """Return the totals of every scenario, named like a replay result."""
+        columns = {
+            "charge_state": self.charge_state,
+            "energy_saved": self.energy_saved,
+            "money_saved": self.money_saved_import + self.money_saved_export,
+            "money_saved_import": self.money_saved_import,
+            "money_saved_export": self.money_saved_export,
+            "battery_energy_in": self.energy_battery_in,
+            "battery_energy_out": self.energy_battery_out,
+            "battery_cycles": self.battery_cycles,
+            "grid_import": self.grid_import,
+            "grid_export": self.grid_export,
+        }
+        return [
+            {
+                "name": name,
+                "battery_size": config.battery_size,
+                "max_charge_rate": config.max_charge_rate,
+                "max_discharge_rate": config.max_discharge_rate,
+                **{key: float(values[index]) for key, values in columns.items()},
+            }
+            for index, (name, config) in enumerate(zip(self.names, self.configs))
+        ]
+
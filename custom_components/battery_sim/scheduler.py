@@ -0,0 +1,252 @@
+"""Integration-wide update timers shared by every battery."""
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+import time
+from collections.abc import Callable
+from datetime import timedelta
+from itertools import count
+
+import homeassistant.util.dt as dt_util
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+SCHEDULER_KEY = f"{DOMAIN}_scheduler"
+
+# Most batteries updated by one timer callback. Beyond this another timer,
+# staggered against the first, is started for the same cadence.
+DEFAULT_BATCH_SIZE = 50
+# Deferred calls are rounded up to this resolution so that calls due close
+# together run from one timer.
+DEFERRED_RESOLUTION_SECONDS = 0.5
+
+
+def _stagger_fraction(index: int) -> float:
+    """Return the phase of the index-th batch as a fraction of the interval.
+
+    Uses the base 2 van der Corput sequence (0, 1/2, 1/4, 3/4, ...) so the
+    batches stay evenly spread however many there are.
+    """
+    fraction = 0.0
+    denominator = 1
+    while index:
+        denominator *= 2
+        index, bit = divmod(index, 2)
+        fraction += bit / denominator
+    return fraction
+
+
+class _CadenceGroup:
+    """Batteries sharing one update timer."""
+
+    __slots__ = (
+        "interval",
+        "phase",
+        "actions",
+        "unsub",
+        "ticks",
+        "last_tick_seconds",
+        "max_tick_seconds",
+    )
+
+    def __init__(self, interval: int, phase: float):
+        self.interval = interval
+        self.phase = phase
+        self.actions: list[Callable] = []
+        self.unsub: CALLBACK_TYPE | None = None
+        self.ticks = 0
+        self.last_tick_seconds = 0.0
+        self.max_tick_seconds = 0.0
+
+
+class BatteryScheduler:
+    """Run the periodic and deferred battery updates of the integration.
+
+    Batteries with the same update frequency are grouped and updated from one
+    timer callback, in batches of at most `batch_size`. Further batches of the
+    same cadence are staggered across the interval, so a large fleet does not
+    update all at once. The wall time of every group tick is recorded.
+    """
+
+    def __init__(self, hass, batch_size: int = DEFAULT_BATCH_SIZE):
+        """Initialize the scheduler."""
+        self._hass = hass
+        self._batch_size = batch_size
+        self._groups: dict[int, list[_CadenceGroup | None]] = {}
+        self._deferred: list = []
+        self._deferred_sequence = count()
+        self._deferred_unsub: CALLBACK_TYPE | None = None
+        self._deferred_at: float | None = None
+
+    @callback
+    def async_track_interval(
+        self, interval: int, action: Callable[[object], None]
+    ) -> CALLBACK_TYPE:
+        """Call `action(now)` every `interval` seconds; return a cancel callback."""
+        interval = int(interval)
+        groups = self._groups.setdefault(interval, [])
+        group = next(
+            (
+                group
+                for group in groups
+                if group is not None and len(group.actions) < self._batch_size
+            ),
+            None,
+        )
+        if group is None:
+            index = groups.index(None) if None in groups else len(groups)
+            group = _CadenceGroup(interval, interval * _stagger_fraction(index))
+            if index == len(groups):
+                groups.append(group)
+            else:
+                groups[index] = group
+            self._async_start_group(group)
+        group.actions.append(action)
+
+        @callback
+        def async_cancel():
+            if action not in group.actions:
+                return
+            group.actions.remove(action)
+            if group.actions:
+                return
+            if group.unsub is not None:
+                group.unsub()
+                group.unsub = None
+            groups[groups.index(group)] = None
+            while groups and groups[-1] is None:
+                groups.pop()
+            if not groups:
+                self._groups.pop(interval, None)
+
+        return async_cancel
+
+    def _async_start_group(self, group: _CadenceGroup) -> None:
+        """Start the timer of a group, after its stagger phase."""
+        period = timedelta(seconds=group.interval)
+
+        @callback
+        def async_tick(now):
+            self._async_run_group(group, now)
+
+        if not group.phase:
+            group.unsub = async_track_time_interval(self._hass, async_tick, period)
+            return
+
+        @callback
+        def async_start(now):
+            group.unsub = async_track_time_interval(self._hass, async_tick, period)
+            async_tick(now)
+
+        group.unsub = async_call_later(self._hass, group.phase, async_start)
+
+    def _async_run_group(self, group: _CadenceGroup, now) -> None:
+        """Update every battery of a group and record the tick's wall time."""
+        start = time.perf_counter()
+        for action in list(group.actions):
+            try:
+                action(now)
+            except Exception:  # noqa: BLE001 - one battery must not stop the rest
+                _LOGGER.exception("Error updating battery from the shared scheduler")
+        elapsed = time.perf_counter() - start
+        group.ticks += 1
+        group.last_tick_seconds = elapsed
+        if elapsed > group.max_tick_seconds:
+            group.max_tick_seconds = elapsed
+        _LOGGER.debug(
+            "Updated %d batteries on the %ss cadence in %.6f s",
+            len(group.actions),
+            group.interval,
+            elapsed,
+        )
+
+    @callback
+    def async_call_later(
+        self, delay: float, action: Callable[[object], None]
+    ) -> CALLBACK_TYPE:
+        """Call `action(now)` once after `delay` seconds; return a cancel callback.
+
+        Calls due within the same DEFERRED_RESOLUTION_SECONDS share a timer.
+        """
+        due = dt_util.utcnow().timestamp() + max(delay, 0.0)
+        due = math.ceil(due / DEFERRED_RESOLUTION_SECONDS) * DEFERRED_RESOLUTION_SECONDS
+        entry = [due, next(self._deferred_sequence), action]
+        heapq.heappush(self._deferred, entry)
+        self._async_arm_deferred()
+
+        @callback
+        def async_cancel():
+            # Cancelled entries lose their action and are dropped once at the head.
+            entry[2] = None
+            self._async_arm_deferred()
+
+        return async_cancel
+
+    def _async_arm_deferred(self) -> None:
+        """Arm the deferred timer for the earliest queued call."""
+        while self._deferred and self._deferred[0][2] is None:
+            heapq.heappop(self._deferred)
+        if not self._deferred:
+            if self._deferred_unsub is not None:
+                self._deferred_unsub()
+                self._deferred_unsub = None
+                self._deferred_at = None
+            return
+        due = self._deferred[0][0]
+        if self._deferred_at == due:
+            return
+        if self._deferred_unsub is not None:
+            self._deferred_unsub()
+        self._deferred_at = due
+        self._deferred_unsub = async_call_later(
+            self._hass,
+            max(due - dt_util.utcnow().timestamp(), 0.0),
+            self._async_run_deferred,
+        )
+
+    @callback
+    def _async_run_deferred(self, now) -> None:
+        """Run every deferred call that is due."""
+        self._deferred_unsub = None
+        self._deferred_at = None
+        current = dt_util.utcnow().timestamp()
+        while self._deferred and self._deferred[0][0] <= current:
+            _due, _sequence, action = heapq.heappop(self._deferred)
+            if action is None:
+                continue
+            try:
+                action(now)
+            except Exception:  # noqa: BLE001 - one battery must not stop the rest
+                _LOGGER.exception("Error running a deferred battery update")
+        self._async_arm_deferred()
+
+    @property
+    def stats(self) -> list[dict]:
+        """Return the batteries, ticks and tick wall times of every group."""
+        return [
+            {
+                "interval": group.interval,
+                "phase": group.phase,
+                "batteries": len(group.actions),
+                "ticks": group.ticks,
+                "last_tick_seconds": group.last_tick_seconds,
+                "max_tick_seconds": group.max_tick_seconds,
+            }
+            for groups in self._groups.values()
+            for group in groups
+            if group is not None
+        ]
+
+
+@callback
+def async_get_scheduler(hass) -> BatteryScheduler:
+    """Return the scheduler of the integration, creating it when needed."""
+    if SCHEDULER_KEY not in hass.data:
+        hass.data[SCHEDULER_KEY] = BatteryScheduler(hass)
+    return hass.data[SCHEDULER_KEY]
@@ -2,26 +2,18 @@
 import logging
 
 from homeassistant.components.select import SelectEntity
-from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
-from homeassistant.helpers.restore_state import RestoreEntity
 
 from .const import (
     DOMAIN,
     CONF_BATTERY,
-    OVERRIDE_CHARGING,
-    PAUSE_BATTERY,
-    FORCE_DISCHARGE,
-    CHARGE_ONLY,
-    DISCHARGE_ONLY,
-    DEFAULT_MODE,
+    ATTR_BATTERY_MODE,
+    BATTERY_MODES,
     ICON_FULL,
 )
 from .helpers import battery_entity_name
 
 _LOGGER = logging.getLogger(__name__)
 
-ATTR_BATTERY_MODE = "battery_mode"
-
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     handle = hass.data[DOMAIN][config_entry.entry_id]
@@ -44,7 +36,7 @@ async def async_setup_platform(
     return True
 
 
-class BatteryMode(RestoreEntity, SelectEntity):
+class BatteryMode(SelectEntity):
     """Select to set the battery operating mode."""
 
     def __init__(self, handle):
@@ -53,14 +45,7 @@ class BatteryMode(RestoreEntity, SelectEntity):
         self._device_identifier = handle.device_identifier
         self._name = battery_entity_name(handle._name, "Battery Mode")
         self._attr_unique_id = f"{handle._name} - Battery Mode"
-        self._internal_options = [
-            DEFAULT_MODE,
-            OVERRIDE_CHARGING,
-            PAUSE_BATTERY,
-            FORCE_DISCHARGE,
-            CHARGE_ONLY,
-            DISCHARGE_ONLY,
-        ]
+        self._internal_options = BATTERY_MODES
 
     @property
     def unique_id(self):
@@ -91,7 +76,7 @@ class BatteryMode(RestoreEntity, SelectEntity):
 
     @property
     def extra_state_attributes(self):
-        """Expose the internal mode key so it survives a restart unambiguously."""
+        """Expose the internal mode key next to its displayed option."""
         return {ATTR_BATTERY_MODE: self.handle._battery_mode}
 
     def _internal_option(self, option: str):
@@ -115,28 +100,3 @@ class BatteryMode(RestoreEntity, SelectEntity):
         self.handle._battery_mode = internal_option
         self.handle.async_trigger_update()
         self.schedule_update_ha_state(True)
-
-    async def async_added_to_hass(self):
-        """Restore the mode that was selected before the last restart."""
-        await super().async_added_to_hass()
-
-        state = await self.async_get_last_state()
-        if state is None or state.state in (None, STATE_UNKNOWN, STATE_UNAVAILABLE):
-            return
-
-        # Prefer the internal key stored as an attribute; fall back to the
-        # displayed option for states written before that attribute existed.
-        restored_mode = state.attributes.get(ATTR_BATTERY_MODE)
-        if restored_mode not in self._internal_options:
-            restored_mode = self._internal_option(state.state)
-
-        if restored_mode is None:
-            _LOGGER.warning(
-                "Ignoring invalid restored battery mode '%s' for '%s'.",
-                state.state,
-                self._name,
-            )
-            return
-
-        self.handle._battery_mode = restored_mode
-        _LOGGER.debug("Restored battery mode for '%s' to %s", self._name, restored_mode)
@@ -3,15 +3,13 @@ import time
 import logging
 
 import homeassistant.util.dt as dt_util
-from homeassistant.helpers.dispatcher import dispatcher_send, async_dispatcher_connect
+from homeassistant.core import callback
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
     SensorEntity,
     SensorStateClass,
-    ATTR_LAST_RESET,
 )
-from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.const import (
     PERCENTAGE,
     STATE_UNAVAILABLE,
@@ -64,13 +62,18 @@ from .const import (
     BATTERY_DEGRADATION,
     CONF_END_OF_LIFE_DEGRADATION,
     CONF_RATED_BATTERY_CYCLES,
-    MESSAGE_TYPE_BATTERY_UPDATE,
     SENSOR_ID,
 )
 from .helpers import battery_entity_name
+from .publisher import (
+    CHARGE_STATE,
+    DATE_RECORDING_STARTED,
+    STORED_ENERGY_VALUE,
+    meter_reading_key,
+)
+from .values import value_accessor
 
 _LOGGER = logging.getLogger(__name__)
-_INVALID_RESTORED_STATES = {None, "", STATE_UNKNOWN, STATE_UNAVAILABLE}
 
 DEVICE_CLASS_MAP = {
     UnitOfEnergy.WATT_HOUR: SensorDeviceClass.ENERGY,
@@ -189,15 +192,15 @@ async def define_sensors(hass, handle):
             f"{hass.config.currency}/{UnitOfEnergy.KILO_WATT_HOUR}",
         )
     )
-    # Added after the battery itself so its first state is written once the
-    # battery has restored its charge state.
+    # Added after the display sensors, so its first update publishes their
+    # first state.
     sensors.append(SimulatedBattery(handle))
     sensors.append(BatteryStateOfCharge(handle, BATTERY_STATE_OF_CHARGE))
     sensors.append(BatteryStatus(handle, BATTERY_MODE))
     return sensors
 
 
-class DisplayOnlySensor(RestoreEntity, SensorEntity):
+class DisplayOnlySensor(SensorEntity):
     """
     Representation of a sensor.
 
@@ -218,9 +221,13 @@ class DisplayOnlySensor(RestoreEntity, SensorEntity):
         self._device_name = handle._name
         self._device_identifier = handle.device_identifier
         self._sensor_type = sensor_name
+        self._value = value_accessor(sensor_name)
         self._type_of_sensor = type_of_sensor
-        self._last_reset = dt_util.utcnow()
-        self._available = False
+        # The battery checkpoint keeps last_reset across restarts.
+        self._last_reset = handle._last_resets.setdefault(sensor_name, dt_util.utcnow())
+        # Without a restored or synced value the sensor stays unavailable until
+        # the first update, so the energy dashboard sees no spike from zero.
+        self._available = sensor_name in handle._restored_sensors
 
     @property
     def _supports_last_reset(self):
@@ -231,70 +238,27 @@ class DisplayOnlySensor(RestoreEntity, SensorEntity):
         """Subscribe for update from the battery."""
         await super().async_added_to_hass()
 
-        state = await self.async_get_last_state()
-
-        if state:
-            if state.state in _INVALID_RESTORED_STATES:
-                _LOGGER.debug(
-                    "Ignoring invalid restored state '%s' for sensor '%s'.",
-                    state.state,
-                    self._sensor_type,
-                )
-            else:
-                try:
-                    self._handle._sensors[self._sensor_type] = float(state.state)
-                    if self._sensor_type == ATTR_AVERAGE_ENERGY_VALUE:
-                        restored_stored_value = state.attributes.get(
-                            ATTR_STORED_ENERGY_VALUE
-                        )
-                        if restored_stored_value is not None:
-                            self._handle._stored_energy_value = float(restored_stored_value)
-                        else:
-                            # Backward-compatible fallback for states written
-                            # before the exact cumulative stored value attribute
-                            # existed. Defer reconstruction until the battery SoC
-                            # entity has completed its own restore.
-                            self._handle._pending_restored_average_energy_value = float(
-                                state.state
-                            )
-                        self._handle._finalize_average_energy_value_restore()
-                    last_reset = state.attributes.get(ATTR_LAST_RESET)
-                    if self._supports_last_reset and last_reset is not None:
-                        parsed_last_reset = dt_util.parse_datetime(last_reset)
-                        if parsed_last_reset is not None:
-                            self._last_reset = dt_util.as_utc(parsed_last_reset)
-                    self._available = True
-                    await self.async_update_ha_state(True)
-                except (TypeError, ValueError):
-                    _LOGGER.debug(
-                        "Sensor state '%s' not restored properly for '%s'.",
-                        state.state,
-                        self._sensor_type,
-                    )
-                    self._available = False
-        else:
-            _LOGGER.debug("No sensor state - presume new battery.")
-            self._available = False
-            if any(
-                input_details[SIMULATED_SENSOR] == self._sensor_type
-                for input_details in self._handle._inputs
-            ):
-                # New battery: start the simulated grid meters in sync with
-                # their source entities, exactly like a battery reset does.
-                self._handle.reset_sim_sensor(self._sensor_type)
+        @callback
+        def async_write_published_state():
+            """Write the sensor state after its value changed."""
+            if self._value(self._handle._sensors) is not None:
                 self._available = True
-                await self.async_update_ha_state(True)
+            self.async_write_ha_state()
 
-        async def async_update_state():
-            """Update sensor state."""
-            if self._handle._sensors[self._sensor_type] is not None:
-                self._available = True
-            await self.async_update_ha_state(True)
-
-        async_dispatcher_connect(
-            self.hass,
-            f"{self._device_name}-{MESSAGE_TYPE_BATTERY_UPDATE}",
-            async_update_state,
+        published_keys = {self._sensor_type}
+        if self._sensor_type == ATTR_AVERAGE_ENERGY_VALUE:
+            published_keys.add(STORED_ENERGY_VALUE)
+        if any(
+            input_details[SIMULATED_SENSOR] == self._sensor_type
+            and input_details[SENSOR_TYPE] != EXPORT
+            for input_details in self._handle._inputs
+        ):
+            # The percentage saved attribute follows the real import meter.
+            published_keys.add(meter_reading_key(self._sensor_type))
+        self.async_on_remove(
+            self._handle._publisher.async_subscribe(
+                published_keys, async_write_published_state
+            )
         )
 
     @property
@@ -314,7 +278,7 @@ class DisplayOnlySensor(RestoreEntity, SensorEntity):
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        sensor_value = self._handle._sensors.get(self._sensor_type)
+        sensor_value = self._value(self._handle._sensors)
         if sensor_value is None:
             return None
         if self._sensor_type == ATTR_MONEY_SAVED:
@@ -358,13 +322,14 @@ class DisplayOnlySensor(RestoreEntity, SensorEntity):
                 continue
             if input[SENSOR_TYPE] == EXPORT:
                 continue
-            parent_sensor = input[SENSOR_ID]
-            if self.hass.states.get(parent_sensor) is None or self.hass.states.get(
-                parent_sensor
-            ).state in [STATE_UNAVAILABLE, STATE_UNKNOWN]:
+            parent_state = self.hass.states.get(input[SENSOR_ID])
+            if parent_state is None or parent_state.state in [
+                STATE_UNAVAILABLE,
+                STATE_UNKNOWN,
+            ]:
                 continue
-            real_world_value = float(self.hass.states.get(parent_sensor).state)
-            simulated_value = self._handle._sensors[self._sensor_type]
+            real_world_value = float(parent_state.state)
+            simulated_value = self._value(self._handle._sensors)
             if real_world_value == 0:
                 _LOGGER.warning(
                     "Division by zero, real world: %s, simulated: %s, battery: %s",
@@ -392,7 +357,7 @@ class DisplayOnlySensor(RestoreEntity, SensorEntity):
     @property
     def state(self):
         """Return the state of the sensor."""
-        sensor_value = self._handle._sensors.get(self._sensor_type)
+        sensor_value = self._value(self._handle._sensors)
         if sensor_value is None:
             return None
         if self._sensor_type in [
@@ -423,7 +388,7 @@ class DisplayOnlySensor(RestoreEntity, SensorEntity):
         return self._available
 
 
-class SimulatedBattery(RestoreEntity, SensorEntity):
+class SimulatedBattery(SensorEntity):
     """Representation of the battery itself."""
 
     _attr_should_poll = False
@@ -438,40 +403,12 @@ class SimulatedBattery(RestoreEntity, SensorEntity):
         """Handle entity which will be added."""
         await super().async_added_to_hass()
 
-        state = await self.async_get_last_state()
-        if state:
-            if state.state in _INVALID_RESTORED_STATES:
-                _LOGGER.debug(
-                    "Ignoring invalid restored battery state '%s' for '%s'.",
-                    state.state,
-                    self._name,
-                )
-            else:
-                try:
-                    self.handle._charge_state = min(
-                        float(state.state), self.handle.current_max_capacity
-                    )
-                except (TypeError, ValueError):
-                    _LOGGER.debug(
-                        "Battery state '%s' not restored properly for '%s'.",
-                        state.state,
-                        self._name,
-                    )
-            if ATTR_DATE_RECORDING_STARTED in state.attributes:
-                self.handle._date_recording_started = state.attributes[
-                    ATTR_DATE_RECORDING_STARTED
-                ]
-
-        self.handle._battery_charge_state_restore_complete = True
-        self.handle._finalize_average_energy_value_restore()
-        dispatcher_send(self.hass, f"{self._name}-{MESSAGE_TYPE_BATTERY_UPDATE}")
-
-        async def async_update_state():
-            """Update sensor state."""
-            await self.async_update_ha_state(True)
-
-        async_dispatcher_connect(
-            self.hass, f"{self._name}-{MESSAGE_TYPE_BATTERY_UPDATE}", async_update_state
+        self.handle._async_publish_update()
+        self.async_on_remove(
+            self.handle._publisher.async_subscribe(
+                (CHARGE_STATE, BATTERY_MODE, DATE_RECORDING_STARTED),
+                self.async_write_ha_state,
+            )
         )
 
     @property
@@ -517,28 +454,29 @@ class SimulatedBattery(RestoreEntity, SensorEntity):
         sensor_list = ""
         for input in self.handle._inputs:
             sensor_list = f"{sensor_list}, {input[SENSOR_ID]}"
+        battery_config = self.handle._battery_config
         return {
-            ATTR_STATUS: self.handle._sensors[BATTERY_MODE],
+            ATTR_STATUS: self.handle._sensors.battery_mode,
             ATTR_DATE_RECORDING_STARTED: self.handle._date_recording_started,
-            CONF_BATTERY_SIZE: self.handle._battery_size,
+            CONF_BATTERY_SIZE: battery_config.battery_size,
             CONF_BATTERY_DISCHARGE_EFFICIENCY: self.handle._battery_discharge_efficiency,
             CONF_BATTERY_CHARGE_EFFICIENCY: self.handle._battery_charge_efficiency,
             CONF_BATTERY_EFFICIENCY: self.handle._battery_discharge_efficiency,
-            CONF_BATTERY_MAX_DISCHARGE_RATE: float(self.handle._max_discharge_rate),
-            CONF_BATTERY_MAX_CHARGE_RATE: float(self.handle._max_charge_rate),
-            CONF_RATED_BATTERY_CYCLES: float(self.handle._rated_battery_cycles),
-            CONF_END_OF_LIFE_DEGRADATION: float(self.handle._end_of_life_degradation),
+            CONF_BATTERY_MAX_DISCHARGE_RATE: battery_config.max_discharge_rate,
+            CONF_BATTERY_MAX_CHARGE_RATE: battery_config.max_charge_rate,
+            CONF_RATED_BATTERY_CYCLES: battery_config.rated_battery_cycles,
+            CONF_END_OF_LIFE_DEGRADATION: battery_config.end_of_life_degradation,
             ATTR_SOURCE_ID: sensor_list,
         }
 
     @property
     def icon(self):
         """Return the icon to use in the frontend."""
-        if self.handle._sensors[BATTERY_MODE] in [MODE_CHARGING, MODE_FORCE_CHARGING]:
+        if self.handle._sensors.battery_mode in [MODE_CHARGING, MODE_FORCE_CHARGING]:
             return ICON_CHARGING
-        if self.handle._sensors[BATTERY_MODE] == MODE_FULL:
+        if self.handle._sensors.battery_mode == MODE_FULL:
             return ICON_FULL
-        if self.handle._sensors[BATTERY_MODE] == MODE_EMPTY:
+        if self.handle._sensors.battery_mode == MODE_EMPTY:
             return ICON_EMPTY
         return ICON_DISCHARGING
 
@@ -566,15 +504,10 @@ class BatteryStateOfCharge(SensorEntity):
         """Handle entity which will be added."""
         await super().async_added_to_hass()
 
-        async def async_update_state():
-            """Update sensor state."""
-            await self.async_update_ha_state(True)
-
+        self.handle._async_publish_update()
         self.async_on_remove(
-            async_dispatcher_connect(
-                self.hass,
-                f"{self._device_name}-{MESSAGE_TYPE_BATTERY_UPDATE}",
-                async_update_state,
+            self.handle._publisher.async_subscribe(
+                (CHARGE_STATE, BATTERY_CYCLES), self.async_write_ha_state
             )
         )
 
@@ -597,7 +530,7 @@ class BatteryStateOfCharge(SensorEntity):
         """Return the state of charge in percent.
 
         The value is derived from the battery charge state, so it never needs
-        restoring: the main battery sensor restores the charge state itself.
+        restoring: the battery checkpoint restores the charge state itself.
         """
         return self.handle.charge_percentage
 
@@ -637,14 +570,11 @@ class BatteryStatus(SensorEntity):
         """Handle entity which will be added."""
         await super().async_added_to_hass()
 
-        async def async_update_state():
-            """Update sensor state."""
-            await self.async_update_ha_state(True)
-
-        async_dispatcher_connect(
-            self.hass,
-            f"{self._device_name}-{MESSAGE_TYPE_BATTERY_UPDATE}",
-            async_update_state,
+        self.handle._async_publish_update()
+        self.async_on_remove(
+            self.handle._publisher.async_subscribe(
+                (BATTERY_MODE, ATTR_STATUS), self.async_write_ha_state
+            )
         )
 
     @property
@@ -664,7 +594,7 @@ class BatteryStatus(SensorEntity):
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        return self.handle._sensors[BATTERY_MODE]
+        return self.handle._sensors.battery_mode
 
     @property
     def device_class(self):
@@ -674,21 +604,21 @@ class BatteryStatus(SensorEntity):
     @property
     def extra_state_attributes(self):
         """Return the state attributes of the sensor."""
-        return {ATTR_STATUS: self.handle._sensors.get(ATTR_STATUS)}
+        return {ATTR_STATUS: self.handle._sensors.status}
 
     @property
     def icon(self):
         """Return the icon to use in the frontend."""
-        status = self.handle._sensors.get(ATTR_STATUS)
+        status = self.handle._sensors.status
         if status == MODE_FULL:
             return ICON_FULL
         if status == MODE_EMPTY:
             return ICON_EMPTY
-        if self.handle._sensors[BATTERY_MODE] in [MODE_CHARGING, MODE_FORCE_CHARGING]:
+        if self.handle._sensors.battery_mode in [MODE_CHARGING, MODE_FORCE_CHARGING]:
             return ICON_CHARGING
         return ICON_DISCHARGING
 
     @property
     def state(self):
         """Return the state of the sensor."""
-        return self.handle._sensors[BATTERY_MODE]
+        return self.handle._sensors.battery_mode
@@ -0,0 +1,510 @@
+"""Home Assistant independent simulation kernel for a single battery.
+
+`step` advances the battery by one interval. It is a pure function of an
+immutable `BatteryConfig`, the current `BatteryControls` and a `BatteryState`,
+so it can be called in tight loops by the live handle, replays and batch
+tooling alike. Nothing in this module touches hass, the dispatcher or logging.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from .const import (
+    CHARGE_ONLY,
+    CONF_BATTERY_CHARGE_EFFICIENCY,
+    CONF_BATTERY_DISCHARGE_EFFICIENCY,
+    CONF_BATTERY_EFFICIENCY,
+    CONF_BATTERY_MAX_CHARGE_RATE,
+    CONF_BATTERY_MAX_DISCHARGE_RATE,
+    CONF_BATTERY_SIZE,
+    CONF_DEGRADATION_CURVE,
+    CONF_END_OF_LIFE_DEGRADATION,
+    CONF_MINIMUM_USER_SELECTABLE_SOC,
+    CONF_NOMINAL_INVERTER_POWER,
+    CONF_RATED_BATTERY_CYCLES,
+    CONF_SOLAR_ENERGY_SENSOR,
+    DEFAULT_MINIMUM_USER_SELECTABLE_SOC,
+    DEFAULT_MODE,
+    DISCHARGE_ONLY,
+    FORCE_DISCHARGE,
+    MODE_CHARGING,
+    MODE_DISCHARGING,
+    MODE_EMPTY,
+    MODE_FORCE_CHARGING,
+    MODE_FORCE_DISCHARGING,
+    MODE_FULL,
+    MODE_IDLE,
+    OVERRIDE_CHARGING,
+    PAUSE_BATTERY,
+)
+from .helpers import (
+    MINIMUM_EFFICIENCY,
+    DegradationCurve,
+    EfficiencyCurve,
+    parse_degradation_curve,
+    parse_efficiency_curve,
+)
+
+# Smallest values used to guard divisions and to decide that no usable energy
+# is left to carry a stored value.
+MINIMUM_CAPACITY = 0.000001
+VALUE_ACCOUNTING_EPSILON = 0.000001
+STATUS_NORMAL = "Normal"
+INITIAL_SOC_RATIO = 0.5
+
+_ONE_SECOND_IN_HOURS = 1 / 3600
+
+
+@dataclass(frozen=True, slots=True)
+class BatteryConfig:
+    """Physical battery parameters that do not change while simulating."""
+
+    battery_size: float
+    max_charge_rate: float
+    max_discharge_rate: float
+    charge_efficiency_curve: EfficiencyCurve
+    discharge_efficiency_curve: EfficiencyCurve
+    rated_battery_cycles: float = 6000.0
+    end_of_life_degradation: float = 0.8
+    minimum_user_selectable_soc: float = DEFAULT_MINIMUM_USER_SELECTABLE_SOC
+    solar_capped: bool = False
+    nominal_inverter_power: float | None = None
+    # Replaces the linear fade to end_of_life_degradation at the rated cycles.
+    degradation_curve: DegradationCurve | None = None
+
+    @classmethod
+    def from_config(cls, config) -> BatteryConfig:
+        """Build the kernel config from a battery config entry or YAML dict."""
+        default_efficiency = config.get(CONF_BATTERY_EFFICIENCY, 1.0)
+        nominal_inverter_power = config.get(CONF_NOMINAL_INVERTER_POWER)
+        return cls(
+            battery_size=float(config[CONF_BATTERY_SIZE]),
+            max_charge_rate=float(config[CONF_BATTERY_MAX_CHARGE_RATE]),
+            max_discharge_rate=float(config[CONF_BATTERY_MAX_DISCHARGE_RATE]),
+            charge_efficiency_curve=parse_efficiency_curve(
+                config.get(CONF_BATTERY_CHARGE_EFFICIENCY, default_efficiency)
+            ),
+            discharge_efficiency_curve=parse_efficiency_curve(
+                config.get(CONF_BATTERY_DISCHARGE_EFFICIENCY, default_efficiency)
+            ),
+            rated_battery_cycles=float(config.get(CONF_RATED_BATTERY_CYCLES, 6000.0)),
+            end_of_life_degradation=float(
+                config.get(CONF_END_OF_LIFE_DEGRADATION, 0.8)
+            ),
+            minimum_user_selectable_soc=min(
+                max(
+                    float(
+                        config.get(
+                            CONF_MINIMUM_USER_SELECTABLE_SOC,
+                            DEFAULT_MINIMUM_USER_SELECTABLE_SOC,
+                        )
+                    ),
+                    0.0,
+                ),
+                1.0,
+            ),
+            solar_capped=config.get(CONF_SOLAR_ENERGY_SENSOR) is not None,
+            nominal_inverter_power=(
+                float(nominal_inverter_power)
+                if nominal_inverter_power is not None
+                else None
+            ),
+            degradation_curve=parse_degradation_curve(
+                config.get(CONF_DEGRADATION_CURVE)
+            ),
+        )
+
+
+class BatteryControls(NamedTuple):
+    """User controlled settings: mode, pause switch and slider limits.
+
+    Limits are in kW and the SoC bounds are percentages of current capacity.
+    """
+
+    mode: str = DEFAULT_MODE
+    paused: bool = False
+    charge_limit: float = float("inf")
+    discharge_limit: float = float("inf")
+    minimum_soc: float = 0.0
+    maximum_soc: float = 100.0
+
+
+class BatteryState(NamedTuple):
+    """Everything that carries over from one step to the next."""
+
+    charge_state: float
+    stored_energy_value: float = 0.0
+    battery_cycles: float = 0.0
+    energy_battery_in: float = 0.0
+    energy_battery_out: float = 0.0
+    energy_saved: float = 0.0
+    money_saved_import: float = 0.0
+    money_saved_export: float = 0.0
+
+
+class StepOutputs(NamedTuple):
+    """Per-interval results of a step that are not part of the state."""
+
+    amount_to_charge: float
+    amount_to_discharge: float
+    net_import: float
+    net_export: float
+    charge_efficiency: float | None
+    discharge_efficiency: float | None
+    charging_rate: float
+    discharging_rate: float
+    solar_power_cap: float
+    battery_mode: str
+    status: str
+    degradation: float
+    average_energy_value: float
+
+
+def degradation_factor(config: BatteryConfig, cycles: float) -> float:
+    """Return the capacity factor after the given number of cycles."""
+    if config.degradation_curve is not None:
+        return config.degradation_curve.factor_at(cycles)
+    progress = cycles / config.rated_battery_cycles
+    if progress <= 0.0:
+        return 1.0
+    if progress > 1.0:
+        progress = 1.0
+    return 1.0 - ((1.0 - config.end_of_life_degradation) * progress)
+
+
+def max_capacity(config: BatteryConfig, cycles: float) -> float:
+    """Return the degraded maximum capacity in kWh after the given cycles."""
+    capacity = config.battery_size * degradation_factor(config, cycles)
+    return capacity if capacity > MINIMUM_CAPACITY else MINIMUM_CAPACITY
+
+
+def value_accounting_energy(
+    config: BatteryConfig, charge_state: float, capacity: float
+) -> float:
+    """Return the stored energy above the physical minimum-SoC floor in kWh."""
+    floor = max(max(capacity, 0.0) * config.minimum_user_selectable_soc, 0.0)
+    return max(max(charge_state, 0.0) - floor, 0.0)
+
+
+def rescale_stored_energy_value(
+    config: BatteryConfig,
+    stored_energy_value: float,
+    previous_charge_state: float,
+    new_charge_state: float,
+    previous_capacity: float,
+    new_capacity: float,
+) -> float:
+    """Return the stored value that keeps its average across an SoC change."""
+    previous_energy = value_accounting_energy(
+        config, previous_charge_state, previous_capacity
+    )
+    new_energy = value_accounting_energy(config, new_charge_state, new_capacity)
+    if new_energy <= VALUE_ACCOUNTING_EPSILON:
+        return 0.0
+    if previous_energy > VALUE_ACCOUNTING_EPSILON:
+        return stored_energy_value * (new_energy / previous_energy)
+    # Usable energy introduced from below the floor carries no value.
+    return 0.0
+
+
+def step(
+    config: BatteryConfig,
+    controls: BatteryControls,
+    state: BatteryState,
+    import_amount: float,
+    export_amount: float,
+    solar_amount: float,
+    interval_seconds: float,
+    import_tariff: float | None = None,
+    export_tariff: float | None = None,
+) -> tuple[BatteryState, StepOutputs]:
+    """Advance the battery by one interval and return the new state and outputs.
+
+    Amounts are kWh that flowed through the meters during the interval. A
+    tariff of None means no tariff is known and the matching savings and
+    stored value are left unchanged.
+    """
+    (
+        charge_state,
+        stored_energy_value,
+        battery_cycles,
+        energy_battery_in,
+        energy_battery_out,
+        energy_saved,
+        money_saved_import,
+        money_saved_export,
+    ) = state
+    mode, paused, charge_limit, discharge_limit, minimum_soc, maximum_soc = controls
+    paused = paused or mode == PAUSE_BATTERY
+
+    # Builtin min()/max() calls dominate a step this small, so the clamps
+    # below are written as conditional expressions.
+    max_discharge = interval_seconds * (config.max_discharge_rate / 3600)
+    max_charge = interval_seconds * (config.max_charge_rate / 3600)
+    interval_hours = interval_seconds / 3600
+    if interval_hours < _ONE_SECOND_IN_HOURS:
+        interval_hours = _ONE_SECOND_IN_HOURS
+    charge_limit = interval_seconds * (charge_limit / 3600)
+    discharge_limit = interval_seconds * (discharge_limit / 3600)
+
+    solar_power_cap = 0.0
+    if config.solar_capped:
+        solar_cap = float(solar_amount)
+        if solar_cap < 0.0:
+            solar_cap = 0.0
+        if solar_cap < max_charge:
+            max_charge = solar_cap
+        solar_power_cap = solar_cap / interval_hours
+        if config.nominal_inverter_power is not None:
+            available_inverter_discharge_power = (
+                config.nominal_inverter_power - solar_power_cap
+            )
+            if available_inverter_discharge_power < 0.0:
+                available_inverter_discharge_power = 0.0
+            inverter_discharge = available_inverter_discharge_power * interval_hours
+            if inverter_discharge < max_discharge:
+                max_discharge = inverter_discharge
+
+    battery_size = config.battery_size
+    minimum_user_selectable_soc = config.minimum_user_selectable_soc
+    effective_max_capacity = max_capacity(config, battery_cycles)
+    available_capacity_to_charge = (
+        effective_max_capacity * maximum_soc / 100 - charge_state
+    )
+    if available_capacity_to_charge < 0.0:
+        available_capacity_to_charge = 0.0
+    available_capacity_to_discharge = (
+        charge_state - effective_max_capacity * minimum_soc / 100
+    )
+    if available_capacity_to_discharge < 0.0:
+        available_capacity_to_discharge = 0.0
+
+    if charge_limit < max_charge:
+        max_charge = charge_limit
+    if discharge_limit < max_discharge:
+        max_discharge = discharge_limit
+
+    amount_to_charge = 0.0
+    amount_to_discharge = 0.0
+    if paused:
+        pass
+    elif mode == OVERRIDE_CHARGING:
+        amount_to_charge = max_charge
+    elif mode == FORCE_DISCHARGE:
+        amount_to_discharge = max_discharge
+    else:
+        if mode != DISCHARGE_ONLY:
+            amount_to_charge = (
+                export_amount if export_amount < max_charge else max_charge
+            )
+        if mode != CHARGE_ONLY:
+            amount_to_discharge = (
+                import_amount if import_amount < max_discharge else max_discharge
+            )
+
+    charge_curve = config.charge_efficiency_curve
+    discharge_curve = config.discharge_efficiency_curve
+    constant_charge_efficiency = charge_curve.constant
+    constant_discharge_efficiency = discharge_curve.constant
+
+    # Keep amount_to_charge as input-side energy and amount_to_discharge as
+    # output-side delivered energy. The SoC capacities are battery-internal,
+    # so clip them through the efficiency curve. A constant efficiency clips
+    # by a single division; curves are solved exactly per segment.
+    if amount_to_charge > 0.0:
+        if constant_charge_efficiency is not None:
+            clipped_amount_to_charge = available_capacity_to_charge / (
+                constant_charge_efficiency
+                if constant_charge_efficiency > MINIMUM_EFFICIENCY
+                else MINIMUM_EFFICIENCY
+            )
+            if clipped_amount_to_charge < amount_to_charge:
+                amount_to_charge = clipped_amount_to_charge
+        else:
+            amount_to_charge = charge_curve.clip_charge(
+                amount_to_charge, interval_hours, available_capacity_to_charge
+            )
+
+    if amount_to_discharge > 0.0:
+        if constant_discharge_efficiency is not None:
+            clipped_amount_to_discharge = (
+                available_capacity_to_discharge * constant_discharge_efficiency
+            )
+            if clipped_amount_to_discharge < amount_to_discharge:
+                amount_to_discharge = clipped_amount_to_discharge
+        else:
+            amount_to_discharge = discharge_curve.clip_discharge(
+                amount_to_discharge, interval_hours, available_capacity_to_discharge
+            )
+
+    charge_efficiency = (
+        constant_charge_efficiency
+        if constant_charge_efficiency is not None
+        else charge_curve.efficiency_at(
+            amount_to_charge / interval_hours if amount_to_charge > 0 else 0.0
+        )
+    )
+    discharge_efficiency = (
+        constant_discharge_efficiency
+        if constant_discharge_efficiency is not None
+        else discharge_curve.efficiency_at(
+            amount_to_discharge / interval_hours if amount_to_discharge > 0 else 0.0
+        )
+    )
+
+    if paused:
+        battery_mode = MODE_IDLE
+    elif mode == OVERRIDE_CHARGING:
+        battery_mode = MODE_FORCE_CHARGING if amount_to_charge > 0.0 else MODE_IDLE
+    elif mode == FORCE_DISCHARGE:
+        battery_mode = (
+            MODE_FORCE_DISCHARGING if amount_to_discharge > 0.0 else MODE_IDLE
+        )
+    elif amount_to_charge > 0.0 and amount_to_charge >= amount_to_discharge:
+        battery_mode = MODE_CHARGING
+    elif amount_to_discharge > 0.0:
+        battery_mode = MODE_DISCHARGING
+    else:
+        battery_mode = MODE_IDLE
+
+    # Net grid import/export, using efficiency-adjusted charge/discharge amounts.
+    if mode == OVERRIDE_CHARGING:
+        net_export = export_amount - amount_to_charge
+        net_import = import_amount
+        if net_export < 0.0:
+            net_import -= net_export
+            net_export = 0.0
+    elif mode == FORCE_DISCHARGE:
+        net_import = import_amount - amount_to_discharge
+        net_export = export_amount
+        if net_import < 0.0:
+            net_export -= net_import
+            net_import = 0.0
+    elif mode == CHARGE_ONLY:
+        net_import = import_amount
+        net_export = export_amount - amount_to_charge
+    elif mode == DISCHARGE_ONLY:
+        net_import = import_amount - amount_to_discharge
+        net_export = export_amount
+    elif paused:
+        net_export = export_amount
+        net_import = import_amount
+    else:
+        net_import = import_amount - amount_to_discharge
+        net_export = export_amount - amount_to_charge
+
+    if import_tariff is not None:
+        money_saved_import += (import_amount - net_import) * import_tariff
+    if export_tariff is not None:
+        money_saved_export += (net_export - export_amount) * export_tariff
+
+    # Charging from exported energy has the opportunity cost of foregone export
+    # revenue, while grid-backed forced charging uses the import tariff.
+    charge_value_increment = 0.0
+    if amount_to_charge > 0.0:
+        charge_from_export = export_amount if export_amount > 0.0 else 0.0
+        if amount_to_charge < charge_from_export:
+            charge_from_export = amount_to_charge
+        if export_tariff is not None:
+            charge_value_increment += charge_from_export * export_tariff
+        if import_tariff is not None and amount_to_charge > charge_from_export:
+            charge_value_increment += (
+                amount_to_charge - charge_from_export
+            ) * import_tariff
+
+    # Discharge removes value in the same proportion as it removes usable
+    # (above-floor) energy, so the average value per kWh is unchanged.
+    minimum_energy = effective_max_capacity * minimum_user_selectable_soc
+    guarded_discharge_efficiency = (
+        discharge_efficiency
+        if discharge_efficiency > MINIMUM_EFFICIENCY
+        else MINIMUM_EFFICIENCY
+    )
+    stored_energy_value += charge_value_increment
+    if amount_to_discharge > 0.0:
+        value_accounting_energy_after_charge = (
+            (charge_state if charge_state > 0.0 else 0.0)
+            + amount_to_charge * charge_efficiency
+            - minimum_energy
+        )
+        if value_accounting_energy_after_charge > VALUE_ACCOUNTING_EPSILON:
+            retained_value_fraction = 1.0 - (
+                amount_to_discharge
+                / guarded_discharge_efficiency
+                / value_accounting_energy_after_charge
+            )
+            stored_energy_value *= (
+                retained_value_fraction if retained_value_fraction > 0.0 else 0.0
+            )
+
+    charge_state = (
+        charge_state
+        + (amount_to_charge * charge_efficiency)
+        - (amount_to_discharge / guarded_discharge_efficiency)
+    )
+
+    energy_battery_in += amount_to_charge
+    battery_cycles = energy_battery_in / battery_size
+    degradation = degradation_factor(config, battery_cycles)
+    new_max_capacity = battery_size * degradation
+    if new_max_capacity < MINIMUM_CAPACITY:
+        new_max_capacity = MINIMUM_CAPACITY
+
+    if charge_state > effective_max_capacity:
+        # Both charge states relate to the same effective capacity, so the
+        # non-dischargeable reserve is unchanged.
+        stored_energy_value = rescale_stored_energy_value(
+            config,
+            stored_energy_value,
+            charge_state,
+            effective_max_capacity,
+            effective_max_capacity,
+            effective_max_capacity,
+        )
+        charge_state = effective_max_capacity
+
+    usable_energy = (
+        (charge_state if charge_state > 0.0 else 0.0)
+        - new_max_capacity * minimum_user_selectable_soc
+    )
+    if usable_energy <= VALUE_ACCOUNTING_EPSILON:
+        stored_energy_value = 0.0
+        average_energy_value = 0.0
+    else:
+        average_energy_value = stored_energy_value / usable_energy
+
+    charge_percentage = round(100 * charge_state / effective_max_capacity)
+    if charge_percentage < 2:
+        status = MODE_EMPTY
+    elif charge_percentage > 98:
+        status = MODE_FULL
+    else:
+        status = STATUS_NORMAL
+
+    new_state = BatteryState(
+        charge_state,
+        stored_energy_value,
+        battery_cycles,
+        energy_battery_in,
+        energy_battery_out + amount_to_discharge,
+        energy_saved + (import_amount - net_import),
+        money_saved_import,
+        money_saved_export,
+    )
+    outputs = StepOutputs(
+        amount_to_charge,
+        amount_to_discharge,
+        net_import,
+        net_export,
+        charge_efficiency if amount_to_charge > 0 else None,
+        discharge_efficiency if amount_to_discharge > 0 else None,
+        amount_to_charge / interval_hours,
+        amount_to_discharge / interval_hours,
+        solar_power_cap,
+        battery_mode,
+        status,
+        degradation,
+        average_energy_value,
+    )
+    return new_state, outputs
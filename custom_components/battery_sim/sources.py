@@ -0,0 +1,139 @@
+"""Meter readings shared by every battery watching the same source entity."""
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+from typing import NamedTuple
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import DOMAIN
+from .helpers import MeterSource
+
+_LOGGER = logging.getLogger(__name__)
+
+METER_HUB_KEY = f"{DOMAIN}_meter_hub"
+
+
+class MeterReading(NamedTuple):
+    """Cumulative meter values before and after a state change, in kWh."""
+
+    old_value: float
+    new_value: float
+
+    @property
+    def delta(self) -> float:
+        """Return the energy recorded by the meter between the two states."""
+        return self.new_value - self.old_value
+
+
+def read_meter_event(source: MeterSource, event) -> MeterReading | None:
+    """Return the reading carried by a state change of a meter, or None.
+
+    None is returned while the meter is not ready and for units other than
+    kWh and Wh.
+    """
+    old_state = event.data.get("old_state")
+    new_state = event.data.get("new_state")
+    if (
+        old_state is None
+        or new_state is None
+        or old_state.state in [STATE_UNKNOWN, STATE_UNAVAILABLE]
+        or new_state.state in [STATE_UNKNOWN, STATE_UNAVAILABLE]
+    ):
+        # Incorrect Setup or Sensors are not ready
+        return None
+
+    conversion_factor = source.conversion_factor_for(new_state)
+    if conversion_factor is None:
+        _LOGGER.warning(
+            "Unsupported energy unit '%s' for sensor %s; expected kWh or Wh. Ignoring update.",
+            source.units,
+            source.sensor_id,
+        )
+        return None
+
+    return MeterReading(
+        float(old_state.state) * conversion_factor,
+        float(new_state.state) * conversion_factor,
+    )
+
+
+class MeterSourceHub:
+    """Subscribe once to each meter entity and share its readings.
+
+    A state change is parsed, converted to kWh and validated once, then handed
+    to every battery subscribed to the meter, however many there are.
+    """
+
+    def __init__(self, hass):
+        """Initialize the hub without any subscriptions."""
+        self._hass = hass
+        self._sources: dict[str, MeterSource] = {}
+        self._subscribers: dict[str, list[Callable[[MeterReading], None]]] = {}
+        self._unsubs: dict[str, CALLBACK_TYPE] = {}
+
+    def source(self, entity_id: str) -> MeterSource:
+        """Return the shared source of a meter entity.
+
+        Meters without subscribers get a new source that is not kept.
+        """
+        source = self._sources.get(entity_id)
+        if source is None:
+            source = MeterSource(entity_id)
+        return source
+
+    @callback
+    def async_subscribe(
+        self, entity_id: str, action: Callable[[MeterReading], None]
+    ) -> CALLBACK_TYPE:
+        """Call `action(reading)` for each reading of a meter; return an unsubscribe."""
+        subscribers = self._subscribers.get(entity_id)
+        if subscribers is None:
+            subscribers = self._subscribers[entity_id] = []
+            self._sources[entity_id] = MeterSource(entity_id)
+            self._unsubs[entity_id] = async_track_state_change_event(
+                self._hass, [entity_id], self._async_state_changed
+            )
+        subscribers.append(action)
+
+        @callback
+        def async_unsubscribe():
+            if action not in subscribers:
+                return
+            subscribers.remove(action)
+            if not subscribers:
+                del self._subscribers[entity_id]
+                del self._sources[entity_id]
+                self._unsubs.pop(entity_id)()
+
+        return async_unsubscribe
+
+    @callback
+    def _async_state_changed(self, event) -> None:
+        """Parse a meter state change once and pass it to every subscriber."""
+        entity_id = event.data["entity_id"]
+        subscribers = self._subscribers.get(entity_id)
+        if not subscribers:
+            return
+        source = self._sources[entity_id]
+        source.readings += 1
+        reading = read_meter_event(source, event)
+        if reading is None:
+            source.dropped_readings += 1
+            return
+        for action in list(subscribers):
+            try:
+                action(reading)
+            except Exception:  # noqa: BLE001 - one battery must not stop the rest
+                _LOGGER.exception("Error applying a reading of %s", entity_id)
+
+
+@callback
+def async_get_meter_hub(hass) -> MeterSourceHub:
+    """Return the meter hub of the integration, creating it when needed."""
+    if METER_HUB_KEY not in hass.data:
+        hass.data[METER_HUB_KEY] = MeterSourceHub(hass)
+    return hass.data[METER_HUB_KEY]
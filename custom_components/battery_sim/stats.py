@@ -0,0 +1,96 @@
+"""Always-on counters for the per-battery hot paths."""
+from __future__ import annotations
+
+from bisect import bisect_left
+
+# Upper bounds, in seconds, of the update latency histogram buckets. A last
+# bucket without an upper bound catches anything slower.
+LATENCY_BUCKETS = (
+    0.00001,
+    0.00002,
+    0.00005,
+    0.0001,
+    0.0002,
+    0.0005,
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+)
+
+
+class LatencyHistogram:
+    """Count durations in fixed buckets and keep their total and maximum."""
+
+    __slots__ = ("counts", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Add one duration."""
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def as_dict(self) -> dict:
+        """Return the histogram with buckets labelled by their upper bound in µs."""
+        count = sum(self.counts)
+        labels = [f"<={round(bound * 1_000_000)}us" for bound in LATENCY_BUCKETS]
+        labels.append(f">{round(LATENCY_BUCKETS[-1] * 1_000_000)}us")
+        return {
+            "count": count,
+            "mean_seconds": self.total_seconds / count if count else 0.0,
+            "max_seconds": self.max_seconds,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class BatteryStats:
+    """Counters of the work one battery does.
+
+    Only the event loop updates them, so plain integer increments are safe
+    and cost next to nothing; they are always on.
+    """
+
+    __slots__ = (
+        "ticks",
+        "update_latency",
+        "readings",
+        "solar_readings",
+        "rebased_readings",
+        "delayed_updates",
+        "caught_up_ticks",
+        "skipped_ticks",
+        "early_updates",
+    )
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self.ticks = 0
+        self.update_latency = LatencyHistogram()
+        self.readings = 0
+        self.solar_readings = 0
+        self.rebased_readings = 0
+        self.delayed_updates = 0
+        self.caught_up_ticks = 0
+        self.skipped_ticks = 0
+        self.early_updates = 0
+
+    def as_dict(self) -> dict:
+        """Return the counters as plain data."""
+        return {
+            "ticks": self.ticks,
+            "update_latency": self.update_latency.as_dict(),
+            "readings": self.readings,
+            "solar_readings": self.solar_readings,
+            "rebased_readings": self.rebased_readings,
+            "delayed_updates": self.delayed_updates,
+            "caught_up_ticks": self.caught_up_ticks,
+            "skipped_ticks": self.skipped_ticks,
+            "early_updates": self.early_updates,
+        }
@@ -0,0 +1,225 @@
+"""Parameter sweeps and sizing searches over recorded meter history.
+
+Every point of a sweep is one `replay_history` run of the battery config with
+some settings overridden. `sweep` replays a whole grid of points spread over
+a process pool; `optimize` searches continuous settings such as the battery
+size with golden-section steps, one coordinate at a time, which needs a few
+dozen replays where a grid of the same resolution would need hundreds.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import math
+from typing import NamedTuple
+
+from .replay import ReplayResult, ReplaySample, replay_history
+
+# Sweep key for the maximum SoC slider in percent. Every other key overrides
+# the battery config entry value of the same name.
+MAXIMUM_SOC = "maximum_soc"
+
+_INVERSE_GOLDEN_RATIO = (math.sqrt(5.0) - 1.0) / 2.0
+
+# Replay inputs of the current worker process, set once by the pool initializer
+# so the samples are not pickled again for every point.
+_worker_replay: tuple | None = None
+
+
+class SweepPoint(NamedTuple):
+    """The settings of one replayed point and its totals."""
+
+    settings: dict
+    result: ReplayResult
+
+
+def money_saved(settings: Mapping, result: ReplayResult) -> float:
+    """Return the money saved by a replayed point, the default objective."""
+    return result.money_saved
+
+
+def net_savings(cost_per_kwh: float, size_key: str) -> Callable:
+    """Return an objective of money saved minus the cost of the capacity.
+
+    `cost_per_kwh` is what one kWh of battery costs over the replayed period,
+    for example its price divided by its lifetime in replay periods. Without
+    a capacity cost the largest battery always saves the most.
+    """
+
+    def objective(settings: Mapping, result: ReplayResult) -> float:
+        return result.money_saved - cost_per_kwh * float(settings[size_key])
+
+    return objective
+
+
+def replay_point(
+    config: Mapping,
+    samples: Sequence[ReplaySample],
+    settings: Mapping,
+    start_time: float | None = None,
+) -> ReplayResult:
+    """Replay the samples with some config values and the max SoC overridden."""
+    settings = dict(settings)
+    maximum_soc = settings.pop(MAXIMUM_SOC, 100.0)
+    return replay_history(
+        {**config, **settings}, samples, start_time, maximum_soc=maximum_soc
+    )
+
+
+def grid_points(grid: Mapping[str, Iterable]) -> list[dict]:
+    """Return every combination of the values in a grid as settings dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in product(*grid.values())]
+
+
+def _init_worker(config, samples, start_time):
+    global _worker_replay
+    _worker_replay = (config, samples, start_time)
+
+
+def _replay_in_worker(settings):
+    config, samples, start_time = _worker_replay
+    return replay_point(config, samples, settings, start_time)
+
+
+def sweep(
+    config: Mapping,
+    samples: Sequence[ReplaySample],
+    points: Iterable[Mapping],
+    start_time: float | None = None,
+    max_workers: int | None = None,
+) -> list[SweepPoint]:
+    """Replay every point on a process pool and return them in the given order.
+
+    `points` are settings dicts, for example from `grid_points`. Each worker
+    process receives the samples once; `max_workers` defaults to the number of
+    CPUs, and a single worker replays in the calling process.
+    """
+    points = [dict(point) for point in points]
+    samples = list(samples)
+    if max_workers == 1 or len(points) <= 1:
+        results = [
+            replay_point(config, samples, point, start_time) for point in points
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(dict(config), samples, start_time),
+        ) as executor:
+            results = list(executor.map(_replay_in_worker, points))
+    return [SweepPoint(point, result) for point, result in zip(points, results)]
+
+
+def golden_section_maximum(
+    function: Callable[[float], float],
+    low: float,
+    high: float,
+    tolerance: float,
+) -> float:
+    """Return where a unimodal function peaks in [low, high], within tolerance.
+
+    Each step keeps one of the two interior points, so only one new function
+    value is needed per step.
+    """
+    inner_low = high - _INVERSE_GOLDEN_RATIO * (high - low)
+    inner_high = low + _INVERSE_GOLDEN_RATIO * (high - low)
+    value_low = function(inner_low)
+    value_high = function(inner_high)
+    while high - low > tolerance:
+        if value_low >= value_high:
+            high, inner_high, value_high = inner_high, inner_low, value_low
+            inner_low = high - _INVERSE_GOLDEN_RATIO * (high - low)
+            value_low = function(inner_low)
+        else:
+            low, inner_low, value_low = inner_low, inner_high, value_high
+            inner_high = low + _INVERSE_GOLDEN_RATIO * (high - low)
+            value_high = function(inner_high)
+    return inner_low if value_low >= value_high else inner_high
+
+
+class OptimizeResult(NamedTuple):
+    """The best settings found by `optimize` and what it took to find them."""
+
+    settings: dict
+    objective: float
+    result: ReplayResult
+    replays: int
+
+
+def optimize(
+    config: Mapping,
+    samples: Sequence[ReplaySample],
+    bounds: Mapping[str, tuple[float, float]],
+    objective: Callable[[Mapping, ReplayResult], float] = money_saved,
+    fixed: Mapping | None = None,
+    tolerances: Mapping[str, float] | None = None,
+    start_time: float | None = None,
+    coarse_steps: int = 5,
+    passes: int = 2,
+    max_workers: int | None = None,
+) -> OptimizeResult:
+    """Search the bounded settings for the highest objective.
+
+    A coarse grid of `coarse_steps` values per setting is replayed first on a
+    process pool, see `sweep`. Around its best point, each pass then runs a
+    golden-section search on every setting in turn, within one coarse step
+    either side and with the other settings held at their best value so far.
+    `fixed` settings apply to every replay. `tolerances` default to 1% of
+    each range.
+    """
+    samples = list(samples)
+    fixed = dict(fixed or {})
+    tolerances = tolerances or {}
+    evaluated: dict[tuple, tuple[float, ReplayResult]] = {}
+
+    def remember(settings, result):
+        value = objective(settings, result)
+        evaluated[tuple(sorted(settings.items()))] = (value, result)
+        return value
+
+    steps = {
+        key: (high - low) / (coarse_steps - 1) if coarse_steps > 1 else high - low
+        for key, (low, high) in bounds.items()
+    }
+    coarse = sweep(
+        config,
+        samples,
+        [
+            {**fixed, **point}
+            for point in grid_points(
+                {
+                    key: [low + index * steps[key] for index in range(coarse_steps)]
+                    if coarse_steps > 1
+                    else [(low + high) / 2.0]
+                    for key, (low, high) in bounds.items()
+                }
+            )
+        ],
+        start_time,
+        max_workers,
+    )
+    values = [remember(point.settings, point.result) for point in coarse]
+    best = dict(coarse[values.index(max(values))].settings)
+
+    def evaluate(settings):
+        key = tuple(sorted(settings.items()))
+        if key not in evaluated:
+            remember(settings, replay_point(config, samples, settings, start_time))
+        return evaluated[key][0]
+
+    for _ in range(passes):
+        for key, (low, high) in bounds.items():
+            others = dict(best)
+            found = golden_section_maximum(
+                lambda value, key=key, others=others: evaluate({**others, key: value}),
+                max(low, best[key] - steps[key]),
+                min(high, best[key] + steps[key]),
+                tolerances.get(key, (high - low) / 100.0),
+            )
+            if evaluate({**others, key: found}) > evaluate(best):
+                best[key] = found
+
+    value, result = evaluated[tuple(sorted(best.items()))]
+    return OptimizeResult(best, value, result, len(evaluated))
@@ -2,8 +2,6 @@
 import logging
 
 from homeassistant.components.switch import SwitchEntity
-from homeassistant.const import STATE_OFF, STATE_ON
-from homeassistant.helpers.restore_state import RestoreEntity
 
 from .const import DOMAIN, CONF_BATTERY, PAUSE_BATTERY
 from .helpers import battery_entity_name
@@ -50,7 +48,7 @@ async def async_setup_platform(
     return True
 
 
-class BatterySwitch(RestoreEntity, SwitchEntity):
+class BatterySwitch(SwitchEntity):
     """Switch to pause or resume the simulated battery."""
 
     def __init__(self, handle, switch_type, key, icon):
@@ -100,16 +98,3 @@ class BatterySwitch(RestoreEntity, SwitchEntity):
         self.handle.async_trigger_update()
         self.schedule_update_ha_state(True)
         return True
-
-    async def async_added_to_hass(self):
-        """Restore the switch position from before the last restart."""
-        await super().async_added_to_hass()
-
-        state = await self.async_get_last_state()
-        if state is None or state.state not in (STATE_ON, STATE_OFF):
-            return
-
-        self.handle._switches[self._switch_type] = state.state == STATE_ON
-        _LOGGER.debug(
-            "Restored %s for '%s' to %s", self._key, self._name, state.state
-        )
@@ -0,0 +1,106 @@
+"""Tariff sensor values shared by every battery in the integration."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.const import STATE_UNAVAILABLE, STATE_UNKNOWN
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import (
+    DOMAIN,
+    FIXED_TARIFF,
+    NO_TARIFF_INFO,
+    TARIFF_SENSOR,
+    TARIFF_TYPE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+TARIFF_CACHE_KEY = f"{DOMAIN}_tariff_cache"
+
+
+def tariff_sensor_id(input_details) -> str | None:
+    """Return the tariff entity configured for an input, or None."""
+    if input_details[TARIFF_TYPE] in [NO_TARIFF_INFO, FIXED_TARIFF]:
+        return None
+    entity_id = input_details.get(TARIFF_SENSOR)
+    if entity_id is None or len(entity_id) < 6:
+        return None
+    return entity_id
+
+
+def _parse_tariff(state) -> float | None:
+    """Return the tariff held by a state, or None when it has no usable value."""
+    if state is None or state.state in [STATE_UNAVAILABLE, STATE_UNKNOWN]:
+        return None
+    try:
+        return float(state.state)
+    except ValueError:
+        _LOGGER.warning(
+            "Tariff sensor %s has non-numeric state '%s'; ignoring it.",
+            state.entity_id,
+            state.state,
+        )
+        return None
+
+
+class TariffCache:
+    """Latest parsed value of each tariff sensor used by a battery.
+
+    Each tariff entity is subscribed to once, however many batteries use it,
+    and its value is parsed when it changes. Batteries then read tariffs with
+    a dictionary lookup instead of going through the state machine.
+    """
+
+    def __init__(self, hass):
+        """Initialize an empty cache."""
+        self._hass = hass
+        self._values: dict[str, float | None] = {}
+        self._users: dict[str, int] = {}
+        self._unsubs: dict[str, CALLBACK_TYPE] = {}
+
+    def get(self, entity_id: str) -> float | None:
+        """Return the cached tariff of an entity, or None."""
+        return self._values.get(entity_id)
+
+    @callback
+    def async_track(self, entity_id: str) -> CALLBACK_TYPE:
+        """Keep the tariff of `entity_id` cached; return a callback releasing it."""
+        if entity_id not in self._users:
+            self._users[entity_id] = 0
+            self._values[entity_id] = _parse_tariff(self._hass.states.get(entity_id))
+            self._unsubs[entity_id] = async_track_state_change_event(
+                self._hass, [entity_id], self._async_tariff_changed
+            )
+        self._users[entity_id] += 1
+        released = False
+
+        @callback
+        def async_release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            self._users[entity_id] -= 1
+            if not self._users[entity_id]:
+                del self._users[entity_id]
+                del self._values[entity_id]
+                self._unsubs.pop(entity_id)()
+
+        return async_release
+
+    @callback
+    def _async_tariff_changed(self, event):
+        """Parse the new value of a tracked tariff entity."""
+        self._values[event.data["entity_id"]] = _parse_tariff(
+            event.data.get("new_state")
+        )
+
+
+@callback
+def async_get_tariff_cache(hass) -> TariffCache:
+    """Return the tariff cache of the integration, creating it when needed."""
+    if TARIFF_CACHE_KEY not in hass.data:
+        hass.data[TARIFF_CACHE_KEY] = TariffCache(hass)
+    return hass.data[TARIFF_CACHE_KEY]
@@ -0,0 +1,123 @@
+"""Inputs and outputs of the last ticks of a battery, in a ring buffer.
+
+Each tick is packed as one fixed-size record of doubles into a buffer that is
+allocated once per battery, so recording a tick allocates nothing and costs
+about as much as a debug log call that is switched off. The records are read
+back through a NumPy view of the buffer, a column per field.
+"""
+from __future__ import annotations
+
+import math
+import struct
+
+import numpy as np
+
+# Ticks each battery keeps, four hours at the default update frequency.
+TICK_TRACE_SIZE = 240
+
+TICK_FIELDS = (
+    "time",
+    "interval",
+    "import",
+    "export",
+    "solar",
+    "charged",
+    "discharged",
+    "net_import",
+    "net_export",
+    "charge_efficiency",
+    "discharge_efficiency",
+    "import_tariff",
+    "export_tariff",
+    "charge_state",
+    "max_capacity",
+)
+TICK_RECORD = struct.Struct(f"<{len(TICK_FIELDS)}d")
+TICK_DTYPE = np.dtype([(field, "<f8") for field in TICK_FIELDS])
+
+# Recorded for efficiencies and tariffs that are unknown.
+_UNKNOWN = math.nan
+
+
+class TickTrace:
+    """Fixed-size ring buffer of the last ticks of one battery."""
+
+    __slots__ = ("size", "count", "journal", "_next", "_buffer")
+
+    def __init__(self, size: int = TICK_TRACE_SIZE):
+        """Allocate room for `size` ticks."""
+        self.size = size
+        self.count = 0
+        # TickJournal every recorded tick is appended to, if any.
+        self.journal = None
+        self._next = 0
+        self._buffer = bytearray(size * TICK_RECORD.size)
+
+    def record(
+        self,
+        time,
+        interval,
+        import_amount,
+        export_amount,
+        solar_amount,
+        charged,
+        discharged,
+        net_import,
+        net_export,
+        charge_efficiency,
+        discharge_efficiency,
+        import_tariff,
+        export_tariff,
+        charge_state,
+        max_capacity,
+    ) -> None:
+        """Record one tick over the oldest one once the buffer is full."""
+        offset = self._next * TICK_RECORD.size
+        TICK_RECORD.pack_into(
+            self._buffer,
+            offset,
+            time,
+            interval,
+            import_amount,
+            export_amount,
+            solar_amount,
+            charged,
+            discharged,
+            net_import,
+            net_export,
+            _UNKNOWN if charge_efficiency is None else charge_efficiency,
+            _UNKNOWN if discharge_efficiency is None else discharge_efficiency,
+            _UNKNOWN if import_tariff is None else import_tariff,
+            _UNKNOWN if export_tariff is None else export_tariff,
+            charge_state,
+            max_capacity,
+        )
+        self._next = (self._next + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+        if self.journal is not None:
+            self.journal.append(self._buffer, offset)
+
+    def records(self, count: int | None = None) -> np.ndarray:
+        """Return the last `count` ticks, oldest first, as a structured array.
+
+        Unless the ticks wrap around the end of the buffer, this is a view
+        that later ticks overwrite.
+        """
+        count = self.count if count is None else min(count, self.count)
+        ring = np.frombuffer(self._buffer, dtype=TICK_DTYPE)
+        start = self._next - count
+        if start >= 0:
+            return ring[start : self._next]
+        return np.concatenate((ring[start:], ring[: self._next]))
+
+    def columns(self, count: int | None = None) -> dict[str, list]:
+        """Return the last `count` ticks as a list per field, unknowns as None."""
+        records = self.records(count)
+        return {
+            field: [
+                None if math.isnan(value) else value
+                for value in records[field].tolist()
+            ]
+            for field in TICK_FIELDS
+        }
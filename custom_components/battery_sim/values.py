@@ -0,0 +1,150 @@
+"""Live values of a simulated battery, in slots instead of a string-keyed dict.
+
+Each battery handle keeps its counters, rates, efficiencies, money and status
+in one BatteryValues. The simulation writes them as attributes. Entities read
+them through an accessor made once with value_accessor(). The checkpoint,
+the publisher and services still address them by the sensor keys from const,
+through the mapping interface.
+
+The totals of the simulated meters are keyed by the input's simulated sensor,
+which the config flow derives from the meter's entity id, so they stay in a
+small dict.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator, MutableMapping
+from operator import attrgetter
+
+from .const import (
+    ATTR_AVERAGE_ENERGY_VALUE,
+    ATTR_ENERGY_BATTERY_IN,
+    ATTR_ENERGY_BATTERY_OUT,
+    ATTR_ENERGY_SAVED,
+    ATTR_LAST_CHARGE_EFFICIENCY,
+    ATTR_LAST_DISCHARGE_EFFICIENCY,
+    ATTR_MONEY_SAVED,
+    ATTR_MONEY_SAVED_EXPORT,
+    ATTR_MONEY_SAVED_IMPORT,
+    ATTR_STATUS,
+    BATTERY_CYCLES,
+    BATTERY_DEGRADATION,
+    BATTERY_MODE,
+    CHARGING_RATE,
+    DISCHARGING_RATE,
+    MODE_IDLE,
+    SOLAR_POWER_CAP,
+)
+
+DEFAULT_BATTERY_STATUS = "Normal"
+DEFAULT_BATTERY_DEGRADATION = 1.0
+
+# Slot of each sensor key, in the order the values were always listed.
+VALUE_SLOTS = {
+    ATTR_ENERGY_SAVED: "energy_saved",
+    ATTR_ENERGY_BATTERY_OUT: "energy_battery_out",
+    ATTR_ENERGY_BATTERY_IN: "energy_battery_in",
+    CHARGING_RATE: "charging_rate",
+    DISCHARGING_RATE: "discharging_rate",
+    SOLAR_POWER_CAP: "solar_power_cap",
+    ATTR_MONEY_SAVED: "money_saved",
+    ATTR_AVERAGE_ENERGY_VALUE: "average_energy_value",
+    BATTERY_MODE: "battery_mode",
+    ATTR_STATUS: "status",
+    ATTR_MONEY_SAVED_IMPORT: "money_saved_import",
+    ATTR_MONEY_SAVED_EXPORT: "money_saved_export",
+    BATTERY_CYCLES: "battery_cycles",
+    BATTERY_DEGRADATION: "battery_degradation",
+    ATTR_LAST_CHARGE_EFFICIENCY: "last_charge_efficiency",
+    ATTR_LAST_DISCHARGE_EFFICIENCY: "last_discharge_efficiency",
+}
+
+
+class BatteryValues(MutableMapping):
+    """The live values of one battery, as slots and by sensor key."""
+
+    __slots__ = (*VALUE_SLOTS.values(), "simulated")
+
+    def __init__(
+        self,
+        simulated_sensors=(),
+        charge_efficiency: float | None = 1.0,
+        discharge_efficiency: float | None = 1.0,
+    ):
+        """Start every value at its reset value."""
+        self.simulated: dict[str, float | None] = dict.fromkeys(
+            simulated_sensors, 0.0
+        )
+        self.reset(charge_efficiency, discharge_efficiency)
+
+    def reset(
+        self,
+        charge_efficiency: float | None = 1.0,
+        discharge_efficiency: float | None = 1.0,
+    ) -> None:
+        """Reset every value but the simulated meter totals."""
+        self.energy_saved = 0.0
+        self.energy_battery_out = 0.0
+        self.energy_battery_in = 0.0
+        self.charging_rate = 0.0
+        self.discharging_rate = 0.0
+        self.solar_power_cap = 0.0
+        self.money_saved = 0.0
+        self.average_energy_value = 0.0
+        self.battery_mode = MODE_IDLE
+        self.status = DEFAULT_BATTERY_STATUS
+        self.money_saved_import = 0.0
+        self.money_saved_export = 0.0
+        self.battery_cycles = 0.0
+        self.battery_degradation = DEFAULT_BATTERY_DEGRADATION
+        self.last_charge_efficiency = charge_efficiency
+        self.last_discharge_efficiency = discharge_efficiency
+
+    def __getitem__(self, key):
+        slot = VALUE_SLOTS.get(key)
+        if slot is None:
+            return self.simulated[key]
+        return getattr(self, slot)
+
+    def __setitem__(self, key, value):
+        slot = VALUE_SLOTS.get(key)
+        if slot is None:
+            self.simulated[key] = value
+        else:
+            setattr(self, slot, value)
+
+    def __delitem__(self, key):
+        if key in VALUE_SLOTS:
+            raise KeyError(f"{key} is a fixed battery value")
+        del self.simulated[key]
+
+    def __contains__(self, key):
+        return key in VALUE_SLOTS or key in self.simulated
+
+    def __iter__(self) -> Iterator[str]:
+        yield from VALUE_SLOTS
+        yield from self.simulated
+
+    def __len__(self):
+        return len(VALUE_SLOTS) + len(self.simulated)
+
+    def items(self):
+        """Return (sensor key, value) pairs without a lookup per key."""
+        return [
+            *((key, getattr(self, slot)) for key, slot in VALUE_SLOTS.items()),
+            *self.simulated.items(),
+        ]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+def value_accessor(key: str) -> Callable[[BatteryValues], object]:
+    """Return a function reading the value of a sensor key from BatteryValues.
+
+    Values no battery has, such as a simulated meter it was not configured
+    with, read as None.
+    """
+    slot = VALUE_SLOTS.get(key)
+    if slot is not None:
+        return attrgetter(slot)
+    return lambda values: values.simulated.get(key)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Compare exact SoC clipping with the iterative clipping it replaced.
+
+Runs without Home Assistant. For efficiency curves of increasing size this
+reports the time of one tick's clipping, one charge plus one discharge clip,
+for the iterative loop the kernel used to run and for
+`EfficiencyCurve.clip_charge` / `clip_discharge`:
+
+* near full/empty: the headroom or available energy is smaller than the
+  amount, so every clip has to find where the curve crosses it;
+* not clipped: the amount fits, the case of most ticks;
+* error: the largest difference in kWh between the two clipped amounts, where
+  the loop stops early or overshoots on steep curves.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import pathlib
+import random
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from custom_components.battery_sim.helpers import (  # noqa: E402
+    MINIMUM_EFFICIENCY,
+    EfficiencyCurve,
+)
+
+# The interval and rates of a one-minute tick of a 5 kW battery.
+INTERVAL_HOURS = 1 / 60
+MAX_POWER = 5.0
+ITERATIONS = 10
+TOLERANCE = 0.000001
+
+
+def iterative_clip(curve, amount, interval_hours, capacity, charging):
+    """Clip an amount to the capacity the way the kernel did before."""
+    for _ in range(ITERATIONS):
+        efficiency = curve.efficiency_at(amount / interval_hours)
+        if charging:
+            limit = capacity / max(efficiency, MINIMUM_EFFICIENCY)
+        else:
+            limit = capacity * efficiency
+        clipped_amount = min(amount, limit)
+        if abs(clipped_amount - amount) < TOLERANCE:
+            break
+        amount = clipped_amount
+    return amount
+
+
+def exact_clip(curve, amount, interval_hours, capacity, charging):
+    """Clip an amount to the capacity with the exact per-segment solve."""
+    if charging:
+        return curve.clip_charge(amount, interval_hours, capacity)
+    return curve.clip_discharge(amount, interval_hours, capacity)
+
+
+def make_curve(points):
+    """Return a curve over 0 to MAX_POWER kW with a rise, a peak and a fall."""
+    return EfficiencyCurve(
+        [
+            (
+                MAX_POWER * index / (points - 1),
+                0.8 + 0.15 * math.sin(math.pi * index / (points - 1)),
+            )
+            for index in range(points)
+        ]
+    )
+
+
+def make_cases(count, clipped, seed=1):
+    """Return (charge amount, headroom, discharge amount, available) per tick."""
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        charge = rng.uniform(0.1, 1.0) * MAX_POWER * INTERVAL_HOURS
+        discharge = rng.uniform(0.1, 1.0) * MAX_POWER * INTERVAL_HOURS
+        if clipped:
+            headroom = rng.uniform(0.05, 0.7) * charge
+            available = rng.uniform(0.05, 0.9) * discharge
+        else:
+            headroom = available = 10.0
+        cases.append((charge, headroom, discharge, available))
+    return cases
+
+
+def per_tick(clip, curve, cases, rounds):
+    """Return the best time in seconds of one tick's clipping over `rounds`."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for charge, headroom, discharge, available in cases:
+            clip(curve, charge, INTERVAL_HOURS, headroom, True)
+            clip(curve, discharge, INTERVAL_HOURS, available, False)
+        best = min(best, time.perf_counter() - start)
+    return best / len(cases)
+
+
+def max_error(curve, cases):
+    """Return the largest difference in kWh between the two clips."""
+    error = 0.0
+    for charge, headroom, discharge, available in cases:
+        for amount, capacity, charging in (
+            (charge, headroom, True),
+            (discharge, available, False),
+        ):
+            error = max(
+                error,
+                abs(
+                    iterative_clip(curve, amount, INTERVAL_HOURS, capacity, charging)
+                    - exact_clip(curve, amount, INTERVAL_HOURS, capacity, charging)
+                ),
+            )
+    return error
+
+
+def main(point_counts, ticks, rounds):
+    clipped_cases = make_cases(ticks, clipped=True)
+    free_cases = make_cases(ticks, clipped=False)
+    print("per tick, us      near full/empty      not clipped")
+    print("points           iterative   exact   iterative   exact   error kWh")
+    for points in point_counts:
+        curve = make_curve(points)
+        print(
+            f"{points:>6}"
+            f"{1e6 * per_tick(iterative_clip, curve, clipped_cases, rounds):>18.2f}"
+            f"{1e6 * per_tick(exact_clip, curve, clipped_cases, rounds):>8.2f}"
+            f"{1e6 * per_tick(iterative_clip, curve, free_cases, rounds):>12.2f}"
+            f"{1e6 * per_tick(exact_clip, curve, free_cases, rounds):>8.2f}"
+            f"{max_error(curve, clipped_cases):>12.1e}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--points",
+        type=int,
+        nargs="+",
+        default=[2, 10, 40, 200, 1000],
+        help="points of the efficiency curves compared",
+    )
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="rounds timed, the best one is reported"
+    )
+    args = parser.parse_args()
+    main(args.points, args.ticks, args.rounds)
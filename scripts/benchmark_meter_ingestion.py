@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Measure meter events per second one battery can ingest.
+
+Needs the test requirements (pytest-homeassistant-custom-component). Two
+numbers are reported per meter unit:
+
+* handler: state change events fed straight into `async_reading_handler`,
+  the cost the integration adds per reading;
+* state machine: readings written with `hass.states.async_set`, including Home
+  Assistant's own event dispatch. With `--batteries N` every battery watches
+  the same meter, and the rate is also given as readings delivered per second.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT, CONF_NAME  # noqa: E402
+from homeassistant.core import Event, State  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    async_test_home_assistant,
+)
+
+from custom_components.battery_sim import SimulatedBatteryHandle  # noqa: E402
+from tests.common import IMPORT_SENSOR_ID, base_config  # noqa: E402
+
+UNITS = {"kWh": 0.001, "Wh": 1.0}
+
+
+def _handler_events(units, step, count):
+    """Return state change events of a steadily rising meter."""
+    # Home Assistant reuses the attributes object while attributes are unchanged.
+    attributes = State(IMPORT_SENSOR_ID, "0", {ATTR_UNIT_OF_MEASUREMENT: units}).attributes
+    states = [
+        State(IMPORT_SENSOR_ID, str(round(index * step, 6)), attributes)
+        for index in range(count + 1)
+    ]
+    return [
+        Event(
+            "state_changed",
+            {"entity_id": IMPORT_SENSOR_ID, "old_state": old, "new_state": new},
+        )
+        for old, new in zip(states, states[1:])
+    ]
+
+
+def bench_handler(handle, units, count, repeat):
+    """Return the best events/sec of the reading handler over `repeat` runs."""
+    events = _handler_events(units, UNITS[units], count)
+    handler = handle.async_reading_handler
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for event in events:
+            handler(event)
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+async def bench_state_machine(hass, units, count):
+    """Return events/sec for readings written through the state machine."""
+    attributes = {ATTR_UNIT_OF_MEASUREMENT: units}
+    step = UNITS[units]
+    hass.states.async_set(IMPORT_SENSOR_ID, "0", attributes)
+    await hass.async_block_till_done()
+    start = time.perf_counter()
+    for index in range(1, count + 1):
+        hass.states.async_set(IMPORT_SENSOR_ID, str(round(index * step, 6)), attributes)
+    await hass.async_block_till_done()
+    return count / (time.perf_counter() - start)
+
+
+async def main(count, repeat, batteries):
+    async with async_test_home_assistant() as hass:
+        handles = [
+            SimulatedBatteryHandle(base_config(**{CONF_NAME: f"Battery {index}"}), hass)
+            for index in range(batteries)
+        ]
+        handle = handles[0]
+        await hass.async_start()
+        await hass.async_block_till_done()
+        for units in UNITS:
+            hass.states.async_set(IMPORT_SENSOR_ID, "0", {ATTR_UNIT_OF_MEASUREMENT: units})
+            await hass.async_block_till_done()
+            handler_rate = bench_handler(handle, units, count, repeat)
+            bus_rate = await bench_state_machine(hass, units, count)
+            print(
+                f"{units:>3}: handler {handler_rate:>10,.0f} events/s, "
+                f"state machine {bus_rate:>9,.0f} events/s "
+                f"({bus_rate * batteries:,.0f} readings/s over {batteries} batteries)"
+            )
+        for battery in handles:
+            for unsub in battery._listeners:
+                unsub()
+        await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batteries", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.repeat, args.batteries))
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Measure how the integration scales with many batteries and busy meters.
+
+Needs the test requirements (pytest-homeassistant-custom-component). Sets up
+N battery config entries the way the test fixtures do, each watching one of
+the synthetic import/export meter pairs, then writes meter readings at a fixed
+rate in real time and reports:
+
+* setup: wall time to set up every config entry and its entities;
+* CPU: process CPU time spent per battery per second of steady state, which
+  includes Home Assistant's own event dispatch;
+* loop lag: percentiles of how late a short probe timer fires, the delay
+  every other task on the event loop sees;
+* writes: battery entity state writes and resulting state changes per second.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import pathlib
+import statistics
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from homeassistant.const import CONF_NAME, EVENT_STATE_CHANGED  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+from homeassistant import loader  # noqa: E402
+
+from custom_components.battery_sim.const import (  # noqa: E402
+    CONF_INPUT_LIST,
+    CONF_UPDATE_FREQUENCY,
+    DOMAIN,
+    SENSOR_ID,
+)
+from tests.common import KWH_ATTRIBUTES, base_config  # noqa: E402
+
+# How often the loop lag probe wakes up.
+PROBE_INTERVAL = 0.01
+LAG_PERCENTILES = (50, 90, 99)
+
+
+def meter_ids(index):
+    """Return the import and export meter entity ids of a meter pair."""
+    return f"sensor.scale_meter_import_{index}", f"sensor.scale_meter_export_{index}"
+
+
+def battery_config(index, meters, update_frequency):
+    """Return the config of the index-th battery, spread over the meter pairs."""
+    config = base_config(
+        **{CONF_NAME: f"Scale {index}", CONF_UPDATE_FREQUENCY: update_frequency}
+    )
+    import_id, export_id = meter_ids(index % meters)
+    config[CONF_INPUT_LIST][0][SENSOR_ID] = import_id
+    config[CONF_INPUT_LIST][1][SENSOR_ID] = export_id
+    return config
+
+
+async def drive_meters(hass, meters, rate, stop):
+    """Write rising meter readings, `rate` per second in total, until stopped."""
+    entity_ids = [entity_id for index in range(meters) for entity_id in meter_ids(index)]
+    readings = dict.fromkeys(entity_ids, 0.0)
+    written = 0
+    start = time.perf_counter()
+    while not stop.is_set():
+        due = int((time.perf_counter() - start) * rate)
+        while written < due:
+            entity_id = entity_ids[written % len(entity_ids)]
+            readings[entity_id] += 0.001
+            hass.states.async_set(entity_id, f"{readings[entity_id]:.3f}", KWH_ATTRIBUTES)
+            written += 1
+        await asyncio.sleep(PROBE_INTERVAL)
+    return written
+
+
+async def probe_loop_lag(stop):
+    """Return how late, in seconds, each short sleep woke up until stopped."""
+    lags = []
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(loop.time() - expected, 0.0))
+    return lags
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a list of values."""
+    ordered = sorted(values)
+    rank = max(round(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+async def main(batteries, meters, rate, duration, warmup, update_frequency):
+    async with async_test_home_assistant() as hass:
+        hass.data.pop(loader.DATA_CUSTOM_COMPONENTS)
+        await hass.async_start()
+        for index in range(meters):
+            for entity_id in meter_ids(index):
+                hass.states.async_set(entity_id, "0.000", KWH_ATTRIBUTES)
+
+        start = time.perf_counter()
+        entries = []
+        for index in range(batteries):
+            config = battery_config(index, meters, update_frequency)
+            entry = MockConfigEntry(domain=DOMAIN, data=config, title=config[CONF_NAME])
+            entry.add_to_hass(hass)
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            entries.append(entry)
+        await hass.async_block_till_done()
+        setup_seconds = time.perf_counter() - start
+
+        state_changes = 0
+
+        def count_state_change(event):
+            nonlocal state_changes
+            if not event.data["entity_id"].startswith("sensor.scale_meter_"):
+                state_changes += 1
+
+        unsub_state_changes = hass.bus.async_listen(EVENT_STATE_CHANGED, count_state_change)
+
+        stop = asyncio.Event()
+        driver = hass.async_create_task(drive_meters(hass, meters, rate, stop))
+        await asyncio.sleep(warmup)
+
+        handles = [hass.data[DOMAIN][entry.entry_id] for entry in entries]
+        writes = sum(handle._publisher.writes for handle in handles)
+        state_changes = 0
+        probe = hass.async_create_task(probe_loop_lag(stop))
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        await asyncio.sleep(duration)
+        stop.set()
+        events = await driver
+        lags = await probe
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = time.process_time() - cpu_start
+        writes = sum(handle._publisher.writes for handle in handles) - writes
+        unsub_state_changes()
+
+        print(
+            f"{batteries} batteries on {meters} meter pairs, "
+            f"{events / (wall_seconds + warmup):,.0f} meter events/s, "
+            f"{update_frequency}s update frequency"
+        )
+        print(
+            f"setup:     {setup_seconds:.3f} s "
+            f"({1000 * setup_seconds / batteries:.2f} ms per battery)"
+        )
+        print(
+            f"CPU:       {100 * cpu_seconds / wall_seconds:.1f}% of one core, "
+            f"{1000 * cpu_seconds / wall_seconds / batteries:.3f} ms per battery per second"
+        )
+        print(
+            "loop lag:  "
+            + ", ".join(
+                f"p{percent} {1000 * percentile(lags, percent):.2f} ms"
+                for percent in LAG_PERCENTILES
+            )
+            + f", max {1000 * max(lags):.2f} ms, mean {1000 * statistics.fmean(lags):.2f} ms"
+        )
+        print(
+            f"writes:    {writes / wall_seconds:,.1f} entity writes/s, "
+            f"{state_changes / wall_seconds:,.1f} battery state changes/s"
+        )
+
+        for entry in entries:
+            await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batteries", type=int, default=50)
+    parser.add_argument(
+        "--meters",
+        type=int,
+        default=None,
+        help="synthetic import/export meter pairs, default one per battery",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=200.0, help="meter events per second in total"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30.0, help="seconds of steady state measured"
+    )
+    parser.add_argument(
+        "--warmup", type=float, default=5.0, help="seconds driven before measuring"
+    )
+    parser.add_argument("--update-frequency", type=int, default=5)
+    args = parser.parse_args()
+    # Unloading every battery at the end logs a warning per listener.
+    logging.getLogger("custom_components.battery_sim").setLevel(logging.ERROR)
+    asyncio.run(
+        main(
+            args.batteries,
+            args.meters or args.batteries,
+            args.rate,
+            args.duration,
+            args.warmup,
+            args.update_frequency,
+        )
+    )
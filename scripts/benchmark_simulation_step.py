@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Time the simulation kernel step against a whole update_battery.
+
+Needs the test requirements (pytest-homeassistant-custom-component) for the
+handle. For every battery mode this reports:
+
+* step: time of one `simulation.step`, a pure function of the battery config,
+  controls and state, as replays and sweeps call it;
+* update_battery: time of one tick of a live handle, the same step plus
+  reading the controls, storing the state and the per-tick bookkeeping;
+* a year of one-minute steps: seconds to replay 525,600 ticks through the
+  kernel alone.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    async_test_home_assistant,
+)
+
+from custom_components.battery_sim import SimulatedBatteryHandle  # noqa: E402
+from custom_components.battery_sim.const import (  # noqa: E402
+    CHARGE_ONLY,
+    CONF_BATTERY_CHARGE_EFFICIENCY,
+    DEFAULT_MODE,
+    FORCE_DISCHARGE,
+    PAUSE_BATTERY,
+)
+from custom_components.battery_sim.simulation import (  # noqa: E402
+    BatteryConfig,
+    BatteryControls,
+    BatteryState,
+    step,
+)
+from tests.common import (  # noqa: E402
+    EXPORT_TARIFF,
+    IMPORT_TARIFF,
+    config_with_fixed_tariffs,
+    link_meter_readings,
+)
+
+MODES = (DEFAULT_MODE, CHARGE_ONLY, FORCE_DISCHARGE, PAUSE_BATTERY)
+MINUTES_PER_YEAR = 525600
+# Alternating import and export, so the battery both charges and discharges.
+FLOWS = ((0.05, 0.0), (0.0, 0.08))
+
+
+def battery_config():
+    """Return the benchmark battery config, with a five point charge curve."""
+    return config_with_fixed_tariffs(
+        **{CONF_BATTERY_CHARGE_EFFICIENCY: "0:0.8, 1:0.85, 2:0.9, 3:0.92, 4:0.9"}
+    )
+
+
+def time_steps(config, controls, ticks):
+    """Return the seconds `ticks` kernel steps of one minute take."""
+    state = BatteryState(charge_state=config.battery_size / 2)
+    start = time.perf_counter()
+    for tick in range(ticks):
+        import_amount, export_amount = FLOWS[tick & 1]
+        state, _outputs = step(
+            config,
+            controls,
+            state,
+            import_amount,
+            export_amount,
+            0.0,
+            60,
+            IMPORT_TARIFF,
+            EXPORT_TARIFF,
+        )
+    return time.perf_counter() - start
+
+
+def best_step(config, controls, ticks, rounds):
+    """Return the best time per kernel step over `rounds`."""
+    return min(time_steps(config, controls, ticks) for _ in range(rounds)) / ticks
+
+
+async def best_updates(mode, ticks, rounds):
+    """Return the best time per update_battery of a live handle over `rounds`."""
+    async with async_test_home_assistant() as hass:
+        handle = SimulatedBatteryHandle(battery_config(), hass)
+        link_meter_readings(handle)
+        if mode == PAUSE_BATTERY:
+            handle._switches[PAUSE_BATTERY] = True
+        else:
+            handle._battery_mode = mode
+        clock = handle._last_battery_update_time
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for tick in range(ticks):
+                clock += 60
+                import_amount, export_amount = FLOWS[tick & 1]
+                handle.update_battery(import_amount, export_amount, time_now=clock)
+            best = min(best, time.perf_counter() - start)
+        for listener in handle._listeners:
+            listener()
+        await hass.async_stop(force=True)
+    return best / ticks
+
+
+def main(ticks, rounds):
+    config = BatteryConfig.from_config(battery_config())
+    for mode in MODES:
+        if mode == PAUSE_BATTERY:
+            controls = BatteryControls(paused=True)
+        else:
+            controls = BatteryControls(mode=mode)
+        step_time = best_step(config, controls, ticks, rounds)
+        update_time = asyncio.run(best_updates(mode, ticks, rounds))
+        print(
+            f"{mode:>15}: step {1e6 * step_time:5.2f} us, "
+            f"update_battery {1e6 * update_time:6.2f} us "
+            f"({update_time / step_time:.1f}x)"
+        )
+
+    year = time_steps(config, BatteryControls(), MINUTES_PER_YEAR)
+    print(f"a year of one-minute steps: {year:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="rounds timed, the best one is reported"
+    )
+    args = parser.parse_args()
+    main(args.ticks, args.rounds)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Compare the slotted battery values with the string-keyed dict they replaced.
+
+Needs the test requirements (pytest-homeassistant-custom-component) for the
+full tick. For N batteries this reports:
+
+* memory: bytes allocated for the live values of every battery, measured with
+  tracemalloc, for BatteryValues and for the dict with the same keys and
+  values that handles used to keep;
+* value access: time per battery for the reads and writes one tick makes,
+  through the slots as the handle does now, and through the dict keys;
+* tick: time per battery for a whole `update_battery`, simulation included,
+  over N real handles.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import pathlib
+import sys
+import time
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from homeassistant.const import CONF_NAME  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    async_test_home_assistant,
+)
+
+from custom_components.battery_sim import SimulatedBatteryHandle  # noqa: E402
+from custom_components.battery_sim.const import (  # noqa: E402
+    ATTR_AVERAGE_ENERGY_VALUE,
+    ATTR_ENERGY_BATTERY_IN,
+    ATTR_ENERGY_BATTERY_OUT,
+    ATTR_ENERGY_SAVED,
+    ATTR_LAST_CHARGE_EFFICIENCY,
+    ATTR_LAST_DISCHARGE_EFFICIENCY,
+    ATTR_MONEY_SAVED,
+    ATTR_MONEY_SAVED_EXPORT,
+    ATTR_MONEY_SAVED_IMPORT,
+    ATTR_STATUS,
+    BATTERY_CYCLES,
+    BATTERY_DEGRADATION,
+    BATTERY_MODE,
+    CHARGING_RATE,
+    DISCHARGING_RATE,
+    GRID_EXPORT_SIM,
+    GRID_IMPORT_SIM,
+    SOLAR_POWER_CAP,
+)
+from custom_components.battery_sim.values import BatteryValues  # noqa: E402
+from tests.common import base_config, link_meter_readings  # noqa: E402
+
+SIMULATED_SENSORS = (GRID_IMPORT_SIM, GRID_EXPORT_SIM)
+
+
+def legacy_values():
+    """Return the dict a handle kept its values in before BatteryValues."""
+    values = dict(BatteryValues(SIMULATED_SENSORS, 0.9, 0.9).items())
+    # Every value a distinct float, as after a few ticks.
+    for index, key in enumerate(values):
+        if isinstance(values[key], float):
+            values[key] = index + 0.5
+    return values
+
+
+def slotted_values():
+    """Return BatteryValues holding the same values as legacy_values()."""
+    values = BatteryValues(SIMULATED_SENSORS, 0.9, 0.9)
+    for key, value in legacy_values().items():
+        values[key] = value
+    return values
+
+
+def allocated(factory, count):
+    """Return the bytes allocated by `count` calls of `factory`, kept alive."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def tick_dict(values):
+    """Read and write the values of one tick by sensor key, as handles did."""
+    cycles = float(values[BATTERY_CYCLES])
+    values[ATTR_ENERGY_SAVED] = values[ATTR_ENERGY_SAVED] + 0.001
+    values[ATTR_ENERGY_BATTERY_IN] = values[ATTR_ENERGY_BATTERY_IN] + 0.001
+    values[ATTR_ENERGY_BATTERY_OUT] = values[ATTR_ENERGY_BATTERY_OUT] + 0.001
+    values[ATTR_MONEY_SAVED_IMPORT] = values[ATTR_MONEY_SAVED_IMPORT] + 0.001
+    values[ATTR_MONEY_SAVED_EXPORT] = values[ATTR_MONEY_SAVED_EXPORT] + 0.001
+    values[ATTR_MONEY_SAVED] = (
+        values[ATTR_MONEY_SAVED_IMPORT] + values[ATTR_MONEY_SAVED_EXPORT]
+    )
+    values[BATTERY_CYCLES] = cycles + 0.0001
+    values[BATTERY_DEGRADATION] = 0.99
+    values[ATTR_AVERAGE_ENERGY_VALUE] = 0.2
+    values[ATTR_LAST_CHARGE_EFFICIENCY] = 0.9
+    values[ATTR_LAST_DISCHARGE_EFFICIENCY] = 0.9
+    values[CHARGING_RATE] = 1.0
+    values[DISCHARGING_RATE] = 0.0
+    values[SOLAR_POWER_CAP] = 0.0
+    values[BATTERY_MODE] = "charging"
+    values[ATTR_STATUS] = "Normal"
+    values[GRID_IMPORT_SIM] += 0.001
+
+
+def tick_slots(values):
+    """Read and write the values of one tick through the slots."""
+    cycles = values.battery_cycles
+    values.energy_saved = values.energy_saved + 0.001
+    values.energy_battery_in = values.energy_battery_in + 0.001
+    values.energy_battery_out = values.energy_battery_out + 0.001
+    values.money_saved_import = values.money_saved_import + 0.001
+    values.money_saved_export = values.money_saved_export + 0.001
+    values.money_saved = values.money_saved_import + values.money_saved_export
+    values.battery_cycles = cycles + 0.0001
+    values.battery_degradation = 0.99
+    values.average_energy_value = 0.2
+    values.last_charge_efficiency = 0.9
+    values.last_discharge_efficiency = 0.9
+    values.charging_rate = 1.0
+    values.discharging_rate = 0.0
+    values.solar_power_cap = 0.0
+    values.battery_mode = "charging"
+    values.status = "Normal"
+    values.simulated[GRID_IMPORT_SIM] += 0.001
+
+
+def per_battery(function, stores, rounds):
+    """Return the best time in seconds of `function` per store over `rounds`."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for values in stores:
+            function(values)
+        best = min(best, time.perf_counter() - start)
+    return best / len(stores)
+
+
+async def time_ticks(batteries, rounds):
+    """Return the best time per battery of one update_battery over real handles."""
+    async with async_test_home_assistant() as hass:
+        handles = []
+        for index in range(batteries):
+            handle = SimulatedBatteryHandle(
+                base_config(**{CONF_NAME: f"State {index}"}), hass
+            )
+            link_meter_readings(handle)
+            handles.append(handle)
+        clock = handles[0]._last_battery_update_time
+        best = float("inf")
+        for round_index in range(rounds):
+            clock += 60
+            import_amount, export_amount = (
+                (0.05, 0.0) if round_index % 2 else (0.0, 0.08)
+            )
+            start = time.perf_counter()
+            for handle in handles:
+                handle.update_battery(import_amount, export_amount, time_now=clock)
+            best = min(best, time.perf_counter() - start)
+        for handle in handles:
+            for listener in handle._listeners:
+                listener()
+        await hass.async_stop(force=True)
+    return best / batteries
+
+
+def main(batteries, rounds):
+    dict_bytes = allocated(legacy_values, batteries)
+    slot_bytes = allocated(slotted_values, batteries)
+    print(f"{batteries} batteries")
+    print(
+        f"memory:       dict {dict_bytes / batteries:,.0f} B, "
+        f"slots {slot_bytes / batteries:,.0f} B per battery "
+        f"({100 * (1 - slot_bytes / dict_bytes):.0f}% less)"
+    )
+
+    dict_time = per_battery(tick_dict, [legacy_values() for _ in range(batteries)], rounds)
+    slot_time = per_battery(
+        tick_slots, [slotted_values() for _ in range(batteries)], rounds
+    )
+    print(
+        f"value access: dict {1e6 * dict_time:.2f} us, "
+        f"slots {1e6 * slot_time:.2f} us per battery per tick "
+        f"({dict_time / slot_time:.1f}x)"
+    )
+
+    tick_time = asyncio.run(time_ticks(batteries, rounds))
+    print(f"tick:         {1e6 * tick_time:.1f} us per battery per update_battery")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batteries", type=int, default=500)
+    parser.add_argument(
+        "--rounds", type=int, default=20, help="rounds timed, the best one is reported"
+    )
+    args = parser.parse_args()
+    main(args.batteries, args.rounds)
@@ -63,6 +63,7 @@ def collect_used_paths() -> set[tuple[str, ...]]:
         ("config", "abort", "already_configured"),
         ("config", "flow_title"),
         ("config", "error", "invalid_input"),
+        ("options", "error", "invalid_input"),
     }
 
     src = CONFIG_FLOW.read_text(encoding="utf-8")
@@ -103,7 +104,13 @@ def collect_used_paths() -> set[tuple[str, ...]]:
     for opt in ("no_tariff_info", "fixed_tariff", "tariff_sensor"):
         used.add(("config", "step", "tariff_menu", "menu_options", opt))
         used.add(("options", "step", "tariff_menu", "menu_options", opt))
-    for opt in ("main_params", "input_sensors", "delete_leftover_entities", "all_done"):
+    for opt in (
+        "main_params",
+        "input_sensors",
+        "shadow_scenarios",
+        "delete_leftover_entities",
+        "all_done",
+    ):
         used.add(("options", "step", "init", "menu_options", opt))
     for opt in ("add_import_meter", "add_export_meter", "edit_input_tariff", "delete_input"):
         used.add(("options", "step", "input_sensors", "menu_options", opt))
@@ -128,7 +135,12 @@ def collect_used_paths() -> set[tuple[str, ...]]:
         ("config", "add_export_meter"): ["SENSOR_ID"],
         ("config", "fixed_tariff"): ["FIXED_TARIFF"],
         ("config", "tariff_sensor"): ["TARIFF_SENSOR"],
-        ("options", "main_params"): common_battery_fields,
+        ("options", "main_params"): [
+            *common_battery_fields,
+            "CONF_DEGRADATION_CURVE",
+            "CONF_TICK_JOURNAL",
+        ],
+        ("options", "shadow_scenarios"): ["CONF_SHADOW_SCENARIOS"],
         ("options", "add_import_meter"): ["SENSOR_ID"],
         ("options", "add_export_meter"): ["SENSOR_ID"],
         ("options", "fixed_tariff"): ["FIXED_TARIFF"],
@@ -145,6 +157,9 @@ def collect_used_paths() -> set[tuple[str, ...]]:
         "set_battery_charge_state": ("device_id", "charge_state"),
         "set_battery_cycles": ("device_id", "battery_cycles"),
         "get_efficiency": ("device_id", "efficiency_type", "power_level"),
+        "get_scenario_results": ("device_id",),
+        "get_recent_ticks": ("device_id", "count"),
+        "backfill_statistics": ("device_id", "start", "end", "source"),
         "set_stored_energy_value": ("device_id", "stored_energy_value"),
     }
     for svc, fields in services.items():
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Replay recorded meter history over a grid of battery settings, or search it.
+
+The battery is described by a JSON file holding a battery config entry's data,
+as shown in the device diagnostics. The history is a CSV file with a header
+row and the columns `timestamp` (POSIX seconds or ISO 8601), `import` and
+`export` (kWh that flowed since the previous row), and optionally `solar`,
+`import_tariff` and `export_tariff`. Empty tariff cells fall back to the
+fixed tariffs of the config.
+
+Grid mode replays every combination on all CPU cores and prints one row per
+point:
+
+    sweep_battery.py battery.json history.csv \\
+        --grid size_kwh 5 10 15 --grid max_charge_rate_kw 2.5 5
+
+Search mode finds the best value of continuous settings, for example the
+battery size that saves the most after paying for its capacity:
+
+    sweep_battery.py battery.json history.csv \\
+        --search size_kwh 1 30 --cost-per-kwh 4.5
+
+Instead of a CSV file, the history can be read straight from a copy of the
+Home Assistant recorder database, from every recorded state or from the
+hourly long-term statistics, which are kept after states are purged:
+
+    sweep_battery.py battery.json --recorder-db home-assistant_v2.db \
+        --start 2026-01-01 --end 2026-07-01 --statistics --grid size_kwh 5 10
+
+`maximum_soc` sets the maximum SoC slider in percent; any other key
+overrides the config value of the same name.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+from datetime import datetime
+import json
+import pathlib
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from custom_components.battery_sim.const import CONF_BATTERY_SIZE  # noqa: E402
+from custom_components.battery_sim.recorder_history import (  # noqa: E402
+    STATES,
+    STATISTICS,
+    RecorderHistory,
+)
+from custom_components.battery_sim.replay import ReplaySample  # noqa: E402
+from custom_components.battery_sim.sweep import (  # noqa: E402
+    grid_points,
+    money_saved,
+    net_savings,
+    optimize,
+    sweep,
+)
+
+COLUMNS = ("money_saved", "energy_saved", "battery_cycles", "grid_import", "grid_export")
+
+
+def parse_value(text):
+    """Return a number when the text is one, else the text, e.g. a curve."""
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def parse_timestamp(text):
+    """Return POSIX seconds from a number or an ISO 8601 timestamp."""
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def optional_float(row, column):
+    value = row.get(column)
+    return float(value) if value not in (None, "") else None
+
+
+def read_samples(path):
+    """Return the replay samples of a history CSV file."""
+    with open(path, newline="", encoding="utf-8") as history:
+        return [
+            ReplaySample(
+                parse_timestamp(row["timestamp"]),
+                float(row["import"]),
+                float(row["export"]),
+                optional_float(row, "solar") or 0.0,
+                optional_float(row, "import_tariff"),
+                optional_float(row, "export_tariff"),
+            )
+            for row in csv.DictReader(history)
+        ]
+
+
+def print_points(points):
+    keys = list(points[0].settings)
+    print("\t".join([*keys, *COLUMNS]))
+    for point in points:
+        print(
+            "\t".join(
+                [str(point.settings[key]) for key in keys]
+                + [f"{getattr(point.result, column):.3f}" for column in COLUMNS]
+            )
+        )
+
+
+def main(args):
+    config = json.loads(pathlib.Path(args.config).read_text(encoding="utf-8"))
+    start_time = None
+    if args.recorder_db:
+        start_time = parse_timestamp(args.start)
+        samples = list(
+            RecorderHistory(
+                args.recorder_db,
+                config,
+                start_time,
+                parse_timestamp(args.end),
+                STATISTICS if args.statistics else STATES,
+            ).samples()
+        )
+    else:
+        samples = read_samples(args.history)
+    start = time.perf_counter()
+    if args.search:
+        objective = (
+            net_savings(args.cost_per_kwh, CONF_BATTERY_SIZE)
+            if args.cost_per_kwh
+            else money_saved
+        )
+        found = optimize(
+            config,
+            samples,
+            {key: (float(low), float(high)) for key, low, high in args.search},
+            objective,
+            fixed={key: parse_value(values[0]) for key, *values in args.grid or []},
+            start_time=start_time,
+            max_workers=args.workers,
+        )
+        print_points([found])
+        print(f"objective {found.objective:.3f} after {found.replays} replays")
+    else:
+        points = sweep(
+            config,
+            samples,
+            grid_points(
+                {key: [parse_value(value) for value in values] for key, *values in args.grid}
+            ),
+            start_time,
+            max_workers=args.workers,
+        )
+        print_points(points)
+    print(
+        f"{len(samples)} samples replayed in {time.perf_counter() - start:.2f} s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.splitlines()[2:]),
+    )
+    parser.add_argument("config", help="battery config as JSON")
+    parser.add_argument("history", nargs="?", help="meter history as CSV")
+    parser.add_argument(
+        "--recorder-db", help="read the history from a recorder SQLite database"
+    )
+    parser.add_argument("--start", help="start of the recorded history to replay")
+    parser.add_argument("--end", help="end of the recorded history to replay")
+    parser.add_argument(
+        "--statistics",
+        action="store_true",
+        help="replay the hourly long-term statistics instead of every state",
+    )
+    parser.add_argument(
+        "--grid",
+        nargs="+",
+        action="append",
+        metavar=("KEY", "VALUE"),
+        help="setting and the values to replay; fixed values in search mode",
+    )
+    parser.add_argument(
+        "--search",
+        nargs=3,
+        action="append",
+        metavar=("KEY", "LOW", "HIGH"),
+        help="continuous setting to search between two bounds",
+    )
+    parser.add_argument(
+        "--cost-per-kwh",
+        type=float,
+        default=0.0,
+        help="battery cost per kWh of size over the history, subtracted in search mode",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="processes, default one per CPU"
+    )
+    args = parser.parse_args()
+    if not args.grid and not args.search:
+        parser.error("give at least one --grid or --search setting")
+    if args.recorder_db is None and args.history is None:
+        parser.error("give a history CSV file or --recorder-db")
+    if args.recorder_db is not None and (args.start is None or args.end is None):
+        parser.error("--recorder-db needs --start and --end")
+    main(args)
@@ -0,0 +1,8 @@
+"""Performance benchmarks for the battery_sim hot paths.
+
+A plain `pytest` run does not collect this directory. Run the benchmarks with
+`pytest tests/benchmarks`; the run is compared against the baseline saved in
+`baselines/` for this platform and fails when a benchmark's fastest round slows down
+by more than the threshold set in `conftest.py`. Record a new baseline with
+`pytest tests/benchmarks --benchmark-save=baseline`.
+"""
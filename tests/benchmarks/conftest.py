@@ -0,0 +1,59 @@
+"""Fixtures and defaults for the battery_sim benchmarks."""
+from pathlib import Path
+
+import pytest
+from pytest_benchmark.utils import get_machine_id, parse_compare_fail
+
+from custom_components.battery_sim import SimulatedBatteryHandle
+
+from ..common import base_config
+from ..conftest import release_handle
+
+DEFAULT_STORAGE = "file://./.benchmarks"
+BASELINE_STORAGE = Path(__file__).parent / "baselines"
+# Slowdown of the fastest round, against the saved baseline, that fails the run.
+REGRESSION_THRESHOLD = "min:25%"
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    """Compare against the saved baseline unless a new one is being saved.
+
+    Explicit --benchmark-storage, --benchmark-compare and
+    --benchmark-compare-fail options take precedence over these defaults.
+    """
+    option = config.option
+    if option.benchmark_storage == DEFAULT_STORAGE:
+        option.benchmark_storage = f"file://{BASELINE_STORAGE}"
+    if (
+        option.benchmark_save
+        or option.benchmark_autosave
+        or option.benchmark_compare
+        or option.benchmark_disable
+        or option.benchmark_skip
+        or not any(BASELINE_STORAGE.joinpath(get_machine_id()).glob("*.json"))
+    ):
+        return
+    option.benchmark_compare = True
+    if not option.benchmark_compare_fail:
+        option.benchmark_compare_fail = [parse_compare_fail(REGRESSION_THRESHOLD)]
+
+
+@pytest.fixture
+def bench_handle(hass):
+    """Return a factory creating battery handles on the real clock.
+
+    The `make_handle` fixture freezes time, which stops the benchmark timer
+    from ever reaching its calibration time.
+    """
+    handles = []
+
+    def _make(config=None):
+        handle = SimulatedBatteryHandle(config or base_config(), hass)
+        handles.append(handle)
+        return handle
+
+    yield _make
+
+    for handle in handles:
+        release_handle(handle)
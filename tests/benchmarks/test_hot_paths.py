@@ -0,0 +1,131 @@
+"""Benchmarks for the per-tick and per-reading code paths."""
+from itertools import cycle
+
+import pytest
+
+from homeassistant.core import Event, State
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+
+from custom_components.battery_sim.const import (
+    CHARGE_ONLY,
+    CONF_BATTERY_CHARGE_EFFICIENCY,
+    DEFAULT_MODE,
+    FORCE_DISCHARGE,
+    MESSAGE_TYPE_BATTERY_UPDATE,
+    PAUSE_BATTERY,
+)
+from custom_components.battery_sim.helpers import (
+    EfficiencyCurve,
+    interpolate_efficiency,
+    parse_efficiency_curve,
+)
+
+from ..common import (
+    BATTERY_NAME,
+    IMPORT_SENSOR_ID,
+    KWH_ATTRIBUTES,
+    config_with_fixed_tariffs,
+    link_meter_readings,
+)
+
+# Events fed to the reading handler per benchmark round.
+READINGS_PER_ROUND = 1000
+
+
+def _curve(points):
+    """Return a raw efficiency curve string with `points` rising power points."""
+    if points == 1:
+        return "0.9"
+    return ", ".join(
+        f"{index * 10 / (points - 1):.4f}:{0.80 + 0.15 * index / (points - 1):.4f}"
+        for index in range(points)
+    )
+
+
+@pytest.mark.parametrize(
+    "mode", [DEFAULT_MODE, CHARGE_ONLY, FORCE_DISCHARGE, PAUSE_BATTERY]
+)
+def test_update_battery(benchmark, bench_handle, mode):
+    handle = bench_handle(
+        config_with_fixed_tariffs(**{CONF_BATTERY_CHARGE_EFFICIENCY: _curve(5)})
+    )
+    link_meter_readings(handle)
+    if mode == PAUSE_BATTERY:
+        handle._switches[PAUSE_BATTERY] = True
+    else:
+        handle._battery_mode = mode
+    # Alternate importing and exporting minutes so the battery keeps cycling.
+    flows = cycle([(0.05, 0.0), (0.0, 0.08)])
+    clock = [handle._last_battery_update_time]
+
+    def tick():
+        import_amount, export_amount = next(flows)
+        clock[0] += 60
+        handle.update_battery(import_amount, export_amount, time_now=clock[0])
+
+    benchmark.group = f"tick-{mode}"
+    benchmark(tick)
+
+
+def test_reading_handler(benchmark, bench_handle):
+    handle = bench_handle()
+    attributes = State(IMPORT_SENSOR_ID, "0", KWH_ATTRIBUTES).attributes
+    states = [
+        State(IMPORT_SENSOR_ID, f"{index * 0.001:.3f}", attributes)
+        for index in range(READINGS_PER_ROUND + 1)
+    ]
+    events = [
+        Event(
+            "state_changed",
+            {"entity_id": IMPORT_SENSOR_ID, "old_state": old, "new_state": new},
+        )
+        for old, new in zip(states, states[1:])
+    ]
+    handler = handle.async_reading_handler
+
+    def read_all():
+        for event in events:
+            handler(event)
+
+    benchmark(read_all)
+    benchmark.extra_info["events_per_round"] = READINGS_PER_ROUND
+
+
+@pytest.mark.parametrize("points", [1, 5, 50])
+def test_interpolate_efficiency(benchmark, points):
+    curve = parse_efficiency_curve(_curve(points))
+    powers = [index * 0.37 % 11 for index in range(100)]
+
+    def interpolate_all():
+        for power in powers:
+            interpolate_efficiency(curve, power)
+
+    benchmark(interpolate_all)
+
+
+@pytest.mark.parametrize("points", [1, 5, 50])
+def test_parse_efficiency_curve(benchmark, points):
+    raw = _curve(points)
+    parse_efficiency_curve(raw)
+
+    benchmark(parse_efficiency_curve, raw)
+
+
+@pytest.mark.parametrize("points", [1, 5, 50])
+def test_compile_efficiency_curve(benchmark, points):
+    points = parse_efficiency_curve(_curve(points)).points
+
+    benchmark(EfficiencyCurve, points)
+
+
+@pytest.mark.parametrize("changed", [True, False], ids=["changed", "unchanged"])
+async def test_dispatcher_fan_out(benchmark, hass, setup_battery, changed):
+    _entry, handle = await setup_battery(config_with_fixed_tariffs())
+    signal = f"{BATTERY_NAME}-{MESSAGE_TYPE_BATTERY_UPDATE}"
+    charge_states = cycle([4.0, 6.0] if changed else [5.0])
+
+    def publish():
+        handle._charge_state = next(charge_states)
+        async_dispatcher_send(hass, signal)
+
+    benchmark(publish)
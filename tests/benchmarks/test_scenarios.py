@@ -0,0 +1,78 @@
+"""Benchmarks of the vectorized scenario bank against one kernel per scenario.
+
+A bank tick should cost about the same for 1 and 100 scenarios, while the
+kernel loop grows linearly with them.
+"""
+from itertools import cycle
+
+import pytest
+
+from custom_components.battery_sim import simulation
+from custom_components.battery_sim.const import (
+    CONF_BATTERY_CHARGE_EFFICIENCY,
+    CONF_BATTERY_SIZE,
+    CONF_SHADOW_SCENARIOS,
+)
+from custom_components.battery_sim.scenarios import ScenarioBank
+from custom_components.battery_sim.simulation import BatteryControls, BatteryState
+
+from ..common import EXPORT_TARIFF, IMPORT_TARIFF, config_with_fixed_tariffs
+from .test_hot_paths import _curve
+
+
+def _scenario_config(scenarios):
+    """Return a battery config with `scenarios` sizes from 2 kWh upwards."""
+    return config_with_fixed_tariffs(
+        **{
+            CONF_BATTERY_CHARGE_EFFICIENCY: _curve(5),
+            CONF_SHADOW_SCENARIOS: [
+                {CONF_BATTERY_SIZE: 2.0 + index * 0.1} for index in range(scenarios)
+            ],
+        }
+    )
+
+
+@pytest.mark.parametrize("scenarios", [1, 10, 100])
+def test_scenario_bank_step(benchmark, scenarios):
+    bank = ScenarioBank.from_config(_scenario_config(scenarios))
+    flows = cycle([(0.05, 0.0), (0.0, 0.08)])
+
+    def tick():
+        import_amount, export_amount = next(flows)
+        bank.step(import_amount, export_amount, 0.0, 60, IMPORT_TARIFF, EXPORT_TARIFF)
+
+    benchmark.group = f"scenarios-{scenarios}"
+    benchmark(tick)
+
+
+@pytest.mark.parametrize("scenarios", [1, 10, 100])
+def test_kernel_per_scenario(benchmark, scenarios):
+    bank = ScenarioBank.from_config(_scenario_config(scenarios))
+    configs = bank.configs
+    controls = [
+        BatteryControls(
+            charge_limit=config.max_charge_rate,
+            discharge_limit=config.max_discharge_rate,
+        )
+        for config in configs
+    ]
+    states = [BatteryState(charge_state=config.battery_size / 2) for config in configs]
+    flows = cycle([(0.05, 0.0), (0.0, 0.08)])
+
+    def tick():
+        import_amount, export_amount = next(flows)
+        for index, config in enumerate(configs):
+            states[index], _outputs = simulation.step(
+                config,
+                controls[index],
+                states[index],
+                import_amount,
+                export_amount,
+                0.0,
+                60,
+                IMPORT_TARIFF,
+                EXPORT_TARIFF,
+            )
+
+    benchmark.group = f"scenarios-{scenarios}"
+    benchmark(tick)
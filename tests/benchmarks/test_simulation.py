@@ -0,0 +1,75 @@
+"""Benchmarks of the simulation kernel against the live handle update.
+
+Each kernel benchmark shares a group with the matching `update_battery`
+benchmark in test_hot_paths.py, so the report puts the two side by side.
+"""
+from itertools import cycle
+
+import pytest
+
+from custom_components.battery_sim import simulation
+from custom_components.battery_sim.const import (
+    CHARGE_ONLY,
+    CONF_BATTERY_CHARGE_EFFICIENCY,
+    CONF_DEGRADATION_CURVE,
+    DEFAULT_MODE,
+    FORCE_DISCHARGE,
+    PAUSE_BATTERY,
+)
+from custom_components.battery_sim.simulation import (
+    BatteryConfig,
+    BatteryControls,
+    BatteryState,
+)
+
+from ..common import EXPORT_TARIFF, IMPORT_TARIFF, config_with_fixed_tariffs
+from .test_hot_paths import _curve
+
+
+@pytest.mark.parametrize(
+    "mode", [DEFAULT_MODE, CHARGE_ONLY, FORCE_DISCHARGE, PAUSE_BATTERY]
+)
+def test_simulation_step(benchmark, mode):
+    config = BatteryConfig.from_config(
+        config_with_fixed_tariffs(**{CONF_BATTERY_CHARGE_EFFICIENCY: _curve(5)})
+    )
+    if mode == PAUSE_BATTERY:
+        controls = BatteryControls(paused=True)
+    else:
+        controls = BatteryControls(mode=mode)
+    flows = cycle([(0.05, 0.0), (0.0, 0.08)])
+    state = [BatteryState(charge_state=config.battery_size / 2)]
+
+    def tick():
+        import_amount, export_amount = next(flows)
+        state[0], _outputs = simulation.step(
+            config,
+            controls,
+            state[0],
+            import_amount,
+            export_amount,
+            0.0,
+            60,
+            IMPORT_TARIFF,
+            EXPORT_TARIFF,
+        )
+
+    benchmark.group = f"tick-{mode}"
+    benchmark(tick)
+
+
+@pytest.mark.parametrize("points", [0, 3, 50, 1000], ids=lambda points: f"{points}pt")
+def test_degradation_factor(benchmark, points):
+    overrides = {}
+    if points:
+        overrides[CONF_DEGRADATION_CURVE] = ", ".join(
+            f"{index * 10}:{1.0 - index * 0.2 / points:.6f}" for index in range(points)
+        )
+    config = BatteryConfig.from_config(config_with_fixed_tariffs(**overrides))
+    cycles = cycle([index * 7.3 for index in range(1500)])
+
+    def lookup():
+        simulation.degradation_factor(config, next(cycles))
+
+    benchmark.group = "degradation"
+    benchmark(lookup)
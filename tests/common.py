@@ -3,6 +3,7 @@ from copy import deepcopy
 
 import homeassistant.util.dt as dt_util
 from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT, CONF_NAME, UnitOfEnergy
+from homeassistant.helpers import device_registry as dr
 
 from custom_components.battery_sim.const import (
     CONF_BATTERY_CHARGE_EFFICIENCY,
@@ -18,6 +19,7 @@ from custom_components.battery_sim.const import (
     CONF_SOLAR_ENERGY_SENSOR,
     CONF_UPDATE_FREQUENCY,
     CONFIG_FLOW,
+    DOMAIN,
     EXPORT,
     FIXED_TARIFF,
     GRID_EXPORT_SIM,
@@ -158,3 +160,13 @@ def link_meter_readings(handle):
     """Mark the import/export inputs as the most recently read meters."""
     handle._last_import_reading_sensor_data = handle._inputs[0]
     handle._last_export_reading_sensor_data = handle._inputs[1]
+
+
+def get_battery_device(hass, entry):
+    """Return the device registry entry created for a battery config entry."""
+    device_registry = dr.async_get(hass)
+    device = device_registry.async_get_device_by_identifier(
+        (DOMAIN, entry.entry_id), entry.entry_id
+    )
+    assert device is not None
+    return device
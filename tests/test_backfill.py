@@ -0,0 +1,135 @@
+"""Tests for backfilling simulated totals into long-term statistics."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from custom_components.battery_sim.backfill import (
+    HourlyTotals,
+    statistic_id,
+)
+from custom_components.battery_sim.const import (
+    ATTR_ENERGY_SAVED,
+    ATTR_MONEY_SAVED,
+    DOMAIN,
+    GRID_EXPORT_SIM,
+    GRID_IMPORT_SIM,
+)
+from custom_components.battery_sim.replay import ReplaySample
+from custom_components.battery_sim.simulation import BatteryState
+
+from .common import (
+    BATTERY_NAME,
+    EXPORT_SENSOR_ID,
+    IMPORT_SENSOR_ID,
+    KWH_ATTRIBUTES,
+    config_with_fixed_tariffs,
+    get_battery_device,
+)
+
+START = datetime(2026, 1, 5, 10, tzinfo=timezone.utc)
+
+
+def test_statistic_ids_are_external():
+    assert statistic_id("My Battery", GRID_IMPORT_SIM) == (
+        "battery_sim:my_battery_simulated_grid_import_after_battery_discharging"
+    )
+
+
+def test_hourly_totals_close_each_hour_with_its_last_tick():
+    totals = HourlyTotals()
+    start = START.timestamp()
+    for minutes, saved in ((30, 1.0), (60, 2.0), (90, 3.0), (180, 4.0), (190, 5.0)):
+        totals.add(
+            ReplaySample(start + minutes * 60, 0.0, 0.0),
+            BatteryState(charge_state=0.0, energy_saved=saved, money_saved_import=0.5),
+            10.0 * saved,
+            0.0,
+        )
+
+    rows = totals.finish()
+
+    assert [row["start"] for row in rows[ATTR_ENERGY_SAVED]] == [
+        START,
+        START + timedelta(hours=1),
+        START + timedelta(hours=2),
+        START + timedelta(hours=3),
+    ]
+    assert [row["sum"] for row in rows[ATTR_ENERGY_SAVED]] == [2.0, 3.0, 4.0, 5.0]
+    assert [row["state"] for row in rows[GRID_IMPORT_SIM]] == [20.0, 30.0, 40.0, 50.0]
+    assert rows[ATTR_MONEY_SAVED][0]["sum"] == 0.5
+    assert rows[GRID_EXPORT_SIM][-1]["sum"] == 0.0
+
+
+@pytest.fixture
+def recorder_db_url(tmp_path):
+    """Record into a file so the history can be read back."""
+    return f"sqlite:///{tmp_path}/recorder.db"
+
+
+async def test_backfill_service_imports_hourly_statistics(
+    recorder_mock, hass, setup_battery, freezer
+):
+    from homeassistant.components.recorder.statistics import statistics_during_period
+    from pytest_homeassistant_custom_component.components.recorder.common import (
+        async_wait_recording_done,
+    )
+
+    for minutes in range(0, 150, 10):
+        freezer.move_to(START + timedelta(minutes=minutes, seconds=1))
+        hass.states.async_set(IMPORT_SENSOR_ID, str(0.1 * minutes / 10), KWH_ATTRIBUTES)
+        hass.states.async_set(EXPORT_SENSOR_ID, str(0.05 * minutes / 10), KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+    await async_wait_recording_done(hass)
+
+    entry, _handle = await setup_battery(config_with_fixed_tariffs())
+    device = get_battery_device(hass, entry)
+    response = await hass.services.async_call(
+        DOMAIN,
+        "backfill_statistics",
+        {
+            "device_id": device.id,
+            "start": START.isoformat(),
+            "end": (START + timedelta(hours=3)).isoformat(),
+        },
+        blocking=True,
+        return_response=True,
+    )
+    await async_wait_recording_done(hass)
+
+    assert response["success"] is True
+    assert response["hours"] == 3
+    assert response["ticks"] == 141
+    import_id = statistic_id(BATTERY_NAME, GRID_IMPORT_SIM)
+    assert import_id in response["statistic_ids"]
+
+    statistics = await hass.async_add_executor_job(
+        statistics_during_period,
+        hass,
+        START,
+        None,
+        set(response["statistic_ids"]),
+        "hour",
+        None,
+        {"sum"},
+    )
+    assert [row["start"] for row in statistics[import_id]] == [
+        (START + timedelta(hours=hour)).timestamp() for hour in range(3)
+    ]
+    sums = [row["sum"] for row in statistics[import_id]]
+    assert sums == sorted(sums)
+    money = statistics[statistic_id(BATTERY_NAME, ATTR_MONEY_SAVED)]
+    assert money[-1]["sum"] > 0.0
+
+
+async def test_backfill_service_unknown_device(recorder_mock, hass, setup_battery):
+    await setup_battery()
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "backfill_statistics",
+        {"device_id": "missing", "start": START.isoformat()},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["success"] is False
@@ -3,7 +3,9 @@ from datetime import timedelta
 
 import pytest
 
-from homeassistant.core import Event
+from homeassistant.const import CONF_NAME
+from homeassistant.core import Event, State
+from homeassistant.util import dt as dt_util
 
 from custom_components.battery_sim.const import (
     ATTR_AVERAGE_ENERGY_VALUE,
@@ -24,6 +26,7 @@ from custom_components.battery_sim.const import (
     CONF_BATTERY_CHARGE_EFFICIENCY,
     CONF_BATTERY_DISCHARGE_EFFICIENCY,
     CONF_BATTERY_EFFICIENCY,
+    CONF_DEGRADATION_CURVE,
     CONF_END_OF_LIFE_DEGRADATION,
     CONF_EXPORT_SENSOR,
     CONF_IMPORT_SENSOR,
@@ -48,6 +51,8 @@ from custom_components.battery_sim.const import (
     TARIFF_SENSOR,
     TARIFF_TYPE,
 )
+from custom_components.battery_sim import simulation
+from custom_components.battery_sim.sources import async_get_meter_hub
 
 from pytest_homeassistant_custom_component.common import async_fire_time_changed
 
@@ -410,15 +415,49 @@ class TestTariffsAndSavings:
         handle = make_handle()
         assert handle.get_tariff_information(handle._inputs[0]) is None
 
-    def test_get_tariff_information_sensor(self, hass, make_handle):
+    async def test_get_tariff_information_sensor(self, hass, make_handle):
         handle = make_handle(config_with_tariff_sensors())
         hass.states.async_set(IMPORT_TARIFF_SENSOR_ID, "0.25")
         hass.states.async_set(EXPORT_TARIFF_SENSOR_ID, "unavailable")
+        await hass.async_block_till_done()
 
         assert handle.get_tariff_information(handle._inputs[0]) == pytest.approx(0.25)
         # Unavailable tariff sensors yield no tariff.
         assert handle.get_tariff_information(handle._inputs[1]) is None
 
+    async def test_tariff_cache_follows_sensor_changes(self, hass, make_handle):
+        hass.states.async_set(IMPORT_TARIFF_SENSOR_ID, "0.25")
+        handle = make_handle(config_with_tariff_sensors())
+        # Tracking starts from the current state.
+        assert handle.get_tariff_information(handle._inputs[0]) == pytest.approx(0.25)
+
+        hass.states.async_set(IMPORT_TARIFF_SENSOR_ID, "0.4")
+        await hass.async_block_till_done()
+        assert handle.get_tariff_information(handle._inputs[0]) == pytest.approx(0.4)
+
+        hass.states.async_set(IMPORT_TARIFF_SENSOR_ID, "cheap")
+        await hass.async_block_till_done()
+        assert handle.get_tariff_information(handle._inputs[0]) is None
+
+    def test_tariff_sensor_shared_between_batteries(self, make_handle):
+        first = make_handle(config_with_tariff_sensors())
+        second = make_handle(config_with_tariff_sensors(name="Second"))
+        cache = first._tariff_cache
+
+        assert second._tariff_cache is cache
+        # One subscription per tariff entity, not per battery.
+        assert len(cache._unsubs) == 2
+
+        for unsub in first._listeners:
+            unsub()
+        first._listeners.clear()
+        assert IMPORT_TARIFF_SENSOR_ID in cache._unsubs
+
+        for unsub in second._listeners:
+            unsub()
+        second._listeners.clear()
+        assert not cache._unsubs
+
     def test_get_tariff_information_missing_or_short_sensor(self, make_handle):
         handle = make_handle(config_with_tariff_sensors())
         # No state set at all.
@@ -509,6 +548,41 @@ class TestDegradation:
         handle._sensors[BATTERY_CYCLES] = 6000.0
         assert handle.degradation_factor == pytest.approx(0.5)
 
+    def test_degradation_curve(self, make_handle):
+        handle = make_handle(
+            base_config(**{CONF_DEGRADATION_CURVE: "0:1, 1000:0.9, 5000:0.7"})
+        )
+        handle._sensors[BATTERY_CYCLES] = 3000.0
+        assert handle.degradation_factor == pytest.approx(0.8)
+        assert handle.current_max_capacity == pytest.approx(8.0)
+
+    def test_capacity_is_derived_once_per_cycle_count(self, make_handle, monkeypatch):
+        handle = make_handle()
+        calls = []
+        derive = simulation.degradation_factor
+
+        def counting_degradation_factor(config, cycles):
+            calls.append(cycles)
+            return derive(config, cycles)
+
+        monkeypatch.setattr(
+            simulation, "degradation_factor", counting_degradation_factor
+        )
+        handle._sensors[BATTERY_CYCLES] = 3000.0
+        for _ in range(3):
+            assert handle.degradation_factor == pytest.approx(0.9)
+            assert handle.current_max_capacity == pytest.approx(9.0)
+        assert calls == [3000.0]
+
+        # A tick leaves its degradation behind for the new cycle count.
+        update_after(handle, ONE_HOUR, 0.0, 2.0)
+        kernel_calls = len(calls)
+        assert handle.degradation_factor == handle._sensors[BATTERY_DEGRADATION]
+        assert handle.current_max_capacity == pytest.approx(
+            10.0 * handle._sensors[BATTERY_DEGRADATION]
+        )
+        assert len(calls) == kernel_calls
+
     def test_cycles_accumulate_from_charged_energy(self, make_handle):
         handle = make_handle()
         update_after(handle, ONE_HOUR, 0.0, 2.0)
@@ -632,8 +706,8 @@ class TestEfficiencyCurves:
         del config[CONF_BATTERY_DISCHARGE_EFFICIENCY]
         handle = make_handle(config)
 
-        assert handle._battery_charge_efficiency_curve == [(0.0, 0.85)]
-        assert handle._battery_discharge_efficiency_curve == [(0.0, 0.85)]
+        assert handle._battery_config.charge_efficiency_curve == [(0.0, 0.85)]
+        assert handle._battery_config.discharge_efficiency_curve == [(0.0, 0.85)]
 
 
 class TestReset:
@@ -695,6 +769,77 @@ class TestMeterReadingHandlers:
 
         assert handle._accumulated_export_reading == pytest.approx(2.5)
 
+    async def test_shared_meter_read_once_for_all_batteries(self, hass, make_handle):
+        first = make_handle()
+        second = make_handle(base_config(**{CONF_NAME: "Second"}))
+        hub = first._meter_hub
+
+        assert second._meter_hub is hub
+        assert len(hub._unsubs) == 2
+        assert len(hub._subscribers[IMPORT_SENSOR_ID]) == 2
+
+        hass.states.async_set(IMPORT_SENSOR_ID, "10.0", KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+        hass.states.async_set(IMPORT_SENSOR_ID, "12.5", KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+
+        assert first._accumulated_import_reading == pytest.approx(2.5)
+        assert second._accumulated_import_reading == pytest.approx(2.5)
+
+    async def test_failing_subscriber_does_not_block_shared_meter(
+        self, hass, make_handle, caplog
+    ):
+        def failing(reading):
+            raise RuntimeError("boom")
+
+        unsub = async_get_meter_hub(hass).async_subscribe(IMPORT_SENSOR_ID, failing)
+        handle = make_handle()
+
+        hass.states.async_set(IMPORT_SENSOR_ID, "10.0", KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+        hass.states.async_set(IMPORT_SENSOR_ID, "12.5", KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+        unsub()
+
+        assert handle._accumulated_import_reading == pytest.approx(2.5)
+        assert "Error applying a reading" in caplog.text
+
+    def test_direct_handler_does_not_register_sources(self, make_handle):
+        handle = make_handle()
+        hub = handle._meter_hub
+        for unsub in handle._listeners:
+            unsub()
+        handle._listeners.clear()
+
+        handle.async_reading_handler(
+            Event(
+                "state_changed",
+                {
+                    "entity_id": IMPORT_SENSOR_ID,
+                    "old_state": State(IMPORT_SENSOR_ID, "1.0", KWH_ATTRIBUTES),
+                    "new_state": State(IMPORT_SENSOR_ID, "2.0", KWH_ATTRIBUTES),
+                },
+            )
+        )
+
+        assert handle._accumulated_import_reading == pytest.approx(1.0)
+        assert IMPORT_SENSOR_ID not in hub._sources
+
+    async def test_unit_change_rederives_conversion(self, hass, make_handle):
+        handle = make_handle()
+        hass.states.async_set(EXPORT_SENSOR_ID, "10000", WH_ATTRIBUTES)
+        await hass.async_block_till_done()
+        hass.states.async_set(EXPORT_SENSOR_ID, "11000", WH_ATTRIBUTES)
+        await hass.async_block_till_done()
+        hass.states.async_set(EXPORT_SENSOR_ID, "12.0", KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+        hass.states.async_set(EXPORT_SENSOR_ID, "12.5", KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+
+        # 1 kWh read in Wh; the unit switch rebases, then 0.5 kWh in kWh.
+        assert handle._accumulated_export_reading == pytest.approx(1.5)
+        assert handle._sensors[GRID_EXPORT_SIM] == pytest.approx(12.0)
+
     async def test_unsupported_unit_ignored(self, hass, make_handle, caplog):
         handle = make_handle()
         attributes = dict(KWH_ATTRIBUTES, **{"unit_of_measurement": "MJ"})
@@ -833,6 +978,59 @@ class TestUpdateScheduling:
         assert handle._accumulated_import_reading == 0.0
         assert handle._charge_state == pytest.approx(5.0 - 1.0 / 0.9)
 
+    @pytest.mark.parametrize("paused", [False, True])
+    async def test_idle_tick_is_skipped(self, make_handle, freezer, paused):
+        handle = make_handle()
+        handle._switches[PAUSE_BATTERY] = paused
+        updates = []
+        handle._async_publish_update = lambda: updates.append(True)
+
+        freezer.tick(timedelta(minutes=1))
+        handle.async_periodic_update(None)
+
+        assert updates == []
+        assert handle._stats.skipped_ticks == 1
+        assert handle._last_battery_update_time == pytest.approx(
+            dt_util.utcnow().timestamp()
+        )
+
+    async def test_forced_mode_tick_is_not_skipped(self, make_handle, freezer):
+        handle = make_handle()
+        handle._battery_mode = FORCE_DISCHARGE
+
+        freezer.tick(timedelta(minutes=1))
+        handle.async_periodic_update(None)
+
+        assert handle._stats.skipped_ticks == 0
+        assert handle._charge_state < 5.0
+
+    async def test_power_swing_updates_early(self, hass, make_handle, freezer):
+        handle = make_handle()
+        hass.states.async_set(IMPORT_SENSOR_ID, "10.0", KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+
+        # 0.1 kWh in 10 seconds is 36 kW, far above a quarter of the rates.
+        freezer.tick(timedelta(seconds=10))
+        hass.states.async_set(IMPORT_SENSOR_ID, "10.1", KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+
+        assert handle._stats.early_updates == 1
+        assert handle._accumulated_import_reading == 0.0
+        assert handle._charge_state < 5.0
+
+    async def test_steady_power_waits_for_the_tick(self, hass, make_handle, freezer):
+        handle = make_handle()
+        handle._last_grid_power = 36.0
+        hass.states.async_set(IMPORT_SENSOR_ID, "10.0", KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+
+        freezer.tick(timedelta(seconds=10))
+        hass.states.async_set(IMPORT_SENSOR_ID, "10.1", KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+
+        assert handle._stats.early_updates == 0
+        assert handle._accumulated_import_reading == pytest.approx(0.1)
+
 
 class TestLegacyConfig:
     """Backwards compatibility with YAML-era configurations."""
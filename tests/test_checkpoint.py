@@ -0,0 +1,217 @@
+"""Tests for the persistent battery checkpoint."""
+from datetime import timedelta
+
+import pytest
+
+from homeassistant.core import State
+from homeassistant.util import dt as dt_util
+
+from pytest_homeassistant_custom_component.common import (
+    async_fire_time_changed,
+    mock_restore_cache,
+)
+
+from custom_components.battery_sim import checkpoint
+from custom_components.battery_sim.checkpoint import CHECKPOINT_SAVE_DELAY
+from custom_components.battery_sim.const import (
+    ATTR_ENERGY_SAVED,
+    CHARGE_ONLY,
+    DOMAIN,
+    GRID_EXPORT_SIM,
+    GRID_IMPORT_SIM,
+    PAUSE_BATTERY,
+)
+
+from custom_components.battery_sim.replay import ReplaySample, replay_history
+
+from .common import (
+    BATTERY_ENTITY_ID,
+    CHARGE_LIMIT_NUMBER_ID,
+    ENERGY_SAVED_SENSOR_ID,
+    EXPORT_SENSOR_ID,
+    KWH_ATTRIBUTES,
+    MODE_SELECT_ID,
+    PAUSE_SWITCH_ID,
+    SIM_IMPORT_SENSOR_ID,
+    base_config,
+)
+
+
+def storage_key(entry):
+    return f"{DOMAIN}.{entry.entry_id}"
+
+
+async def test_checkpoint_survives_reload(hass, hass_storage, setup_battery):
+    entry, handle = await setup_battery()
+    handle.async_set_battery_charge_state(7.5)
+    handle._sensors[ATTR_ENERGY_SAVED] = 3.25
+    handle._battery_mode = CHARGE_ONLY
+    handle._switches[PAUSE_BATTERY] = True
+    handle.set_slider_limit(1.5, checkpoint.CHARGE_LIMIT)
+
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+
+    saved = hass_storage[storage_key(entry)]["data"]
+    assert saved[checkpoint.CHARGE_STATE] == pytest.approx(7.5)
+    restored = hass.data[DOMAIN][entry.entry_id]
+    assert restored is not handle
+    assert restored._charge_state == pytest.approx(7.5)
+    assert restored._sensors[ATTR_ENERGY_SAVED] == pytest.approx(3.25)
+    assert restored._battery_mode == CHARGE_ONLY
+    assert restored._switches[PAUSE_BATTERY] is True
+    assert restored._charge_limit == pytest.approx(1.5)
+    assert hass.states.get(BATTERY_ENTITY_ID).state == "7.5"
+    assert hass.states.get(ENERGY_SAVED_SENSOR_ID).state == "3.25"
+    assert hass.states.get(MODE_SELECT_ID).state == "Charge only"
+    assert hass.states.get(PAUSE_SWITCH_ID).state == "on"
+    assert hass.states.get(CHARGE_LIMIT_NUMBER_ID).state == "1.5"
+
+
+async def test_checkpoint_restores_last_reset(hass, hass_storage, setup_battery):
+    entry, handle = await setup_battery()
+    last_reset = handle._last_resets[GRID_IMPORT_SIM]
+
+    assert await hass.config_entries.async_reload(entry.entry_id)
+    await hass.async_block_till_done()
+
+    restored = hass.data[DOMAIN][entry.entry_id]
+    assert restored._last_resets[GRID_IMPORT_SIM] == last_reset
+    assert hass.states.get(SIM_IMPORT_SENSOR_ID).attributes[
+        "last_reset"
+    ] == last_reset.isoformat()
+
+
+async def test_saves_are_debounced(hass, setup_battery, freezer):
+    _entry, handle = await setup_battery()
+    saves = handle._checkpoint.saves
+
+    for charge_state in (6.0, 7.0, 8.0):
+        handle.async_set_battery_charge_state(charge_state)
+    await hass.async_block_till_done()
+    assert handle._checkpoint.saves == saves
+
+    freezer.tick(timedelta(seconds=CHECKPOINT_SAVE_DELAY + 1))
+    async_fire_time_changed(hass, dt_util.utcnow())
+    await hass.async_block_till_done()
+
+    assert handle._checkpoint.saves == saves + 1
+
+
+async def test_legacy_restore_states_are_migrated(
+    hass, hass_storage, setup_battery, freezer
+):
+    mock_restore_cache(
+        hass,
+        [
+            State(BATTERY_ENTITY_ID, "6.0"),
+            State(ENERGY_SAVED_SENSOR_ID, "2.5"),
+            State(PAUSE_SWITCH_ID, "on"),
+        ],
+    )
+    entry, handle = await setup_battery()
+
+    assert handle._charge_state == pytest.approx(6.0)
+    assert handle._switches[PAUSE_BATTERY] is True
+
+    freezer.tick(timedelta(seconds=CHECKPOINT_SAVE_DELAY + 1))
+    async_fire_time_changed(hass, dt_util.utcnow())
+    await hass.async_block_till_done()
+
+    saved = hass_storage[storage_key(entry)]["data"]
+    assert saved[checkpoint.CHARGE_STATE] == pytest.approx(6.0)
+    assert saved[checkpoint.SENSORS][ATTR_ENERGY_SAVED] == pytest.approx(2.5)
+    assert saved[checkpoint.SWITCHES] == {PAUSE_BATTERY: True}
+
+
+async def test_checkpoint_preferred_over_restore_states(
+    hass, hass_storage, setup_battery
+):
+    entry, _handle = await setup_battery()
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    hass_storage[storage_key(entry)]["data"][checkpoint.CHARGE_STATE] = 3.0
+    mock_restore_cache(hass, [State(BATTERY_ENTITY_ID, "9.0")])
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert hass.data[DOMAIN][entry.entry_id]._charge_state == pytest.approx(3.0)
+
+
+async def test_removing_battery_deletes_checkpoint(hass, hass_storage, setup_battery):
+    entry, _handle = await setup_battery()
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    assert storage_key(entry) in hass_storage
+
+    assert await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert storage_key(entry) not in hass_storage
+
+
+async def test_last_update_is_not_reset_by_a_restart(
+    hass, hass_storage, setup_battery, freezer
+):
+    entry, handle = await setup_battery()
+    last_update = handle._last_battery_update_time
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+    freezer.tick(timedelta(hours=1))
+    assert await hass.config_entries.async_setup(entry.entry_id)
+
+    restored = hass.data[DOMAIN][entry.entry_id]
+    assert restored._last_battery_update_time == last_update
+
+
+@pytest.fixture
+def recorder_db_url(tmp_path):
+    """Record into a file so the catch-up can read it back."""
+    return f"sqlite:///{tmp_path}/recorder.db"
+
+
+async def test_recorded_gap_is_caught_up_before_going_live(
+    recorder_mock, hass, hass_storage, setup_battery, freezer
+):
+    from pytest_homeassistant_custom_component.components.recorder.common import (
+        async_wait_recording_done,
+    )
+
+    last_update = dt_util.utcnow()
+    for seconds, reading in ((-30, "2.0"), (30, "2.5"), (90, "3.0")):
+        freezer.move_to(last_update + timedelta(seconds=seconds))
+        hass.states.async_set(EXPORT_SENSOR_ID, reading, KWH_ATTRIBUTES)
+        await hass.async_block_till_done()
+    await async_wait_recording_done(hass)
+    freezer.move_to(last_update + timedelta(minutes=10))
+    hass_storage[f"{DOMAIN}.gap"] = {
+        "version": checkpoint.CHECKPOINT_VERSION,
+        "minor_version": 1,
+        "key": f"{DOMAIN}.gap",
+        "data": {
+            checkpoint.CHARGE_STATE: 5.0,
+            checkpoint.LAST_UPDATE: last_update.timestamp(),
+            checkpoint.SENSORS: {GRID_EXPORT_SIM: 2.0},
+        },
+    }
+
+    _entry, handle = await setup_battery(entry_id="gap")
+
+    start = last_update.timestamp()
+    expected = replay_history(
+        base_config(),
+        [
+            ReplaySample(start + 60, 0.0, 0.5),
+            ReplaySample(start + 120, 0.0, 0.5),
+        ],
+        start,
+        initial_charge_state=5.0,
+    )
+    assert handle._stats.caught_up_ticks == 2
+    assert handle._last_battery_update_time == start + 120
+    assert handle._charge_state == pytest.approx(expected.charge_state)
+    assert handle._sensors[GRID_EXPORT_SIM] == pytest.approx(
+        2.0 + expected.grid_export
+    )
@@ -14,11 +14,13 @@ from custom_components.battery_sim.const import (
     CONF_BATTERY_MAX_CHARGE_RATE,
     CONF_BATTERY_MAX_DISCHARGE_RATE,
     CONF_BATTERY_SIZE,
+    CONF_DEGRADATION_CURVE,
     CONF_END_OF_LIFE_DEGRADATION,
     CONF_INPUT_LIST,
     CONF_MINIMUM_USER_SELECTABLE_SOC,
     CONF_NOMINAL_INVERTER_POWER,
     CONF_RATED_BATTERY_CYCLES,
+    CONF_SHADOW_SCENARIOS,
     CONF_SOLAR_ENERGY_SENSOR,
     CONF_UNIQUE_NAME,
     CONF_UPDATE_FREQUENCY,
@@ -270,6 +272,7 @@ class TestOptionsFlow:
                 CONF_BATTERY_CHARGE_EFFICIENCY: "0:0.8, 4:0.9",
                 CONF_RATED_BATTERY_CYCLES: 4000,
                 CONF_END_OF_LIFE_DEGRADATION: 0.75,
+                CONF_DEGRADATION_CURVE: "0:1, 2000:0.9",
                 CONF_UPDATE_FREQUENCY: 120,
                 CONF_MINIMUM_USER_SELECTABLE_SOC: 0.2,
             },
@@ -280,10 +283,15 @@ class TestOptionsFlow:
 
         assert entry.data[CONF_BATTERY_SIZE] == 12.0
         assert entry.data[CONF_BATTERY_CHARGE_EFFICIENCY] == "0:0.8, 4:0.9"
+        assert entry.data[CONF_DEGRADATION_CURVE] == "0:1, 2000:0.9"
         assert entry.data[CONF_UPDATE_FREQUENCY] == 120
         # The reload created a fresh handle with the new configuration.
         new_handle = hass.data[DOMAIN][entry.entry_id]
-        assert new_handle._battery_size == 12.0
+        assert new_handle._battery_config.battery_size == 12.0
+        assert new_handle._battery_config.degradation_curve.points[-1] == (
+            2000.0,
+            0.9,
+        )
 
     async def test_main_params_rejects_invalid_efficiency(self, hass, setup_battery):
         entry, _handle = await setup_battery()
@@ -312,6 +320,34 @@ class TestOptionsFlow:
             CONF_BATTERY_DISCHARGE_EFFICIENCY: "invalid_input"
         }
 
+    async def test_main_params_rejects_invalid_degradation_curve(
+        self, hass, setup_battery
+    ):
+        entry, _handle = await setup_battery()
+        result = await self._start_options(hass, entry)
+
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"], {"next_step_id": "main_params"}
+        )
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"],
+            {
+                CONF_BATTERY_SIZE: 12.0,
+                CONF_BATTERY_MAX_CHARGE_RATE: 3.0,
+                CONF_BATTERY_MAX_DISCHARGE_RATE: 6.0,
+                CONF_BATTERY_DISCHARGE_EFFICIENCY: "0.9",
+                CONF_BATTERY_CHARGE_EFFICIENCY: "0.9",
+                CONF_RATED_BATTERY_CYCLES: 4000,
+                CONF_END_OF_LIFE_DEGRADATION: 0.75,
+                CONF_DEGRADATION_CURVE: "0:1, 2000:1.5",
+                CONF_UPDATE_FREQUENCY: 120,
+                CONF_MINIMUM_USER_SELECTABLE_SOC: 0.2,
+            },
+        )
+
+        assert result["type"] is FlowResultType.FORM
+        assert result["errors"] == {CONF_DEGRADATION_CURVE: "invalid_input"}
+
     async def test_add_import_meter(self, hass, setup_battery):
         entry, _handle = await setup_battery()
         result = await self._start_options(hass, entry)
@@ -430,6 +466,52 @@ class TestOptionsFlow:
         assert entity_registry.async_get(stale.entity_id) is None
         assert "Deleted leftover Battery Sim entities" in caplog.text
 
+    async def test_shadow_scenarios_update(self, hass, setup_battery):
+        entry, _handle = await setup_battery()
+        result = await self._start_options(hass, entry)
+
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"], {"next_step_id": "shadow_scenarios"}
+        )
+        assert result["type"] is FlowResultType.FORM
+
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"],
+            {
+                CONF_SHADOW_SCENARIOS: [
+                    {CONF_NAME: "big", CONF_BATTERY_SIZE: "15"},
+                    {CONF_BATTERY_CHARGE_EFFICIENCY: "0:0.8, 4:0.9"},
+                ]
+            },
+        )
+        assert result["type"] is FlowResultType.MENU
+        await hass.async_block_till_done()
+
+        assert entry.data[CONF_SHADOW_SCENARIOS] == [
+            {CONF_NAME: "big", CONF_BATTERY_SIZE: 15.0},
+            {CONF_BATTERY_CHARGE_EFFICIENCY: "0:0.8, 4:0.9"},
+        ]
+        handle = hass.data[DOMAIN][entry.entry_id]
+        assert [result["name"] for result in handle._scenarios.results()] == [
+            "big",
+            "scenario_1",
+        ]
+
+    async def test_shadow_scenarios_rejects_invalid_input(self, hass, setup_battery):
+        entry, _handle = await setup_battery()
+        result = await self._start_options(hass, entry)
+
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"], {"next_step_id": "shadow_scenarios"}
+        )
+        result = await hass.config_entries.options.async_configure(
+            result["flow_id"], {CONF_SHADOW_SCENARIOS: [{CONF_BATTERY_SIZE: -1}]}
+        )
+
+        assert result["type"] is FlowResultType.FORM
+        assert result["errors"] == {CONF_SHADOW_SCENARIOS: "invalid_input"}
+        assert CONF_SHADOW_SCENARIOS not in entry.data
+
     async def test_all_done_creates_options_entry(self, hass, setup_battery):
         entry, _handle = await setup_battery()
         result = await self._start_options(hass, entry)
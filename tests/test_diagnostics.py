@@ -0,0 +1,66 @@
+"""Tests for the battery_sim diagnostics platform and hot-path counters."""
+import pytest
+
+from custom_components.battery_sim.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.battery_sim.stats import LatencyHistogram
+
+from .common import (
+    EXPORT_SENSOR_ID,
+    IMPORT_SENSOR_ID,
+    KWH_ATTRIBUTES,
+    rewind_last_update,
+)
+
+
+async def test_diagnostics_report_hot_path_counters(hass, setup_battery):
+    hass.states.async_set(IMPORT_SENSOR_ID, "10.0", KWH_ATTRIBUTES)
+    entry, handle = await setup_battery()
+
+    hass.states.async_set(IMPORT_SENSOR_ID, "11.0", KWH_ATTRIBUTES)
+    await hass.async_block_till_done()
+    hass.states.async_set(IMPORT_SENSOR_ID, "unavailable", KWH_ATTRIBUTES)
+    await hass.async_block_till_done()
+    hass.states.async_set(IMPORT_SENSOR_ID, "10.5", KWH_ATTRIBUTES)
+    await hass.async_block_till_done()
+    hass.states.async_set(IMPORT_SENSOR_ID, "10.0", KWH_ATTRIBUTES)
+    await hass.async_block_till_done()
+
+    rewind_last_update(handle, 60)
+    handle.async_trigger_update()
+    # Too soon after the last update: deferred.
+    handle.async_trigger_update()
+    await hass.async_block_till_done()
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+
+    stats = diagnostics["stats"]
+    assert stats["ticks"] == 1
+    assert stats["update_latency"]["count"] == 1
+    assert sum(stats["update_latency"]["buckets"].values()) == 1
+    assert stats["readings"] == 2
+    assert stats["rebased_readings"] == 1
+    assert stats["delayed_updates"] == 1
+    assert diagnostics["battery"]["update_pending"] is True
+
+    meter = diagnostics["meters"][IMPORT_SENSOR_ID]
+    assert meter == {"units": "kWh", "readings": 4, "dropped_readings": 2}
+    assert diagnostics["meters"][EXPORT_SENSOR_ID]["readings"] == 0
+    assert diagnostics["state_writes"]["writes"] > 0
+    assert diagnostics["scheduler"][0]["batteries"] == 1
+    assert diagnostics["config"]["name"] == entry.data["name"]
+
+
+def test_latency_histogram_buckets():
+    histogram = LatencyHistogram()
+    for seconds in (0.000005, 0.00001, 0.0003, 0.5):
+        histogram.record(seconds)
+
+    data = histogram.as_dict()
+    assert data["count"] == 4
+    assert data["max_seconds"] == 0.5
+    assert data["mean_seconds"] == pytest.approx(0.50031525 / 4)
+    assert data["buckets"]["<=10us"] == 2
+    assert data["buckets"]["<=500us"] == 1
+    assert data["buckets"][">10000us"] == 1
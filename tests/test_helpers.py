@@ -4,6 +4,7 @@ from types import SimpleNamespace
 import pytest
 
 from homeassistant.const import CONF_NAME
+from homeassistant.core import State
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers import entity_registry as er
 
@@ -37,6 +38,10 @@ from custom_components.battery_sim.const import (
     TARIFF_TYPE,
 )
 from custom_components.battery_sim.helpers import (
+    DEGRADATION_LOOKUP_CELLS,
+    DegradationCurve,
+    EfficiencyCurve,
+    MeterSource,
     battery_device_identifiers,
     device_display_name,
     expected_entity_unique_ids,
@@ -44,8 +49,10 @@ from custom_components.battery_sim.helpers import (
     find_leftover_entity_registry_entries,
     generate_input_list,
     interpolate_efficiency,
+    parse_degradation_curve,
     parse_efficiency_curve,
     purge_leftover_battery_registry_entries,
+    validate_degradation_config,
     validate_efficiency_config,
 )
 
@@ -164,6 +171,153 @@ class TestInterpolateEfficiency:
             interpolate_efficiency([], 1.0)
 
 
+class TestEfficiencyCurve:
+    """Tests for the compiled EfficiencyCurve."""
+
+    def test_parsed_curve_is_compiled(self):
+        curve = parse_efficiency_curve("0:0.8, 4:0.9")
+        assert isinstance(curve, EfficiencyCurve)
+        assert curve.constant is None
+        assert len(curve) == 2
+        assert curve[1] == (4.0, 0.9)
+        assert list(curve) == [(0.0, 0.8), (4.0, 0.9)]
+
+    def test_single_point_is_constant(self):
+        assert parse_efficiency_curve(0.9).constant == 0.9
+
+    def test_same_config_value_shares_instance(self):
+        assert parse_efficiency_curve("0:0.8, 4:0.9") is parse_efficiency_curve(
+            "0:0.8, 4:0.9"
+        )
+
+    def test_same_points_share_instance(self):
+        assert parse_efficiency_curve("0:0.8, 4:0.9") is parse_efficiency_curve(
+            "4:0.90;0:0.8"
+        )
+        assert parse_efficiency_curve(0.9) is parse_efficiency_curve("0.90")
+
+    def test_lookup_matches_linear_scan(self):
+        points = [(float(power), 0.8 + 0.01 * (power % 7)) for power in range(20)]
+        curve = EfficiencyCurve(points)
+        for step in range(-4, 100):
+            power = step * 0.25
+            expected = points[-1][1]
+            if power <= points[0][0]:
+                expected = points[0][1]
+            else:
+                for (start, start_eff), (end, end_eff) in zip(points, points[1:]):
+                    if power <= end:
+                        expected = start_eff + (power - start) / (end - start) * (
+                            end_eff - start_eff
+                        )
+                        break
+            assert curve.efficiency_at(power) == pytest.approx(expected)
+
+    def test_evaluate_many(self):
+        curve = EfficiencyCurve([(0.0, 0.8), (4.0, 0.9), (8.0, 0.7)])
+        assert curve.evaluate_many([0.0, 2.0, 6.0, 10.0]) == pytest.approx(
+            [0.8, 0.85, 0.8, 0.7]
+        )
+        assert EfficiencyCurve([(0.0, 0.9)]).evaluate_many([1.0, 2.0]) == [0.9, 0.9]
+
+
+class TestEfficiencyCurveClipping:
+    """Tests for the exact SoC clipping solver on EfficiencyCurve."""
+
+    CURVE = EfficiencyCurve([(0.0, 0.7), (1.0, 0.95), (3.0, 0.9), (5.0, 0.6)])
+
+    def test_unclipped_amount_is_returned(self):
+        assert self.CURVE.clip_charge(2.0, 1.0, 5.0) == 2.0
+        assert self.CURVE.clip_discharge(2.0, 1.0, 5.0) == 2.0
+
+    def test_constant_efficiency(self):
+        curve = EfficiencyCurve([(0.0, 0.8)])
+        assert curve.clip_charge(2.0, 1.0, 1.0) == pytest.approx(1.0 / 0.8)
+        assert curve.clip_discharge(2.0, 1.0, 1.0) == pytest.approx(0.8)
+
+    @pytest.mark.parametrize("headroom", [0.0, 0.05, 0.5, 1.9, 2.9])
+    def test_charge_fills_headroom_exactly(self, headroom):
+        amount = self.CURVE.clip_charge(4.5, 1.0, headroom)
+        assert amount < 4.5
+        assert amount * self.CURVE.efficiency_at(amount) == pytest.approx(
+            headroom, abs=1e-12
+        )
+
+    @pytest.mark.parametrize("available", [0.0, 0.05, 0.5, 1.9, 3.1])
+    def test_discharge_drains_available_exactly(self, available):
+        amount = self.CURVE.clip_discharge(4.5, 1.0, available)
+        assert amount < 4.5
+        assert amount / self.CURVE.efficiency_at(amount) == pytest.approx(
+            available, abs=1e-12
+        )
+
+    def test_interval_scales_power(self):
+        # A one minute interval at 60x the energy has the same power profile.
+        hourly = self.CURVE.clip_charge(4.5, 1.0, 1.0)
+        assert self.CURVE.clip_charge(4.5 / 60, 1 / 60, 1.0 / 60) == pytest.approx(
+            hourly / 60
+        )
+
+    def test_steep_curve_is_solved_exactly(self):
+        # A fixed-point iteration stops at half the headroom on this curve.
+        curve = EfficiencyCurve([(0.0, 0.05), (1.0, 1.0)])
+        amount = curve.clip_charge(1.0, 1.0, 0.5)
+        assert amount * curve.efficiency_at(amount) == pytest.approx(0.5)
+
+
+class TestDegradationCurve:
+    """Tests for the configurable capacity fade over cycles."""
+
+    def test_unset_curve(self):
+        assert parse_degradation_curve(None) is None
+        assert parse_degradation_curve("  ") is None
+
+    def test_parsed_points_are_sorted(self):
+        curve = parse_degradation_curve("6000:0.8; 0:1, 1000:0.95")
+        assert curve.points == ((0.0, 1.0), (1000.0, 0.95), (6000.0, 0.8))
+
+    def test_same_points_share_instance(self):
+        assert parse_degradation_curve("0:1, 6000:0.8") is parse_degradation_curve(
+            "0:1.0,6000:0.80"
+        )
+
+    @pytest.mark.parametrize("raw_value", ["bad", "-1:1, 10:0.9", "0:1, 10:0", "0:1.2"])
+    def test_invalid_curves_are_rejected(self, raw_value):
+        with pytest.raises(ValueError):
+            validate_degradation_config(raw_value)
+
+    def test_single_point_is_constant(self):
+        curve = DegradationCurve([(100.0, 0.9)])
+        assert curve.factor_at(0.0) == 0.9
+        assert curve.factor_at(5000.0) == 0.9
+
+    def test_lookup_matches_linear_scan(self):
+        # More breakpoints than lookup cells, unevenly spaced.
+        points = [
+            (float(index**2), 1.0 - 0.0005 * index - 0.01 * (index % 3))
+            for index in range(DEGRADATION_LOOKUP_CELLS + 40)
+        ]
+        curve = DegradationCurve(points)
+        last = points[-1][0]
+        for step in range(-10, 5010):
+            cycles = step * last / 5000
+            expected = points[-1][1]
+            if cycles <= points[0][0]:
+                expected = points[0][1]
+            else:
+                for (start, start_factor), (end, end_factor) in zip(
+                    points, points[1:]
+                ):
+                    if cycles < end:
+                        expected = start_factor + (cycles - start) / (
+                            end - start
+                        ) * (end_factor - start_factor)
+                        break
+            assert curve.factor_at(cycles) == pytest.approx(expected)
+        for cycles, factor in points:
+            assert curve.factor_at(cycles) == pytest.approx(factor)
+
+
 class TestGenerateInputList:
     """Tests for the legacy-config input list generation."""
 
@@ -242,6 +396,36 @@ class TestGenerateInputList:
         assert len(inputs) == 2
 
 
+class TestMeterSource:
+    """Tests for the cached meter unit conversion."""
+
+    def test_conversion_factors(self):
+        source = MeterSource("sensor.meter")
+
+        assert source.conversion_factor_for(
+            State("sensor.meter", "1", {"unit_of_measurement": "kWh"})
+        ) == 1.0
+        assert source.conversion_factor_for(
+            State("sensor.meter", "1", {"unit_of_measurement": "Wh"})
+        ) == 0.001
+        assert source.conversion_factor_for(
+            State("sensor.meter", "1", {"unit_of_measurement": "MJ"})
+        ) is None
+        assert source.units == "MJ"
+
+    def test_unit_read_once_per_attributes_object(self):
+        source = MeterSource("sensor.meter")
+        first = State("sensor.meter", "1", {"unit_of_measurement": "Wh"})
+        second = State("sensor.meter", "2", first.attributes)
+        source.conversion_factor_for(first)
+        # Attributes are read-only in Home Assistant; a stale unit shows the
+        # reused attributes object was not read again.
+        source.units = "stale"
+
+        assert source.conversion_factor_for(second) == 0.001
+        assert source.units == "stale"
+
+
 class TestExpectedEntityUniqueIds:
     """Tests for expected_entity_unique_ids."""
 
@@ -13,29 +13,35 @@ from custom_components.battery_sim.const import (
     CONF_BATTERY_SIZE,
     CONF_EXPORT_SENSOR,
     CONF_IMPORT_SENSOR,
+    CONF_INPUT_LIST,
+    CONF_SHADOW_SCENARIOS,
+    CONF_UPDATE_FREQUENCY,
     DOMAIN,
+    FIXED_TARIFF,
+)
+from custom_components.battery_sim.devices import DEVICE_INDEX_KEY
+
+from .common import (
+    BATTERY_ENTITY_ID,
+    BATTERY_NAME,
+    CHARGE_LIMIT_NUMBER_ID,
+    base_config,
+    config_with_fixed_tariffs,
+    config_with_solar,
+    get_battery_device,
 )
-
-from .common import BATTERY_NAME, base_config
 
 SERVICES = (
     "set_battery_charge_state",
     "set_battery_cycles",
     "get_efficiency",
+    "get_scenario_results",
+    "get_recent_ticks",
+    "backfill_statistics",
     "set_stored_energy_value",
 )
 
 
-def get_battery_device(hass, entry):
-    """Return the device registry entry created for a battery config entry."""
-    device_registry = dr.async_get(hass)
-    device = device_registry.async_get_device_by_identifier(
-        (DOMAIN, entry.entry_id), entry.entry_id
-    )
-    assert device is not None
-    return device
-
-
 async def test_setup_entry_creates_handle_and_services(hass, setup_battery):
     entry, handle = await setup_battery()
 
@@ -208,6 +214,90 @@ async def test_get_efficiency_service_unknown_device(hass, setup_battery):
     assert "No simulated battery found" in response["error"]
 
 
+async def test_get_scenario_results_service(hass, setup_battery):
+    entry, _handle = await setup_battery(
+        base_config(
+            **{CONF_SHADOW_SCENARIOS: [{CONF_NAME: "small", CONF_BATTERY_SIZE: 2.0}]}
+        )
+    )
+    device = get_battery_device(hass, entry)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "get_scenario_results",
+        {"device_id": device.id},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["success"] is True
+    assert response["battery"] == BATTERY_NAME
+    assert response["ticks"] == 0
+    assert [result["name"] for result in response["scenarios"]] == ["small"]
+    assert response["scenarios"][0]["charge_state"] == pytest.approx(1.0)
+
+
+async def test_get_recent_ticks_service(hass, setup_battery):
+    entry, handle = await setup_battery()
+    device = get_battery_device(hass, entry)
+    start = handle._last_battery_update_time
+    handle.update_battery(0.0, 0.5, time_now=start + 60)
+    handle.update_battery(0.2, 0.0, time_now=start + 120)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "get_recent_ticks",
+        {"device_id": device.id, "count": 1},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["success"] is True
+    assert response["battery"] == BATTERY_NAME
+    assert response["ticks"] == 1
+    columns = response["columns"]
+    assert columns["time"] == [start + 120]
+    assert columns["import"] == [pytest.approx(0.2)]
+    # The discharge rate limits the battery to part of the import.
+    assert 0.0 < columns["discharged"][0] < 0.2
+    assert columns["net_import"] == [pytest.approx(0.2 - columns["discharged"][0])]
+    assert columns["charge_state"] == [pytest.approx(handle._charge_state)]
+    assert columns["import_tariff"] == [None]
+
+
+async def test_service_device_lookup_is_cached(hass, setup_battery):
+    entry, handle = await setup_battery()
+    device = get_battery_device(hass, entry)
+    index = hass.data[DEVICE_INDEX_KEY]
+
+    assert index.async_get_handle(device.id) is handle
+    assert index._by_device_id == {device.id: handle}
+
+    # Device registry changes drop the cached device.
+    dr.async_get(hass).async_update_device(device.id, name_by_user="Renamed")
+    await hass.async_block_till_done()
+    assert index._by_device_id == {}
+    assert index.async_get_handle(device.id) is handle
+
+
+async def test_unloaded_battery_leaves_device_index(hass, setup_battery, caplog):
+    entry_one, _ = await setup_battery()
+    entry_two, handle_two = await setup_battery(
+        base_config(**{CONF_NAME: "second_battery"})
+    )
+    device_one = get_battery_device(hass, entry_one)
+    device_two = get_battery_device(hass, entry_two)
+    index = hass.data[DEVICE_INDEX_KEY]
+    index.async_get_handle(device_one.id)
+
+    assert await hass.config_entries.async_unload(entry_one.entry_id)
+    await hass.async_block_till_done()
+
+    assert index.async_get_handle(device_one.id) is None
+    assert "No handle matched" in caplog.text
+    assert index.async_get_handle(device_two.id) is handle_two
+
+
 async def test_yaml_setup_creates_handle_and_entities(hass):
     yaml_config = {
         DOMAIN: {
@@ -228,7 +318,7 @@ async def test_yaml_setup_creates_handle_and_entities(hass):
 
     handle = hass.data[DOMAIN]["my_battery"]
     assert handle.name == "my_battery"
-    assert handle._battery_size == 8.0
+    assert handle._battery_config.battery_size == 8.0
     # Discovery created the platform entities.
     assert hass.states.get("sensor.my_battery") is not None
     assert hass.states.get("switch.my_battery_pause_battery") is not None
@@ -258,3 +348,53 @@ async def test_leftover_entities_logged_on_setup(hass, setup_battery, caplog):
     await hass.async_block_till_done()
 
     assert "has leftover entities" in caplog.text
+
+
+async def test_settings_change_applies_in_place(hass, setup_battery):
+    entry, handle = await setup_battery(config_with_fixed_tariffs())
+    handle._accumulated_import_reading = 0.5
+    periodic_update = handle._unsub_periodic_update
+
+    hass.config_entries.async_update_entry(
+        entry,
+        data=config_with_fixed_tariffs(
+            **{
+                CONF_BATTERY_SIZE: 4.0,
+                CONF_BATTERY_MAX_CHARGE_RATE: 2.0,
+                CONF_UPDATE_FREQUENCY: 30,
+            }
+        ),
+    )
+    await hass.async_block_till_done()
+
+    assert hass.data[DOMAIN][entry.entry_id] is handle
+    assert handle._accumulated_import_reading == pytest.approx(0.5)
+    assert handle._charge_state == pytest.approx(4.0)
+    assert handle._charge_limit == pytest.approx(2.0)
+    assert handle._update_frequency == 30
+    assert handle._unsub_periodic_update is not periodic_update
+    assert hass.states.get(BATTERY_ENTITY_ID).attributes[CONF_BATTERY_SIZE] == 4.0
+    assert hass.states.get(CHARGE_LIMIT_NUMBER_ID).attributes["max"] == 2.0
+
+
+async def test_tariff_change_applies_in_place(hass, setup_battery):
+    entry, handle = await setup_battery(config_with_fixed_tariffs())
+    import_input = handle._inputs[0]
+    config = config_with_fixed_tariffs()
+    config[CONF_INPUT_LIST][0][FIXED_TARIFF] = 0.45
+
+    hass.config_entries.async_update_entry(entry, data=config)
+    await hass.async_block_till_done()
+
+    assert hass.data[DOMAIN][entry.entry_id] is handle
+    assert handle._inputs[0] is import_input
+    assert handle.get_tariff_information(import_input) == pytest.approx(0.45)
+
+
+async def test_entity_change_reloads(hass, setup_battery):
+    entry, handle = await setup_battery()
+
+    hass.config_entries.async_update_entry(entry, data=config_with_solar())
+    await hass.async_block_till_done()
+
+    assert hass.data[DOMAIN][entry.entry_id] is not handle
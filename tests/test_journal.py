@@ -0,0 +1,147 @@
+"""Tests for the memory-mapped tick journal."""
+import numpy as np
+import pytest
+
+from homeassistant.const import CONF_NAME
+
+from custom_components.battery_sim.const import CONF_TICK_JOURNAL, DOMAIN
+from custom_components.battery_sim.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.battery_sim.journal import (
+    JOURNAL_DTYPE,
+    TickJournal,
+    journal_directory,
+    read_journal,
+    read_segment,
+    segment_paths,
+)
+from custom_components.battery_sim.trace import TICK_FIELDS, TickTrace
+
+from .common import base_config
+
+
+def _record(trace, time):
+    trace.record(
+        time, 60.0, 0.1, 0.0, 0.0, 0.0, 0.1, 0.0, 0.0, None, 0.9, 0.25, None, 5.0, 10.0
+    )
+
+
+async def _open_journal(hass, directory):
+    journal = TickJournal(hass, directory, segment_records=4, max_segments=3)
+    await journal.async_open()
+    trace = TickTrace(8)
+    trace.journal = journal
+    return journal, trace
+
+
+def test_record_layout():
+    assert JOURNAL_DTYPE.names == TICK_FIELDS
+    assert JOURNAL_DTYPE.itemsize == 64
+
+
+async def test_segments_rotate_and_are_pruned(hass, tmp_path):
+    journal, trace = await _open_journal(hass, tmp_path)
+
+    for time in range(10):
+        _record(trace, 1000.0 + time)
+        await hass.async_block_till_done()
+    await journal.async_close()
+
+    assert [path.name for path in segment_paths(tmp_path)] == [
+        "00000002.ticks",
+        "00000003.ticks",
+    ]
+    segments = read_journal(tmp_path)
+    assert [len(segment) for segment in segments] == [4, 2]
+    records = np.concatenate(segments)
+    assert records["time"].tolist() == [1000.0 + time for time in range(4, 10)]
+    assert records["import"] == pytest.approx(0.1)
+    assert records["discharge_efficiency"] == pytest.approx(0.9)
+    assert np.isnan(records["charge_efficiency"]).all()
+    assert np.isnan(records["export_tariff"]).all()
+    assert journal.records == 10
+    assert journal.dropped == 0
+
+
+async def test_ticks_are_dropped_instead_of_waiting(hass, tmp_path):
+    journal, trace = await _open_journal(hass, tmp_path)
+
+    # Nothing yields to the executor, so only two segments are ready.
+    for time in range(10):
+        _record(trace, float(time))
+    assert journal.dropped == 2
+
+    await hass.async_block_till_done()
+    _record(trace, 10.0)
+    await journal.async_close()
+
+    records = np.concatenate(read_journal(tmp_path))
+    # The first segment went when the fourth was prepared.
+    assert records["time"].tolist() == [4.0, 5.0, 6.0, 7.0, 10.0]
+
+
+async def test_reopened_journal_appends(hass, tmp_path):
+    journal, trace = await _open_journal(hass, tmp_path)
+    _record(trace, 1.0)
+    await journal.async_close()
+
+    journal, trace = await _open_journal(hass, tmp_path)
+    _record(trace, 2.0)
+    await journal.async_close()
+
+    assert len(segment_paths(tmp_path)) == 1
+    assert read_segment(segment_paths(tmp_path)[0])["time"].tolist() == [1.0, 2.0]
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "00000001.ticks"
+    path.write_bytes(b"not a journal segment")
+
+    with pytest.raises(ValueError):
+        read_segment(path)
+
+
+async def test_battery_journals_its_ticks(hass, setup_battery, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    entry, handle = await setup_battery(
+        base_config(**{CONF_NAME: "journaled", CONF_TICK_JOURNAL: True})
+    )
+    start = handle._last_battery_update_time
+    handle.update_battery(0.0, 0.5, time_now=start + 60)
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert diagnostics["tick_journal"]["records"] == 1
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+    directory = journal_directory(hass, entry.entry_id)
+    records = np.concatenate(read_journal(directory))
+    assert records["time"].tolist() == [start + 60]
+    assert records["export"] == pytest.approx([0.5])
+    assert records["charge_state"] == pytest.approx(
+        [handle._charge_state], rel=1e-6
+    )
+
+    assert await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+    assert not directory.exists()
+
+
+async def test_journal_follows_the_settings(hass, setup_battery, tmp_path):
+    hass.config.config_dir = str(tmp_path)
+    entry, handle = await setup_battery()
+    assert handle._trace.journal is None
+
+    hass.config_entries.async_update_entry(
+        entry, data={**entry.data, CONF_TICK_JOURNAL: True}
+    )
+    await hass.async_block_till_done()
+    assert hass.data[DOMAIN][entry.entry_id] is handle
+    assert handle._trace.journal is not None
+
+    hass.config_entries.async_update_entry(
+        entry, data={**entry.data, CONF_TICK_JOURNAL: False}
+    )
+    await hass.async_block_till_done()
+    assert handle._trace.journal is None
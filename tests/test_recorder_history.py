@@ -0,0 +1,291 @@
+"""Tests for streaming recorded meter history out of the recorder database."""
+import json
+import sqlite3
+
+import pytest
+
+from homeassistant.const import ATTR_UNIT_OF_MEASUREMENT, UnitOfEnergy
+from homeassistant.exceptions import HomeAssistantError
+
+from custom_components.battery_sim.const import CONF_SOLAR_ENERGY_SENSOR
+from custom_components.battery_sim.recorder_history import (
+    STATISTICS,
+    RecorderHistory,
+    async_replay_recorder_history,
+    recorder_database_path,
+)
+from custom_components.battery_sim.replay import ReplaySample, replay_history
+
+from .common import (
+    EXPORT_SENSOR_ID,
+    EXPORT_TARIFF_SENSOR_ID,
+    IMPORT_SENSOR_ID,
+    IMPORT_TARIFF,
+    IMPORT_TARIFF_SENSOR_ID,
+    KWH_ATTRIBUTES,
+    SOLAR_SENSOR_ID,
+    WH_ATTRIBUTES,
+    base_config,
+    config_with_fixed_tariffs,
+    config_with_tariff_sensors,
+)
+
+START = 1_700_000_000.0
+ONE_MINUTE = 60
+ONE_HOUR = 3600
+
+# The recorder tables and columns the loader reads.
+SCHEMA = """
+CREATE TABLE states_meta (metadata_id INTEGER PRIMARY KEY, entity_id TEXT);
+CREATE TABLE state_attributes (attributes_id INTEGER PRIMARY KEY, shared_attrs TEXT);
+CREATE TABLE states (
+    state_id INTEGER PRIMARY KEY, metadata_id INTEGER, state TEXT,
+    attributes_id INTEGER, last_updated_ts FLOAT
+);
+CREATE TABLE statistics_meta (
+    id INTEGER PRIMARY KEY, statistic_id TEXT, unit_of_measurement TEXT
+);
+CREATE TABLE statistics (
+    id INTEGER PRIMARY KEY, metadata_id INTEGER, start_ts FLOAT,
+    state FLOAT, mean FLOAT
+);
+"""
+
+
+class RecorderDatabase:
+    """A recorder SQLite file filled row by row."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._connection = sqlite3.connect(self.path)
+        self._connection.executescript(SCHEMA)
+        self._attributes = {}
+
+    def _metadata_id(self, table, column, entity_id, **extra):
+        row = self._connection.execute(
+            f"SELECT rowid FROM {table} WHERE {column} = ?", (entity_id,)
+        ).fetchone()
+        if row:
+            return row[0]
+        columns = [column, *extra]
+        return self._connection.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            (entity_id, *extra.values()),
+        ).lastrowid
+
+    def state(self, entity_id, timestamp, state, attributes=KWH_ATTRIBUTES):
+        shared = json.dumps(attributes)
+        if shared not in self._attributes:
+            self._attributes[shared] = self._connection.execute(
+                "INSERT INTO state_attributes (shared_attrs) VALUES (?)", (shared,)
+            ).lastrowid
+        self._connection.execute(
+            "INSERT INTO states (metadata_id, state, attributes_id, last_updated_ts) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                self._metadata_id("states_meta", "entity_id", entity_id),
+                str(state),
+                self._attributes[shared],
+                timestamp,
+            ),
+        )
+        self._connection.commit()
+
+    def statistic(self, statistic_id, start_ts, state=None, mean=None, unit="kWh"):
+        self._connection.execute(
+            "INSERT INTO statistics (metadata_id, start_ts, state, mean) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                self._metadata_id(
+                    "statistics_meta",
+                    "statistic_id",
+                    statistic_id,
+                    unit_of_measurement=unit,
+                ),
+                start_ts,
+                state,
+                mean,
+            ),
+        )
+        self._connection.commit()
+
+
+@pytest.fixture
+def database(tmp_path):
+    return RecorderDatabase(tmp_path / "home-assistant_v2.db")
+
+
+def _samples(database, config, end=START + ONE_HOUR, **options):
+    history = RecorderHistory(database.path, config, START, end, **options)
+    return history, list(history.samples())
+
+
+def test_meter_readings_become_tick_deltas(database):
+    database.state(IMPORT_SENSOR_ID, START + 5, 100.0)
+    database.state(EXPORT_SENSOR_ID, START + 6, 50.0)
+    database.state(IMPORT_SENSOR_ID, START + 30, 100.4)
+    database.state(IMPORT_SENSOR_ID, START + 50, 100.5)
+    database.state(EXPORT_SENSOR_ID, START + 100, 51.0)
+    database.state(IMPORT_SENSOR_ID, START + 200, 101.0)
+
+    _, samples = _samples(database, config_with_fixed_tariffs())
+
+    assert [sample.timestamp for sample in samples] == [
+        START + ONE_MINUTE * tick for tick in range(1, 5)
+    ]
+    assert [sample.import_amount for sample in samples] == pytest.approx(
+        [0.5, 0.0, 0.0, 0.5]
+    )
+    assert [sample.export_amount for sample in samples] == pytest.approx(
+        [0.0, 1.0, 0.0, 0.0]
+    )
+    assert samples[0].import_tariff == IMPORT_TARIFF
+    assert samples[0].export_tariff is None
+    assert samples[1].export_tariff is not None
+
+
+def test_units_rebase_and_unusable_rows(database):
+    database.state(IMPORT_SENSOR_ID, START + 1, 1000.0, WH_ATTRIBUTES)
+    database.state(IMPORT_SENSOR_ID, START + 2, 1500.0, WH_ATTRIBUTES)
+    database.state(IMPORT_SENSOR_ID, START + 3, "unavailable", WH_ATTRIBUTES)
+    database.state(IMPORT_SENSOR_ID, START + 4, 7.0, {ATTR_UNIT_OF_MEASUREMENT: "MWh"})
+    # The meter was replaced; counting restarts from the new reading.
+    database.state(IMPORT_SENSOR_ID, START + 5, 0.2)
+    database.state(
+        IMPORT_SENSOR_ID,
+        START + 6,
+        0.5,
+        {**KWH_ATTRIBUTES, ATTR_UNIT_OF_MEASUREMENT: UnitOfEnergy.KILO_WATT_HOUR},
+    )
+
+    history, samples = _samples(database, base_config())
+
+    assert [sample.import_amount for sample in samples] == pytest.approx([0.8])
+    assert history.readings == 6
+    assert history.dropped_readings == 2
+    assert history.rebased_readings == 1
+
+
+def test_solar_and_tariff_sensors(database):
+    config = config_with_tariff_sensors(**{CONF_SOLAR_ENERGY_SENSOR: SOLAR_SENSOR_ID})
+    database.state(IMPORT_TARIFF_SENSOR_ID, START, 0.25, {})
+    database.state(EXPORT_TARIFF_SENSOR_ID, START, 0.05, {})
+    database.state(SOLAR_SENSOR_ID, START + 1, 10.0)
+    database.state(EXPORT_SENSOR_ID, START + 2, 5.0)
+    database.state(SOLAR_SENSOR_ID, START + 50, 10.3)
+    database.state(EXPORT_SENSOR_ID, START + 55, 5.2)
+    database.state(IMPORT_TARIFF_SENSOR_ID, START + 90, 0.4, {})
+    database.state(IMPORT_SENSOR_ID, START + 95, 3.0)
+    database.state(IMPORT_SENSOR_ID, START + 100, 3.1)
+
+    _, samples = _samples(database, config)
+
+    assert samples == [
+        ReplaySample(START + 60, 0.0, pytest.approx(0.2), pytest.approx(0.3), None, 0.05),
+        ReplaySample(START + 120, pytest.approx(0.1), 0.0, 0.0, 0.4, 0.05),
+    ]
+
+
+def test_window_and_small_pages(database):
+    for minute in range(-2, 30):
+        database.state(IMPORT_SENSOR_ID, START + minute * ONE_MINUTE, minute * 0.1)
+
+    _, samples = _samples(
+        database, base_config(), end=START + 20 * ONE_MINUTE, page_size=3
+    )
+
+    assert len(samples) == 19
+    assert samples[-1].timestamp == START + 19 * ONE_MINUTE
+    assert sum(sample.import_amount for sample in samples) == pytest.approx(1.9)
+
+
+def test_baseline_before_window(database):
+    database.state(IMPORT_SENSOR_ID, START - 5 * ONE_MINUTE, 1.0)
+    database.state(IMPORT_SENSOR_ID, START - ONE_MINUTE, 1.5)
+    database.state(IMPORT_SENSOR_ID, START + 30, 2.0)
+
+    _, samples = _samples(database, base_config(), end=START + ONE_HOUR, baseline=True)
+
+    assert samples == [ReplaySample(START + ONE_MINUTE, 0.5, 0.0, 0.0, None, None)]
+
+
+def test_baseline_needs_states():
+    with pytest.raises(ValueError):
+        RecorderHistory(
+            "unused", base_config(), START, START + 1, STATISTICS, baseline=True
+        )
+
+
+def test_hourly_statistics(database):
+    database.statistic(IMPORT_SENSOR_ID, START, state=10.0)
+    database.statistic(IMPORT_SENSOR_ID, START + ONE_HOUR, state=12.5)
+    database.statistic(EXPORT_SENSOR_ID, START, state=5000.0, unit="Wh")
+    database.statistic(EXPORT_SENSOR_ID, START + ONE_HOUR, state=6000.0, unit="Wh")
+    database.statistic(IMPORT_TARIFF_SENSOR_ID, START + ONE_HOUR, mean=0.3)
+
+    _, samples = _samples(
+        database,
+        config_with_tariff_sensors(),
+        end=START + 3 * ONE_HOUR,
+        source=STATISTICS,
+    )
+
+    assert samples == [
+        ReplaySample(START + ONE_HOUR, 0.0, 0.0, 0.0, None, None),
+        ReplaySample(START + 2 * ONE_HOUR, 2.5, 1.0, 0.0, 0.3, None),
+    ]
+
+
+def test_replays_like_the_recorded_samples(database):
+    config = config_with_fixed_tariffs()
+    import_reading = export_reading = 0.0
+    for minute in range(120):
+        import_reading += 0.05 if minute % 3 else 0.0
+        export_reading += 0.08 if minute % 3 == 0 else 0.0
+        database.state(IMPORT_SENSOR_ID, START + minute * ONE_MINUTE + 1, import_reading)
+        database.state(EXPORT_SENSOR_ID, START + minute * ONE_MINUTE + 2, export_reading)
+
+    _, samples = _samples(database, config, end=START + 3 * ONE_HOUR)
+    result = replay_history(config, samples, START)
+
+    assert result.ticks == 120
+    assert result.grid_import + result.battery_energy_out == pytest.approx(
+        sum(sample.import_amount for sample in samples)
+    )
+    assert result.energy_saved > 0.0
+
+
+def test_only_sqlite_recorders():
+    assert recorder_database_path("sqlite:////config/db.sqlite") == "/config/db.sqlite"
+    with pytest.raises(HomeAssistantError):
+        recorder_database_path("postgresql://user@host/hass")
+
+
+@pytest.fixture
+def recorder_db_url(tmp_path):
+    """Record into a file so the loader can open it."""
+    return f"sqlite:///{tmp_path}/recorder.db"
+
+
+async def test_replays_in_the_recorder_executor(recorder_mock, hass):
+    from homeassistant.util import dt as dt_util
+    from pytest_homeassistant_custom_component.components.recorder.common import (
+        async_wait_recording_done,
+    )
+
+    start = dt_util.utcnow().timestamp() - 1
+    hass.states.async_set(IMPORT_SENSOR_ID, "1.0", KWH_ATTRIBUTES)
+    hass.states.async_set(EXPORT_SENSOR_ID, "2.0", KWH_ATTRIBUTES)
+    await hass.async_block_till_done()
+    hass.states.async_set(EXPORT_SENSOR_ID, "2.05", KWH_ATTRIBUTES)
+    hass.states.async_set(IMPORT_SENSOR_ID, "1.01", KWH_ATTRIBUTES)
+    await async_wait_recording_done(hass)
+
+    result = await async_replay_recorder_history(
+        hass, base_config(), start, start + ONE_HOUR
+    )
+
+    assert result == replay_history(
+        base_config(), [ReplaySample(start + ONE_MINUTE, 1.01 - 1.0, 2.05 - 2.0)], start
+    )
@@ -0,0 +1,114 @@
+"""Tests for replaying recorded meter history offline."""
+import pytest
+
+from custom_components.battery_sim.const import (
+    ATTR_ENERGY_SAVED,
+    ATTR_MONEY_SAVED,
+    BATTERY_CYCLES,
+    CONF_BATTERY_CHARGE_EFFICIENCY,
+)
+from custom_components.battery_sim.replay import ReplaySample, replay_history
+
+from .common import (
+    EXPORT_TARIFF,
+    IMPORT_TARIFF,
+    base_config,
+    config_with_fixed_tariffs,
+    config_with_tariff_sensors,
+    link_meter_readings,
+)
+
+ONE_HOUR = 3600
+START = 1_700_000_000.0
+
+SAMPLES = [
+    ReplaySample(START + ONE_HOUR, 0.0, 2.0),
+    ReplaySample(START + 2 * ONE_HOUR, 1.5, 0.0),
+    ReplaySample(START + 3 * ONE_HOUR, 0.5, 0.5),
+    ReplaySample(START + 3.5 * ONE_HOUR, 6.0, 0.0),
+    ReplaySample(START + 4 * ONE_HOUR, 0.0, 9.0),
+]
+
+
+class TestReplayHistory:
+    """The replay runs the same battery logic as the live handle."""
+
+    def test_matches_live_handle(self, make_handle):
+        config = config_with_fixed_tariffs(
+            **{CONF_BATTERY_CHARGE_EFFICIENCY: "0:0.8, 4:0.95"}
+        )
+        handle = make_handle(config)
+        link_meter_readings(handle)
+        handle._last_battery_update_time = START
+        for sample in SAMPLES:
+            handle.update_battery(
+                sample.import_amount,
+                sample.export_amount,
+                time_now=sample.timestamp,
+            )
+
+        result = replay_history(config, SAMPLES, start_time=START)
+
+        assert result.ticks == len(SAMPLES)
+        assert result.charge_state == pytest.approx(handle._charge_state)
+        assert result.energy_saved == pytest.approx(handle._sensors[ATTR_ENERGY_SAVED])
+        assert result.money_saved == pytest.approx(handle._sensors[ATTR_MONEY_SAVED])
+        assert result.battery_cycles == pytest.approx(handle._sensors[BATTERY_CYCLES])
+
+    def test_start_defaults_to_one_interval_before_first_sample(self):
+        samples = [ReplaySample(START + 60, 0.0, 1.0)]
+        result = replay_history(base_config(), samples)
+
+        # One minute at 4 kW allows 1/15 kWh into the battery.
+        assert result.battery_energy_in == pytest.approx(4.0 / 60)
+        assert result.grid_export == pytest.approx(1.0 - 4.0 / 60)
+
+    def test_recorded_tariffs_override_fixed_tariffs(self):
+        samples = [ReplaySample(START + ONE_HOUR, 2.0, 0.0, import_tariff=0.5)]
+
+        with_recorded = replay_history(config_with_fixed_tariffs(), samples, START)
+        with_fixed = replay_history(
+            config_with_fixed_tariffs(), [samples[0]._replace(import_tariff=None)], START
+        )
+
+        assert with_recorded.money_saved_import == pytest.approx(2.0 * 0.5)
+        assert with_fixed.money_saved_import == pytest.approx(2.0 * IMPORT_TARIFF)
+
+    def test_tariff_sensors_need_recorded_tariffs(self):
+        samples = [
+            ReplaySample(START + ONE_HOUR, 0.0, 2.0),
+            ReplaySample(
+                START + 2 * ONE_HOUR,
+                0.0,
+                2.0,
+                import_tariff=IMPORT_TARIFF,
+                export_tariff=EXPORT_TARIFF,
+            ),
+        ]
+        result = replay_history(config_with_tariff_sensors(), samples, START)
+
+        # Only the second interval had a tariff to account for.
+        assert result.money_saved_export == pytest.approx(-2.0 * EXPORT_TARIFF)
+
+    def test_initial_charge_state_is_clipped_to_capacity(self):
+        result = replay_history(
+            base_config(), [], start_time=START, initial_charge_state=50.0
+        )
+
+        assert result.ticks == 0
+        assert result.charge_state == pytest.approx(10.0)
+
+    def test_day_at_minute_resolution(self):
+        samples = [
+            ReplaySample(
+                START + minute * 60,
+                0.02 if minute % 120 < 60 else 0.0,
+                0.0 if minute % 120 < 60 else 0.03,
+            )
+            for minute in range(1, 24 * 60 + 1)
+        ]
+        result = replay_history(config_with_fixed_tariffs(), samples, START)
+
+        assert result.ticks == 24 * 60
+        assert 0.0 <= result.charge_state <= 10.0
+        assert result.money_saved > 0.0
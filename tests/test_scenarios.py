@@ -0,0 +1,203 @@
+"""Tests for simulating many battery configurations in one vectorized step."""
+import pytest
+
+from homeassistant.const import CONF_NAME
+
+from custom_components.battery_sim.const import (
+    ATTR_MONEY_SAVED,
+    CONF_BATTERY_CHARGE_EFFICIENCY,
+    CONF_BATTERY_DISCHARGE_EFFICIENCY,
+    CONF_BATTERY_MAX_CHARGE_RATE,
+    CONF_BATTERY_SIZE,
+    CONF_DEGRADATION_CURVE,
+    CONF_MINIMUM_USER_SELECTABLE_SOC,
+    CONF_SHADOW_SCENARIOS,
+)
+from custom_components.battery_sim.scenarios import ScenarioBank
+from custom_components.battery_sim.simulation import (
+    INITIAL_SOC_RATIO,
+    BatteryConfig,
+    BatteryControls,
+    BatteryState,
+    max_capacity,
+    step,
+)
+
+from .common import (
+    EXPORT_TARIFF,
+    IMPORT_TARIFF,
+    base_config,
+    config_with_fixed_tariffs,
+    config_with_solar,
+    link_meter_readings,
+)
+
+ONE_MINUTE = 60
+
+SCENARIOS = [
+    {CONF_NAME: "small", CONF_BATTERY_SIZE: 2.0},
+    {CONF_NAME: "base"},
+    {CONF_BATTERY_SIZE: 20.0, CONF_BATTERY_MAX_CHARGE_RATE: 8.0},
+    {CONF_BATTERY_CHARGE_EFFICIENCY: "0:0.8, 2:0.95, 6:0.9"},
+    {
+        CONF_BATTERY_DISCHARGE_EFFICIENCY: "0:1.0, 5:0.8",
+        CONF_MINIMUM_USER_SELECTABLE_SOC: 0.2,
+    },
+    # Stored power falls between 1 and 2 kW, so the scalar curve clips it.
+    {CONF_BATTERY_CHARGE_EFFICIENCY: "0:0.5, 1:1.0, 2:0.3"},
+]
+
+# (import kWh, export kWh, solar kWh) per one-minute tick.
+FLOWS = [(0.0, 0.1, 0.12), (0.02, 0.0, 0.0), (0.0, 0.5, 0.3), (0.2, 0.0, 0.0)] * 40
+
+
+def _reference(config, flows, import_tariff=None, export_tariff=None):
+    """Run the scalar kernel the way a bank scenario runs."""
+    battery_config = BatteryConfig.from_config(config)
+    controls = BatteryControls(
+        charge_limit=battery_config.max_charge_rate,
+        discharge_limit=battery_config.max_discharge_rate,
+        minimum_soc=100.0 * battery_config.minimum_user_selectable_soc,
+    )
+    state = BatteryState(
+        charge_state=min(
+            battery_config.battery_size * INITIAL_SOC_RATIO,
+            max_capacity(battery_config, 0.0),
+        )
+    )
+    grid_import = grid_export = 0.0
+    for import_amount, export_amount, solar_amount in flows:
+        state, outputs = step(
+            battery_config,
+            controls,
+            state,
+            import_amount,
+            export_amount,
+            solar_amount,
+            ONE_MINUTE,
+            import_tariff,
+            export_tariff,
+        )
+        grid_import += outputs.net_import
+        grid_export += outputs.net_export
+    return state, grid_import, grid_export
+
+
+def _run(bank, flows, import_tariff=None, export_tariff=None):
+    for import_amount, export_amount, solar_amount in flows:
+        bank.step(
+            import_amount,
+            export_amount,
+            solar_amount,
+            ONE_MINUTE,
+            import_tariff,
+            export_tariff,
+        )
+    return bank.results()
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        base_config(),
+        config_with_solar(),
+        config_with_solar(nominal_inverter_power=3.0),
+        # The ticks add up to a few cycles, so the curve fades within them.
+        base_config(**{CONF_DEGRADATION_CURVE: "0:1, 0.5:0.9, 2:0.6"}),
+    ],
+    ids=["plain", "solar", "inverter", "degradation_curve"],
+)
+def test_every_scenario_matches_the_kernel(config):
+    config[CONF_SHADOW_SCENARIOS] = SCENARIOS
+    bank = ScenarioBank.from_config(config)
+
+    results = _run(bank, FLOWS, IMPORT_TARIFF, EXPORT_TARIFF)
+
+    assert len(results) == len(SCENARIOS)
+    for scenario, result in zip(SCENARIOS, results):
+        state, grid_import, grid_export = _reference(
+            {**config, **scenario}, FLOWS, IMPORT_TARIFF, EXPORT_TARIFF
+        )
+        assert result["charge_state"] == pytest.approx(state.charge_state)
+        assert result["battery_cycles"] == pytest.approx(state.battery_cycles)
+        assert result["battery_energy_in"] == pytest.approx(state.energy_battery_in)
+        assert result["battery_energy_out"] == pytest.approx(state.energy_battery_out)
+        assert result["energy_saved"] == pytest.approx(state.energy_saved)
+        assert result["money_saved_import"] == pytest.approx(state.money_saved_import)
+        assert result["money_saved_export"] == pytest.approx(state.money_saved_export)
+        assert result["grid_import"] == pytest.approx(grid_import)
+        assert result["grid_export"] == pytest.approx(grid_export)
+
+
+def test_results_are_labelled():
+    config = base_config(**{CONF_SHADOW_SCENARIOS: SCENARIOS[:3]})
+    results = ScenarioBank.from_config(config).results()
+
+    assert [result["name"] for result in results] == ["small", "base", "scenario_2"]
+    assert [result["battery_size"] for result in results] == [2.0, 10.0, 20.0]
+    assert results[2]["max_charge_rate"] == 8.0
+    assert results[0]["charge_state"] == pytest.approx(1.0)
+
+
+def test_unknown_tariffs_leave_money_unchanged():
+    bank = ScenarioBank.from_config(base_config(**{CONF_SHADOW_SCENARIOS: SCENARIOS}))
+
+    results = _run(bank, FLOWS)
+
+    assert all(result["money_saved"] == 0.0 for result in results)
+    assert all(result["energy_saved"] > 0.0 for result in results)
+
+
+def test_reset_starts_over():
+    bank = ScenarioBank.from_config(base_config(**{CONF_SHADOW_SCENARIOS: SCENARIOS}))
+    fresh = bank.results()
+    _run(bank, FLOWS)
+
+    bank.reset()
+
+    assert bank.results() == fresh
+    assert bank.ticks == 0
+
+
+def test_no_scenarios_configured():
+    assert ScenarioBank.from_config(base_config()) is None
+
+
+def test_scenarios_must_share_solar_cap():
+    with pytest.raises(ValueError):
+        ScenarioBank(
+            [
+                BatteryConfig.from_config(base_config()),
+                BatteryConfig.from_config(config_with_solar()),
+            ]
+        )
+
+
+def test_scenarios_must_share_degradation_curve():
+    with pytest.raises(ValueError):
+        ScenarioBank(
+            [
+                BatteryConfig.from_config(base_config()),
+                BatteryConfig.from_config(
+                    base_config(**{CONF_DEGRADATION_CURVE: "0:1, 100:0.9"})
+                ),
+            ]
+        )
+
+
+def test_handle_advances_scenarios_with_the_battery(make_handle):
+    handle = make_handle(
+        config_with_fixed_tariffs(**{CONF_SHADOW_SCENARIOS: SCENARIOS[:2]})
+    )
+    link_meter_readings(handle)
+    start = handle._last_battery_update_time
+
+    handle.update_battery(0.0, 0.5, time_now=start + ONE_MINUTE)
+    handle.update_battery(0.3, 0.0, time_now=start + 2 * ONE_MINUTE)
+
+    small, same = handle._scenarios.results()
+    assert same["charge_state"] == pytest.approx(handle._charge_state)
+    assert same["money_saved"] == pytest.approx(handle._sensors[ATTR_MONEY_SAVED])
+    assert small["charge_state"] < same["charge_state"]
+    assert handle._scenarios.ticks == 2
+
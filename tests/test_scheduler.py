@@ -0,0 +1,131 @@
+"""Tests for the integration-wide battery scheduler."""
+from datetime import timedelta
+
+import pytest
+
+from homeassistant.const import CONF_NAME
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.battery_sim.const import CONF_UPDATE_FREQUENCY
+from custom_components.battery_sim.scheduler import (
+    BatteryScheduler,
+    _stagger_fraction,
+)
+
+from .common import base_config
+
+
+async def _advance(hass, freezer, seconds):
+    freezer.tick(timedelta(seconds=seconds))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+
+class TestIntervalGroups:
+    """Batteries on the same cadence share one timer."""
+
+    async def test_batteries_share_cadence_timer(self, hass, make_handle, freezer):
+        first = make_handle()
+        second = make_handle(base_config(**{CONF_NAME: "Second"}))
+        other = make_handle(
+            base_config(**{CONF_NAME: "Other", CONF_UPDATE_FREQUENCY: 30})
+        )
+        scheduler = first._scheduler
+
+        assert second._scheduler is scheduler is other._scheduler
+        stats = {group["interval"]: group for group in scheduler.stats}
+        assert stats[60]["batteries"] == 2
+        assert stats[30]["batteries"] == 1
+
+        first._accumulated_import_reading = 1.0
+        second._accumulated_import_reading = 1.0
+        await _advance(hass, freezer, 30)
+        await _advance(hass, freezer, 30)
+
+        assert first._accumulated_import_reading == 0.0
+        assert second._accumulated_import_reading == 0.0
+        stats = {group["interval"]: group for group in scheduler.stats}
+        assert stats[60]["ticks"] == 1
+        assert stats[30]["ticks"] == 2
+
+    async def test_full_batch_starts_staggered_group(self, hass, freezer):
+        scheduler = BatteryScheduler(hass, batch_size=2)
+        calls = []
+        cancels = [
+            scheduler.async_track_interval(60, lambda now, index=index: calls.append(index))
+            for index in range(3)
+        ]
+
+        assert [group["phase"] for group in scheduler.stats] == [0.0, 30.0]
+
+        await _advance(hass, freezer, 30)
+        assert calls == [2]
+        await _advance(hass, freezer, 30)
+        assert sorted(calls) == [0, 1, 2]
+
+        for cancel in cancels:
+            cancel()
+        assert scheduler.stats == []
+
+    async def test_failing_battery_does_not_stop_group(self, hass, freezer, caplog):
+        scheduler = BatteryScheduler(hass)
+        calls = []
+
+        def failing(now):
+            raise RuntimeError("boom")
+
+        cancels = [
+            scheduler.async_track_interval(60, failing),
+            scheduler.async_track_interval(60, calls.append),
+        ]
+        await _advance(hass, freezer, 60)
+
+        assert len(calls) == 1
+        assert "Error updating battery" in caplog.text
+        for cancel in cancels:
+            cancel()
+
+    def test_stagger_fractions_spread_evenly(self):
+        assert [_stagger_fraction(index) for index in range(5)] == [
+            0.0,
+            0.5,
+            0.25,
+            0.75,
+            0.125,
+        ]
+
+
+class TestDeferredCalls:
+    """One-off calls used to honour the minimum update interval."""
+
+    async def test_close_calls_share_a_timer(self, hass, freezer):
+        freezer.move_to("2026-01-01 00:00:00")
+        scheduler = BatteryScheduler(hass)
+        calls = []
+        scheduler.async_call_later(5.0, lambda now: calls.append("first"))
+        armed = scheduler._deferred_unsub
+        scheduler.async_call_later(5.1, lambda now: calls.append("second"))
+
+        assert scheduler._deferred_unsub is armed
+        await _advance(hass, freezer, 6)
+        assert calls == ["first", "second"]
+        assert scheduler._deferred_unsub is None
+
+    async def test_cancelled_call_does_not_run(self, hass, freezer):
+        scheduler = BatteryScheduler(hass)
+        calls = []
+        cancel = scheduler.async_call_later(5.0, calls.append)
+        cancel()
+
+        assert scheduler._deferred_unsub is None
+        await _advance(hass, freezer, 6)
+        assert calls == []
+
+    @pytest.mark.parametrize("delay", [0.0, -1.0])
+    async def test_overdue_call_runs_on_next_loop(self, hass, freezer, delay):
+        scheduler = BatteryScheduler(hass)
+        calls = []
+        scheduler.async_call_later(delay, calls.append)
+
+        await _advance(hass, freezer, 1)
+        assert len(calls) == 1
@@ -17,6 +17,7 @@ from homeassistant.core import State
 from homeassistant.helpers.dispatcher import async_dispatcher_send
 
 from custom_components.battery_sim.const import (
+    ATTR_DATE_RECORDING_STARTED,
     ATTR_ENERGY_SAVED,
     ATTR_MONEY_SAVED,
     ATTR_STATUS,
@@ -212,6 +213,55 @@ async def test_sensors_update_when_battery_updates(hass, setup_battery):
     assert hass.states.get(MONEY_SAVED_SENSOR_ID).state == "1.23"
 
 
+async def test_battery_update_writes_only_changed_entities(hass, setup_battery):
+    _entry, handle = await setup_battery()
+    publisher = handle._publisher
+    async_dispatcher_send(hass, battery_update_signal())
+    await hass.async_block_till_done()
+
+    writes = publisher.writes
+    async_dispatcher_send(hass, battery_update_signal())
+    await hass.async_block_till_done()
+    assert publisher.writes == writes
+
+    handle._sensors[ATTR_ENERGY_SAVED] = 0.0001
+    async_dispatcher_send(hass, battery_update_signal())
+    await hass.async_block_till_done()
+    # Changes below the published precision are not written.
+    assert publisher.writes == writes
+
+    handle._sensors[ATTR_ENERGY_SAVED] = 0.25
+    async_dispatcher_send(hass, battery_update_signal())
+    await hass.async_block_till_done()
+    assert publisher.writes == writes + 1
+    assert hass.states.get(ENERGY_SAVED_SENSOR_ID).state == "0.25"
+
+
+async def test_charge_state_change_writes_dependent_entities(hass, setup_battery):
+    _entry, handle = await setup_battery()
+    publisher = handle._publisher
+    async_dispatcher_send(hass, battery_update_signal())
+    await hass.async_block_till_done()
+
+    writes = publisher.writes
+    handle.async_set_battery_charge_state(7.5)
+    await hass.async_block_till_done()
+
+    # The battery sensor and the state of charge sensor.
+    assert publisher.writes == writes + 2
+    assert hass.states.get(BATTERY_SOC_SENSOR_ID).state == "75"
+
+
+async def test_publisher_disconnects_with_last_entity(hass, setup_battery):
+    entry, handle = await setup_battery()
+    assert handle._publisher._unsub_dispatcher is not None
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert handle._publisher._unsub_dispatcher is None
+
+
 async def test_percentage_energy_saved_attribute(hass, setup_battery):
     hass.states.async_set(IMPORT_SENSOR_ID, "10.0", KWH_ATTRIBUTES)
     _entry, handle = await setup_battery()
@@ -240,6 +290,45 @@ async def test_percentage_energy_saved_attribute_zero_import(
     assert "Division by zero" in caplog.text
 
 
+async def test_percentage_energy_saved_follows_import_meter(hass, setup_battery):
+    hass.states.async_set(IMPORT_SENSOR_ID, "10.0", KWH_ATTRIBUTES)
+    _entry, handle = await setup_battery()
+    handle._sensors[GRID_IMPORT_SIM] = 8.0
+    async_dispatcher_send(hass, battery_update_signal())
+    await hass.async_block_till_done()
+
+    # The battery covers all new import, so the simulated meter stays flat.
+    hass.states.async_set(IMPORT_SENSOR_ID, "20.0", KWH_ATTRIBUTES)
+    await hass.async_block_till_done()
+    handle._accumulated_import_reading = 0.0
+    async_dispatcher_send(hass, battery_update_signal())
+    await hass.async_block_till_done()
+
+    state = hass.states.get(SIM_IMPORT_SENSOR_ID)
+    assert state.state == "8.0"
+    assert state.attributes[PERCENTAGE_ENERGY_IMPORT_SAVED] == 60.0
+
+
+async def test_reset_writes_recording_start_date(hass, setup_battery):
+    _entry, handle = await setup_battery()
+    handle._date_recording_started = "2020-01-01T00:00:00+00:00"
+    async_dispatcher_send(hass, battery_update_signal())
+    await hass.async_block_till_done()
+
+    # Charge state and mode are unchanged by the reset; only the date moves.
+    handle.async_reset_battery()
+    await hass.async_block_till_done()
+
+    state = hass.states.get(BATTERY_ENTITY_ID)
+    assert state.state == "5.0"
+    assert state.attributes[ATTR_DATE_RECORDING_STARTED] == (
+        handle._date_recording_started
+    )
+    assert state.attributes[ATTR_DATE_RECORDING_STARTED] != (
+        "2020-01-01T00:00:00+00:00"
+    )
+
+
 async def test_new_battery_sim_sensors_sync_to_sources(hass, setup_battery):
     """A newly created battery starts its simulated meters at the source values."""
     hass.states.async_set(IMPORT_SENSOR_ID, "123.4", KWH_ATTRIBUTES)
@@ -0,0 +1,274 @@
+"""Tests for the Home Assistant independent simulation kernel."""
+from dataclasses import FrozenInstanceError
+import math
+
+import pytest
+
+from custom_components.battery_sim.const import (
+    CHARGE_ONLY,
+    CONF_BATTERY_CHARGE_EFFICIENCY,
+    CONF_BATTERY_DISCHARGE_EFFICIENCY,
+    CONF_DEGRADATION_CURVE,
+    CONF_MINIMUM_USER_SELECTABLE_SOC,
+    CONF_NOMINAL_INVERTER_POWER,
+    CONF_RATED_BATTERY_CYCLES,
+    CONF_SOLAR_ENERGY_SENSOR,
+    DEFAULT_MODE,
+    FORCE_DISCHARGE,
+    MODE_CHARGING,
+    MODE_DISCHARGING,
+    MODE_EMPTY,
+    MODE_FORCE_DISCHARGING,
+    MODE_FULL,
+    MODE_IDLE,
+    PAUSE_BATTERY,
+)
+from custom_components.battery_sim.simulation import (
+    BatteryConfig,
+    BatteryControls,
+    BatteryState,
+    degradation_factor,
+    max_capacity,
+    step,
+)
+
+from .common import EXPORT_TARIFF, IMPORT_TARIFF, SOLAR_SENSOR_ID, base_config
+
+ONE_HOUR = 3600
+
+
+def _config(**overrides):
+    return BatteryConfig.from_config(base_config(**overrides))
+
+
+CONTROLS = BatteryControls(charge_limit=4.0, discharge_limit=5.0)
+
+
+class TestBatteryConfig:
+    """The kernel config is built once from the battery configuration."""
+
+    def test_from_config(self):
+        config = _config()
+
+        assert config.battery_size == 10.0
+        assert config.max_charge_rate == 4.0
+        assert config.max_discharge_rate == 5.0
+        assert config.charge_efficiency_curve == ((0.0, 0.8),)
+        assert config.discharge_efficiency_curve == ((0.0, 0.9),)
+        assert not config.solar_capped
+
+    def test_is_immutable(self):
+        with pytest.raises(FrozenInstanceError):
+            _config().battery_size = 5.0
+
+    def test_degradation(self):
+        config = _config()
+
+        assert degradation_factor(config, 0.0) == 1.0
+        assert degradation_factor(config, 3000.0) == pytest.approx(0.9)
+        assert degradation_factor(config, 12000.0) == pytest.approx(0.8)
+        assert max_capacity(config, 6000.0) == pytest.approx(8.0)
+
+    def test_degradation_curve_replaces_linear_fade(self):
+        config = _config(**{CONF_DEGRADATION_CURVE: "0:1, 1000:0.9, 4000:0.85"})
+
+        assert config.degradation_curve.points[1] == (1000.0, 0.9)
+        assert degradation_factor(config, 500.0) == pytest.approx(0.95)
+        assert degradation_factor(config, 2500.0) == pytest.approx(0.875)
+        assert degradation_factor(config, 12000.0) == pytest.approx(0.85)
+        assert max_capacity(config, 1000.0) == pytest.approx(9.0)
+
+
+class TestStep:
+    """A step is a pure function of config, controls, state and meter flows."""
+
+    def test_charges_from_export(self):
+        state = BatteryState(charge_state=5.0)
+
+        new_state, outputs = step(
+            _config(), CONTROLS, state, 0.0, 2.0, 0.0, ONE_HOUR, None, EXPORT_TARIFF
+        )
+
+        assert state.charge_state == 5.0
+        assert new_state.charge_state == pytest.approx(5.0 + 2.0 * 0.8)
+        assert new_state.energy_battery_in == pytest.approx(2.0)
+        assert new_state.battery_cycles == pytest.approx(0.2)
+        assert new_state.money_saved_export == pytest.approx(-2.0 * EXPORT_TARIFF)
+        assert new_state.stored_energy_value == pytest.approx(2.0 * EXPORT_TARIFF)
+        assert outputs.net_export == pytest.approx(0.0)
+        assert outputs.charge_efficiency == 0.8
+        assert outputs.discharge_efficiency is None
+        assert outputs.charging_rate == pytest.approx(2.0)
+        assert outputs.battery_mode == MODE_CHARGING
+
+    def test_discharges_to_cover_import(self):
+        new_state, outputs = step(
+            _config(),
+            CONTROLS,
+            BatteryState(charge_state=5.0),
+            1.8,
+            0.0,
+            0.0,
+            ONE_HOUR,
+            IMPORT_TARIFF,
+            None,
+        )
+
+        assert new_state.charge_state == pytest.approx(5.0 - 1.8 / 0.9)
+        assert new_state.energy_saved == pytest.approx(1.8)
+        assert new_state.money_saved_import == pytest.approx(1.8 * IMPORT_TARIFF)
+        assert outputs.net_import == pytest.approx(0.0)
+        assert outputs.battery_mode == MODE_DISCHARGING
+
+    def test_charge_is_clipped_to_capacity(self):
+        new_state, outputs = step(
+            _config(), CONTROLS, BatteryState(charge_state=9.6), 0.0, 4.0, 0.0, ONE_HOUR
+        )
+
+        assert outputs.amount_to_charge == pytest.approx(0.4 / 0.8)
+        assert new_state.charge_state == pytest.approx(10.0)
+        assert outputs.status == MODE_FULL
+
+    def test_discharge_respects_minimum_soc(self):
+        controls = CONTROLS._replace(minimum_soc=20.0)
+
+        new_state, outputs = step(
+            _config(), controls, BatteryState(charge_state=3.0), 5.0, 0.0, 0.0, ONE_HOUR
+        )
+
+        assert outputs.amount_to_discharge == pytest.approx(1.0 * 0.9)
+        assert new_state.charge_state == pytest.approx(2.0)
+
+    def test_rates_scale_with_interval(self):
+        _, outputs = step(
+            _config(), CONTROLS, BatteryState(charge_state=5.0), 0.0, 1.0, 0.0, 60
+        )
+
+        assert outputs.amount_to_charge == pytest.approx(4.0 / 60)
+
+    def test_paused_battery_passes_flows_through(self):
+        controls = CONTROLS._replace(mode=PAUSE_BATTERY)
+
+        new_state, outputs = step(
+            _config(), controls, BatteryState(charge_state=5.0), 1.0, 2.0, 0.0, ONE_HOUR
+        )
+
+        assert new_state.charge_state == 5.0
+        assert outputs.net_import == 1.0
+        assert outputs.net_export == 2.0
+        assert outputs.battery_mode == MODE_IDLE
+
+    def test_charge_only_ignores_import(self):
+        controls = CONTROLS._replace(mode=CHARGE_ONLY)
+
+        _, outputs = step(
+            _config(), controls, BatteryState(charge_state=5.0), 1.0, 0.0, 0.0, ONE_HOUR
+        )
+
+        assert outputs.amount_to_discharge == 0.0
+        assert outputs.net_import == 1.0
+
+    def test_force_discharge_exports_surplus(self):
+        controls = CONTROLS._replace(mode=FORCE_DISCHARGE)
+
+        new_state, outputs = step(
+            _config(), controls, BatteryState(charge_state=5.0), 1.0, 0.0, 0.0, ONE_HOUR
+        )
+
+        assert outputs.amount_to_discharge == pytest.approx(5.0 * 0.9)
+        assert outputs.net_import == 0.0
+        assert outputs.net_export == pytest.approx(5.0 * 0.9 - 1.0)
+        assert outputs.battery_mode == MODE_FORCE_DISCHARGING
+        assert outputs.status == MODE_EMPTY
+        assert new_state.charge_state == pytest.approx(0.0)
+
+    def test_solar_and_inverter_caps(self):
+        config = _config(
+            **{
+                CONF_SOLAR_ENERGY_SENSOR: SOLAR_SENSOR_ID,
+                CONF_NOMINAL_INVERTER_POWER: 3.0,
+            }
+        )
+
+        _, outputs = step(
+            config, CONTROLS, BatteryState(charge_state=5.0), 5.0, 2.0, 1.0, ONE_HOUR
+        )
+
+        assert outputs.solar_power_cap == pytest.approx(1.0)
+        assert outputs.amount_to_charge == pytest.approx(1.0)
+        assert outputs.amount_to_discharge == pytest.approx(2.0)
+
+    def test_average_value_excludes_reserve(self):
+        config = _config(**{CONF_MINIMUM_USER_SELECTABLE_SOC: 0.2})
+
+        new_state, outputs = step(
+            config,
+            CONTROLS,
+            BatteryState(charge_state=4.0, stored_energy_value=1.0),
+            0.0,
+            0.0,
+            0.0,
+            ONE_HOUR,
+        )
+
+        assert new_state.stored_energy_value == 1.0
+        assert outputs.average_energy_value == pytest.approx(1.0 / 2.0)
+
+
+class TestGoldenValues:
+    """Two days of steps against recorded values.
+
+    Before the kernel was extracted, update_battery gave the same values
+    apart from the exact SoC clipping that came later. Any change to them
+    needs a reason.
+    """
+
+    def test_two_days(self):
+        config = _config(
+            **{
+                CONF_BATTERY_CHARGE_EFFICIENCY: "0:0.85, 2:0.92, 5:0.88",
+                CONF_BATTERY_DISCHARGE_EFFICIENCY: "0:0.9, 3:0.95",
+                CONF_RATED_BATTERY_CYCLES: 20.0,
+                CONF_MINIMUM_USER_SELECTABLE_SOC: 0.1,
+            }
+        )
+        state = BatteryState(charge_state=5.0)
+        net_import = net_export = 0.0
+        for tick in range(192):
+            hour = (tick % 96) / 4
+            if hour < 6:
+                mode = CHARGE_ONLY
+            elif 21 <= hour < 22:
+                mode = FORCE_DISCHARGE
+            else:
+                mode = DEFAULT_MODE
+            controls = CONTROLS._replace(mode=mode, minimum_soc=10.0)
+            state, outputs = step(
+                config,
+                controls,
+                state,
+                0.6 if 17 <= hour < 21 else 0.2,
+                1.5 * max(math.sin(math.pi * (hour - 6) / 12), 0.0),
+                0.0,
+                900,
+                IMPORT_TARIFF,
+                EXPORT_TARIFF,
+            )
+            net_import += outputs.net_import
+            net_export += outputs.net_export
+
+        assert tuple(state) == pytest.approx(
+            (
+                0.9628577641823617,
+                0.0,
+                3.714223581763835,
+                37.14223581763835,
+                34.47328371581296,
+                34.47328371581296,
+                10.341985114743874,
+                -3.7142235817638354,
+            ),
+            rel=1e-12,
+        )
+        assert net_import == pytest.approx(16.726716284187006, rel=1e-12)
+        assert net_export == pytest.approx(54.49828414319382, rel=1e-12)
@@ -0,0 +1,98 @@
+"""Tests for parameter sweeps and sizing searches over recorded history."""
+import pytest
+
+from custom_components.battery_sim.const import (
+    CONF_BATTERY_MAX_CHARGE_RATE,
+    CONF_BATTERY_SIZE,
+)
+from custom_components.battery_sim.replay import ReplaySample, replay_history
+from custom_components.battery_sim.sweep import (
+    MAXIMUM_SOC,
+    golden_section_maximum,
+    grid_points,
+    net_savings,
+    optimize,
+    replay_point,
+    sweep,
+)
+
+from .common import config_with_fixed_tariffs
+
+ONE_HOUR = 3600
+START = 1_700_000_000.0
+
+# A day of solar surplus followed by an evening of import, repeated.
+SAMPLES = [
+    ReplaySample(START + (day * 24 + hour + 1) * ONE_HOUR, imp, exp)
+    for day in range(3)
+    for hour, (imp, exp) in enumerate(
+        [(0.0, 1.5)] * 6 + [(0.5, 0.0)] * 4 + [(2.0, 0.0)] * 4
+    )
+]
+
+
+def test_grid_points_are_every_combination():
+    assert grid_points({"a": [1, 2], "b": ["x", "y"]}) == [
+        {"a": 1, "b": "x"},
+        {"a": 1, "b": "y"},
+        {"a": 2, "b": "x"},
+        {"a": 2, "b": "y"},
+    ]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_sweep_matches_single_replays(max_workers):
+    config = config_with_fixed_tariffs()
+    points = grid_points(
+        {CONF_BATTERY_SIZE: [2.0, 10.0], CONF_BATTERY_MAX_CHARGE_RATE: [1.0, 5.0]}
+    )
+
+    swept = sweep(config, SAMPLES, points, START, max_workers=max_workers)
+
+    assert [point.settings for point in swept] == points
+    for point in swept:
+        assert point.result == replay_history({**config, **point.settings}, SAMPLES, START)
+
+
+def test_maximum_soc_caps_the_charge():
+    config = config_with_fixed_tariffs()
+
+    capped = replay_point(config, SAMPLES[:6], {MAXIMUM_SOC: 50.0}, START)
+    full = replay_point(config, SAMPLES[:6], {}, START)
+
+    assert capped.charge_state == pytest.approx(0.5 * config[CONF_BATTERY_SIZE])
+    assert full.charge_state > capped.charge_state
+
+
+def test_golden_section_finds_the_peak():
+    calls = []
+
+    def function(value):
+        calls.append(value)
+        return -((value - 3.7) ** 2)
+
+    found = golden_section_maximum(function, 0.0, 10.0, 0.01)
+
+    assert found == pytest.approx(3.7, abs=0.01)
+    assert len(calls) < 25
+
+
+def test_optimize_sizes_against_capacity_cost():
+    config = config_with_fixed_tariffs()
+    objective = net_savings(0.35, CONF_BATTERY_SIZE)
+    bounds = {CONF_BATTERY_SIZE: (1.0, 20.0)}
+
+    found = optimize(config, SAMPLES, bounds, objective, start_time=START, max_workers=1)
+
+    fine = sweep(
+        config,
+        SAMPLES,
+        grid_points({CONF_BATTERY_SIZE: [1.0 + 0.1 * index for index in range(191)]}),
+        START,
+        max_workers=1,
+    )
+    best_on_grid = max(objective(point.settings, point.result) for point in fine)
+    assert 1.0 < found.settings[CONF_BATTERY_SIZE] < 20.0
+    assert found.objective == pytest.approx(best_on_grid, abs=0.01)
+    assert found.replays < len(fine) / 4
+    assert found.result == replay_point(config, SAMPLES, found.settings, START)
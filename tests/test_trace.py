@@ -0,0 +1,71 @@
+"""Tests for the ring buffer of recent ticks."""
+import math
+
+import pytest
+
+from custom_components.battery_sim.trace import TICK_FIELDS, TickTrace
+
+
+def _record(trace, time, tariff=0.25):
+    trace.record(
+        time, 60.0, 0.1, 0.0, 0.0, 0.0, 0.1, 0.0, 0.0, None, 0.9, tariff, None, 5.0, 10.0
+    )
+
+
+def test_empty_trace():
+    trace = TickTrace(4)
+    assert len(trace.records()) == 0
+    assert trace.columns() == {field: [] for field in TICK_FIELDS}
+
+
+def test_records_are_kept_oldest_first():
+    trace = TickTrace(4)
+    for time in range(3):
+        _record(trace, float(time))
+
+    records = trace.records()
+
+    assert records["time"].tolist() == [0.0, 1.0, 2.0]
+    assert records["discharge_efficiency"].tolist() == [0.9, 0.9, 0.9]
+    assert math.isnan(records["charge_efficiency"][0])
+    assert trace.records(2)["time"].tolist() == [1.0, 2.0]
+
+
+def test_oldest_records_are_overwritten():
+    trace = TickTrace(4)
+    for time in range(7):
+        _record(trace, float(time))
+
+    assert trace.count == 4
+    assert trace.records()["time"].tolist() == [3.0, 4.0, 5.0, 6.0]
+    assert trace.records(3)["time"].tolist() == [4.0, 5.0, 6.0]
+    assert trace.records(10)["time"].tolist() == [3.0, 4.0, 5.0, 6.0]
+
+
+def test_columns_report_unknowns_as_none():
+    trace = TickTrace(4)
+    _record(trace, 1.0)
+    _record(trace, 2.0, tariff=None)
+
+    columns = trace.columns()
+
+    assert columns["time"] == [1.0, 2.0]
+    assert columns["import_tariff"] == [0.25, None]
+    assert columns["export_tariff"] == [None, None]
+    assert columns["charge_efficiency"] == [None, None]
+    assert columns["max_capacity"] == [pytest.approx(10.0)] * 2
+
+
+def test_handle_records_every_tick(make_handle):
+    handle = make_handle()
+    start = handle._last_battery_update_time
+
+    handle.update_battery(0.0, 0.5, time_now=start + 60)
+
+    records = handle._trace.records()
+    assert records["time"].tolist() == [start + 60]
+    assert records["interval"].tolist() == [60.0]
+    assert records["export"].tolist() == [0.5]
+    assert records["charged"][0] > 0.0
+    assert records["charge_state"][0] == pytest.approx(handle._charge_state)
+    assert records["max_capacity"][0] == pytest.approx(handle.current_max_capacity)
@@ -0,0 +1,65 @@
+"""Tests for the slotted live values of a battery."""
+import pytest
+
+from custom_components.battery_sim.const import (
+    ATTR_ENERGY_SAVED,
+    ATTR_LAST_CHARGE_EFFICIENCY,
+    BATTERY_MODE,
+    GRID_EXPORT_SIM,
+    GRID_IMPORT_SIM,
+    GRID_SECOND_IMPORT_SIM,
+    MODE_CHARGING,
+    MODE_IDLE,
+)
+from custom_components.battery_sim.values import (
+    VALUE_SLOTS,
+    BatteryValues,
+    value_accessor,
+)
+
+
+def test_sensor_keys_address_the_slots():
+    values = BatteryValues([GRID_IMPORT_SIM], 0.9, 0.8)
+
+    values[ATTR_ENERGY_SAVED] = 1.5
+    values.battery_mode = MODE_CHARGING
+    values[GRID_IMPORT_SIM] += 0.25
+
+    assert values.energy_saved == 1.5
+    assert values[BATTERY_MODE] == MODE_CHARGING
+    assert values.simulated == {GRID_IMPORT_SIM: 0.25}
+    assert values[ATTR_LAST_CHARGE_EFFICIENCY] == 0.9
+    assert GRID_IMPORT_SIM in values
+    assert GRID_EXPORT_SIM not in values
+    assert list(values) == [*VALUE_SLOTS, GRID_IMPORT_SIM]
+    assert dict(values.items()) == {key: values[key] for key in values}
+    with pytest.raises(KeyError):
+        values[GRID_EXPORT_SIM]
+
+
+def test_values_have_no_instance_dict():
+    with pytest.raises(AttributeError):
+        BatteryValues().__dict__
+
+
+def test_reset_keeps_simulated_meters():
+    values = BatteryValues([GRID_IMPORT_SIM])
+    values.energy_saved = 2.0
+    values.battery_mode = MODE_CHARGING
+    values.simulated[GRID_IMPORT_SIM] = 3.0
+
+    values.reset(0.95, 0.85)
+
+    assert values.energy_saved == 0.0
+    assert values.battery_mode == MODE_IDLE
+    assert values.last_charge_efficiency == 0.95
+    assert values.simulated[GRID_IMPORT_SIM] == 3.0
+
+
+def test_value_accessor():
+    values = BatteryValues([GRID_IMPORT_SIM])
+    values.energy_saved = 4.0
+
+    assert value_accessor(ATTR_ENERGY_SAVED)(values) == 4.0
+    assert value_accessor(GRID_IMPORT_SIM)(values) == 0.0
+    assert value_accessor(GRID_SECOND_IMPORT_SIM)(values) is None